@@ -1,3 +1,12 @@
+from typing import Any
 from .common import *
 from .error import *
 from .bin_file import *
+from .common import CONSTRUCTOR_NAMES as _CONSTRUCTOR_NAMES
+
+
+def __getattr__(name: str) -> Any:
+    if name in _CONSTRUCTOR_NAMES:
+        from . import constructor
+        return getattr(constructor, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
@@ -1,47 +1,44 @@
 from hashlib import md5
-from io import BytesIO, IOBase, SEEK_CUR, SEEK_END, SEEK_SET
+from io import BytesIO, IOBase, SEEK_CUR, SEEK_END, SEEK_SET, UnsupportedOperation
 import logging
 import os
 from pathlib import Path
-from typing import BinaryIO, Optional, Tuple, Union
-from zstandard import ZstdCompressor, ZstdDecompressor
-import construct as ct
-from .common import BinExtHeader, BinHeader, HeaderType, PackType, PlatformType
+from tempfile import TemporaryFile
+from typing import Any, BinaryIO, Optional, Tuple, Union
+from .common import CONSTRUCTOR_NAMES, HeaderType, PackType, PlatformType
 from .error import BinPackError, BinUnpackError
 from vromfs.common import file_apply
 from vromfs.ranged_reader import RangedReader
-from vromfs.obfs_reader import ObfsReader
+from vromfs.obfs_reader import ObfsReader, ObfsWriter
+from vromfs.stats import IOStats, StatsReader
 
 __all__ = [
-    'BinContainer',
     'BinFile',
     'Version',
 ]
 
 logger = logging.getLogger(__name__)
 
-BinContainer = ct.Struct(
-    'header' / BinHeader,
-    'ext_header' / ct.If(lambda ctx: ctx.header.type is HeaderType.VRFX, BinExtHeader),
-    'offset' / ct.Tell,
-    ct.Seek(lambda ctx: ctx.header.size if ctx.header.packed.type is PackType.PLAIN else ctx.header.packed.size,
-            SEEK_CUR),
-    'digest' / ct.If(lambda ctx: ctx.header.packed.type is not PackType.ZSTD_OBFS_NOCHECK, ct.Bytes(16)),
-    'extra' / ct.GreedyBytes,
-    ct.Check(lambda ctx: len(ctx.extra) in (0, 0x100)),
-)
-
 Version = Tuple[int, int, int, int]
 
 
+def __getattr__(name: str) -> Any:
+    # BinContainer и остальные конструкторы раньше определялись здесь; модуль конструкторов загружается при обращении
+    if name in CONSTRUCTOR_NAMES:
+        from . import constructor
+        return getattr(constructor, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
 class BinFile(IOBase):
     """
     Класс для работы с bin контейнером.
     """
 
-    def __init__(self, source: Union[os.PathLike, IOBase]):
+    def __init__(self, source: Union[os.PathLike, IOBase], stats: Optional[IOStats] = None):
         """
         :param source: Входной файл или путь к файлу контейнера.
+        :param stats: Счетчики ввода-вывода. Если не указаны, потоки не оборачиваются.
         :raises TypeError: Неверный тип source.
         :raises EnvironmentError: Ошибка доступа к source.
         """
@@ -63,6 +60,15 @@ class BinFile(IOBase):
 
         self._stream = None
         self._meta = None
+        self._stats = stats
+
+    @property
+    def stats(self) -> Optional[IOStats]:
+        """
+        Счетчики ввода-вывода уровней ``ranged``, ``obfs``, ``zstd``. None, если сбор не включен.
+        """
+
+        return self._stats
 
     @property
     def name(self) -> Optional[str]:
@@ -73,7 +79,7 @@ class BinFile(IOBase):
         return self._name
 
     @property
-    def meta(self):
+    def meta(self) -> Any:
         """
         Вспомогательное пространство имен метаданных контейнера.
 
@@ -81,6 +87,9 @@ class BinFile(IOBase):
         """
 
         if self._meta is None:
+            import construct as ct
+            from .constructor import BinContainer
+
             try:
                 self._meta = BinContainer.parse_stream(self._bin_stream)
             except ct.ConstructError as e:
@@ -178,14 +187,28 @@ class BinFile(IOBase):
         offset = self.meta.offset
         size = self.meta.header.size
         self._stream = RangedReader(self._bin_stream, offset, size)
+        if self._stats is not None:
+            self._stream = StatsReader(self._stream, self._stats.layer('ranged'))
 
     def _set_compressed_stream(self):
+        from zstandard import ZstdDecompressor
+
         logger.debug('Сброс zstd потока.')
         offset = self.meta.offset
         size = self.meta.header.packed.size
-        obfs_reader = ObfsReader(RangedReader(self._bin_stream, offset, size), size)
+        stats = self._stats
+        ranged_reader = RangedReader(self._bin_stream, offset, size)
+        if stats is not None:
+            ranged_reader = StatsReader(ranged_reader, stats.layer('ranged'))
+        obfs_reader = ObfsReader(ranged_reader, size)
+        if stats is not None:
+            obfs_reader = StatsReader(obfs_reader, stats.layer('obfs'))
         dctx = ZstdDecompressor()
         self._stream = dctx.stream_reader(obfs_reader)
+        if stats is not None:
+            zstd_stats = stats.layer('zstd')
+            zstd_stats.resets += 1
+            self._stream = StatsReader(self._stream, zstd_stats)
 
     def close(self):
         if self._owner:
@@ -290,6 +313,108 @@ class BinFile(IOBase):
             except Exception:
                 raise
 
+    def transcode(self, pack_type: PackType, ostream: Optional[IOBase] = None, level: int = 3) -> IOBase:
+        """
+        Перепаковка контейнера в тип упаковки pack_type без разбора образа.
+        Образ передается потоком через сжатие и обфускацию, память не зависит от размера контейнера.
+        Платформа, версия и дополнительные данные сохраняются, MD5 дайджест вычисляется заново.
+        Для сжатого pack_type размер в заголовке записывается после образа, ostream должен поддерживать seek.
+        Дайджест исходного образа проверяется до записи размера в заголовок; при несовпадении или ошибке записи
+        данные, записанные в ostream с seek, отбрасываются, в ostream без seek контейнер остается без дайджеста.
+        Ostream будет создан в памяти, если не указан.
+
+        :param pack_type: Тип упаковки выходного контейнера.
+        :param ostream: Выходной поток.
+        :param level: Уровень сжатия zstd.
+        :return: Выходной поток.
+        :raises TypeError: Неверный тип pack_type, ostream, level.
+        :raises BinUnpackError: Дайджест образа не совпал с дайджестом в контейнере.
+        :raises BinPackError: Ошибка при записи.
+        :raises EnvironmentError: Ошибка при чтении или записи.
+        """
+
+        import construct as ct
+        from zstandard import ZstdCompressor
+        from .constructor import BinExtHeader, BinHeader
+
+        if not isinstance(pack_type, PackType):
+            raise TypeError('pack_type: ожидался PackType: {}'.format(type(pack_type)))
+        if not isinstance(level, int):
+            raise TypeError('level: ожидался int: {}'.format(type(level)))
+
+        compressed = pack_type is not PackType.PLAIN
+        checked = pack_type is not PackType.ZSTD_OBFS_NOCHECK
+        if ostream is None:
+            ostream = BytesIO()
+        elif not isinstance(ostream, IOBase) or not ostream.writable():
+            raise TypeError('ostream: ожидалось None | Binary Writer: {}'.format(type(ostream)))
+        elif compressed and not ostream.seekable():
+            raise TypeError('ostream: для сжатого образа ожидался Seekable Binary Writer: {}'.format(type(ostream)))
+
+        version = self.version
+        extra = self.meta.extra
+        header_type = HeaderType.VRFS if version is None else HeaderType.VRFX
+
+        def write_header(packed_size: int):
+            bin_header = dict(
+                type=header_type,
+                platform=self.platform,
+                size=self.size,
+                packed=dict(
+                    type=pack_type,
+                    size=packed_size,
+                )
+            )
+            try:
+                BinHeader.build_stream(bin_header, ostream)
+                if header_type is HeaderType.VRFX:
+                    BinExtHeader.build_stream(dict(flags=0, version=version), ostream)
+            except ct.ConstructError as e:
+                raise BinPackError('Ошибка при записи метаданных образа.') from e
+
+        # Несжатый образ может записываться в поток без seek, например, в канал.
+        start = ostream.tell() if ostream.seekable() else None
+
+        def discard():
+            if start is not None:
+                ostream.seek(start)
+                try:
+                    ostream.truncate()
+                except UnsupportedOperation:
+                    pass
+
+        write_header(0)
+
+        m = md5()
+        self.seek(0)
+        if compressed:
+            writer = ObfsWriter(ostream)
+            with ZstdCompressor(level=level).stream_writer(writer, closefd=False) as compressed_writer:
+                file_apply(self, lambda c: (m.update(c), compressed_writer.write(c)), self.size)
+            writer.close()
+        else:
+            file_apply(self, lambda c: (m.update(c), ostream.write(c)), self.size)
+
+        # Заголовок сжатого контейнера получает размер только после проверки дайджеста.
+        digest = m.digest()
+        if self.checked and digest != self.digest:
+            discard()
+            raise BinUnpackError('Дайджест образа не совпал с дайджестом в контейнере.')
+        if compressed:
+            if writer.size >= 2 ** 26:
+                discard()
+                raise BinPackError('Размер сжатого образа не помещается в заголовок: {}'.format(writer.size))
+            end = ostream.tell()
+            ostream.seek(start)
+            write_header(writer.size)
+            ostream.seek(end)
+        if checked:
+            ostream.write(digest)
+        if extra:
+            ostream.write(extra)
+
+        return ostream
+
     @classmethod
     def pack_into(cls, istream: IOBase, ostream: Optional[IOBase],
                   platform: PlatformType, version: Optional[Version], compressed: bool, checked: bool,
@@ -299,6 +424,7 @@ class BinFile(IOBase):
 
         Упаковка потока содержимого двоичного istream, открытого для чтения в двоичный поток ostream,
         окрытый для записи.
+        Сжатый образ собирается во временном файле, память не зависит от размера содержимого.
         Ostream будет создан в памяти, если задан как None.
 
         :param istream: Входной поток.
@@ -314,6 +440,10 @@ class BinFile(IOBase):
         :raises BinPackError: Ошибка при записи.
         """
 
+        import construct as ct
+        from zstandard import ZstdCompressor
+        from .constructor import BinExtHeader, BinHeader
+
         if not (isinstance(istream, IOBase) or not istream.readable()):
             raise TypeError('Ожидался Binary Reader: {}'.format(type(istream)))
 
@@ -351,8 +481,9 @@ class BinFile(IOBase):
             raise TypeError('compress, check: не определен тип упаковки для compress == check == False')
 
         packed_size = 0
-        image = BytesIO()
         if compressed:
+            # Сжатый образ собирается во временном файле: размер в заголовке известен только после сжатия.
+            image = TemporaryFile()
             cctx = ZstdCompressor()
             with cctx.stream_writer(image, closefd=False) as compressed_writer:
                 if checked:
@@ -370,7 +501,7 @@ class BinFile(IOBase):
                     except ct.ConstructError as e:
                         raise BinPackError('Ошибка при формировании сжатого образа.') from e
                     digest = None
-            packed_size = len(image.getvalue())
+            packed_size = image.tell()
             image.seek(0)
             image = ObfsReader(image, packed_size)
         else:
@@ -408,6 +539,9 @@ class BinFile(IOBase):
             file_apply(image, lambda c: ct.stream_write(ostream, c), size_)
         except ct.ConstructError as e:
             raise BinPackError('Ошибка при записи образа.') from e
+        finally:
+            if compressed:
+                image.wrapped.close()
 
         if checked:
             try:
@@ -1,19 +1,23 @@
 from enum import Enum
-from typing import Any, NoReturn, Type
-import construct as ct
+from typing import Any
 
 __all__ = [
+    'HeaderType',
+    'PackType',
+    'PlatformType',
+]
+
+CONSTRUCTOR_NAMES = frozenset([
+    'BinContainer',
     'BinExtHeader',
     'BinHeader',
-    'HeaderType',
     'HeaderTypeCon',
-    'PackType',
     'PackTypeCon',
-    'PlatformType',
     'PlatformTypeCon',
     'VersionCon',
-    'enum'
-]
+    'enum',
+])
+"""Имена из vromfs.bin.constructor, доступные через пакет. Модуль конструкторов загружается при первом обращении."""
 
 
 class HeaderType(Enum):
@@ -39,46 +43,8 @@ class PackType(Enum):
     """checked: 1, compressed: 1"""
 
 
-def not_implemented(obj: Any, context: ct.Container) -> NoReturn:
-    raise NotImplementedError
-
-
-class enum(ct.Adapter):
-    def __init__(self, subcon: ct.Subconstruct, enum_: Type[Enum]):
-        self.enum = enum_
-        super().__init__(ct.Enum(subcon, enum_))
-
-    def _decode(self, obj: str, context: ct.Container, path: str) -> Enum:
-        try:
-            return self.enum[obj]
-        except KeyError:
-            raise ct.MappingError("Неизвестное имя для {}: {}".format(self.enum.__name__, obj))
-
-    def _encode(self, obj: Enum, context: ct.Container, path: str) -> Any:
-        try:
-            return obj.name
-        except AttributeError:
-            raise ct.MappingError("Объект не содержит атрибута name: {}".format(type(obj)))
-
-
-HeaderTypeCon = enum(ct.Bytes(4), HeaderType)
-PlatformTypeCon = enum(ct.Bytes(4), PlatformType)
-PackTypeCon = enum(ct.BitsInteger(6), PackType)
-VersionCon = ct.ExprSymmetricAdapter(ct.Byte[4], lambda obj, ctx: tuple(reversed(obj)))
-
-BinExtHeader = ct.Struct(
-    'size' / ct.Rebuild(ct.Int16ul, lambda ctx: sum(map(lambda sc: sc.sizeof(), BinExtHeader.subcons))),
-    'flags' / ct.Int16ul,
-    'version' / VersionCon,
-)
-
-BinHeader = ct.Struct(
-    'type' / HeaderTypeCon,
-    'platform' / PlatformTypeCon,
-    'size' / ct.Int32ul,
-
-    'packed' / ct.ByteSwapped(ct.BitStruct(
-        'type' / PackTypeCon,
-        'size' / ct.BitsInteger(26),
-    )),
-)
+def __getattr__(name: str) -> Any:
+    if name in CONSTRUCTOR_NAMES:
+        from . import constructor
+        return getattr(constructor, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
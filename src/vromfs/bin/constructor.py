@@ -0,0 +1,72 @@
+from enum import Enum
+from io import SEEK_CUR
+from typing import Any, NoReturn, Type
+import construct as ct
+from .common import HeaderType, PackType, PlatformType
+
+__all__ = [
+    'BinContainer',
+    'BinExtHeader',
+    'BinHeader',
+    'HeaderTypeCon',
+    'PackTypeCon',
+    'PlatformTypeCon',
+    'VersionCon',
+    'enum'
+]
+
+
+def not_implemented(obj: Any, context: ct.Container) -> NoReturn:
+    raise NotImplementedError
+
+
+class enum(ct.Adapter):
+    def __init__(self, subcon: ct.Subconstruct, enum_: Type[Enum]):
+        self.enum = enum_
+        super().__init__(ct.Enum(subcon, enum_))
+
+    def _decode(self, obj: str, context: ct.Container, path: str) -> Enum:
+        try:
+            return self.enum[obj]
+        except KeyError:
+            raise ct.MappingError("Неизвестное имя для {}: {}".format(self.enum.__name__, obj))
+
+    def _encode(self, obj: Enum, context: ct.Container, path: str) -> Any:
+        try:
+            return obj.name
+        except AttributeError:
+            raise ct.MappingError("Объект не содержит атрибута name: {}".format(type(obj)))
+
+
+HeaderTypeCon = enum(ct.Bytes(4), HeaderType)
+PlatformTypeCon = enum(ct.Bytes(4), PlatformType)
+PackTypeCon = enum(ct.BitsInteger(6), PackType)
+VersionCon = ct.ExprSymmetricAdapter(ct.Byte[4], lambda obj, ctx: tuple(reversed(obj)))
+
+BinExtHeader = ct.Struct(
+    'size' / ct.Rebuild(ct.Int16ul, lambda ctx: sum(map(lambda sc: sc.sizeof(), BinExtHeader.subcons))),
+    'flags' / ct.Int16ul,
+    'version' / VersionCon,
+)
+
+BinHeader = ct.Struct(
+    'type' / HeaderTypeCon,
+    'platform' / PlatformTypeCon,
+    'size' / ct.Int32ul,
+
+    'packed' / ct.ByteSwapped(ct.BitStruct(
+        'type' / PackTypeCon,
+        'size' / ct.BitsInteger(26),
+    )),
+)
+
+BinContainer = ct.Struct(
+    'header' / BinHeader,
+    'ext_header' / ct.If(lambda ctx: ctx.header.type is HeaderType.VRFX, BinExtHeader),
+    'offset' / ct.Tell,
+    ct.Seek(lambda ctx: ctx.header.size if ctx.header.packed.type is PackType.PLAIN else ctx.header.packed.size,
+            SEEK_CUR),
+    'digest' / ct.If(lambda ctx: ctx.header.packed.type is not PackType.ZSTD_OBFS_NOCHECK, ct.Bytes(16)),
+    'extra' / ct.GreedyBytes,
+    ct.Check(lambda ctx: len(ctx.extra) in (0, 0x100)),
+)
@@ -0,0 +1,156 @@
+"""
+Кэш сборки контейнеров.
+Ключ - отпечаток входа упаковки: внутренние имена, размеры и времена изменения или SHA1 содержимого файлов дерева,
+параметры упаковки. Упаковка детерминирована, поэтому контейнер из кэша совпадает с результатом повторной
+упаковки побайтно.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha1
+import json
+import os
+from pathlib import Path
+import shutil
+from typing import Any, Mapping, Optional
+from vromfs.common import CHUNK_SIZE, replace_file
+from vromfs.vromfs.packer import scan_tree
+
+__all__ = [
+    'BuildCache',
+    'CACHE_FORMAT',
+    'file_digest',
+    'fingerprint',
+]
+
+CACHE_FORMAT = 2
+"""Версия формата отпечатка. Увеличивается при изменении формата ключа или вывода упаковщика."""
+
+
+def file_digest(path: os.PathLike) -> str:
+    """
+    SHA1 содержимого файла.
+
+    :param path: Путь файла.
+    :return: Шестнадцатеричный дайджест.
+    :raises EnvironmentError: Ошибка при чтении.
+    """
+
+    m = sha1()
+    with open(path, 'rb') as istream:
+        for chunk in iter(lambda: istream.read(CHUNK_SIZE), b''):
+            m.update(chunk)
+    return m.hexdigest()
+
+
+def fingerprint(source: os.PathLike, options: Mapping[str, Any], hashed: bool = False, jobs: int = 1) -> str:
+    """
+    Отпечаток входа упаковки дерева source.
+    Файлы перечисляются в порядке упаковки. Без hashed учитываются размер и время изменения файла,
+    с hashed - размер и SHA1 содержимого: отпечаток не зависит от времени изменения, например, после checkout.
+
+    :param source: Корень дерева.
+    :param options: Параметры упаковки, сериализуемые в JSON.
+    :param hashed: Учитывать содержимое файлов вместо времени изменения.
+    :param jobs: Число потоков для хеширования.
+    :return: Шестнадцатеричный отпечаток.
+    :raises TypeError: Неверный тип source, options. Options не сериализуются в JSON.
+    :raises EnvironmentError: Ошибка при обходе дерева или чтении файлов.
+    """
+
+    if not isinstance(source, os.PathLike):
+        raise TypeError('source: ожидался PathLike: {}'.format(type(source)))
+    if not isinstance(options, Mapping):
+        raise TypeError('options: ожидался Mapping: {}'.format(type(options)))
+
+    m = sha1()
+    m.update(json.dumps(dict(format=CACHE_FORMAT, hashed=hashed, options=options), sort_keys=True).encode())
+    files = scan_tree(os.fspath(source))
+    stats = [os.stat(f.path) for f in files]
+    if hashed:
+        with ThreadPoolExecutor(jobs) as executor:
+            marks = list(executor.map(file_digest, (f.path for f in files)))
+    else:
+        marks = [st.st_mtime_ns for st in stats]
+    for f, st, mark in zip(files, stats, marks):
+        m.update('{}\0{}\0{}\n'.format(f.name, st.st_size, mark).encode())
+    return m.hexdigest()
+
+
+class BuildCache:
+    """
+    Каталог контейнеров, собранных ранее, по отпечаткам входа.
+    Контейнеры записываются во временный файл и переименовываются, поэтому прерванная запись не оставляет
+    неполных записей. Выходной файл также заменяется, а не перезаписывается: жесткая ссылка на запись кэша
+    не изменяет запись при следующей сборке.
+    """
+
+    suffix = '.vromfs.bin'
+
+    def __init__(self, root: os.PathLike):
+        """
+        :param root: Каталог кэша. Создается при первой записи.
+        :raises TypeError: Неверный тип root.
+        """
+
+        if not isinstance(root, os.PathLike):
+            raise TypeError('root: ожидался PathLike: {}'.format(type(root)))
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        """Путь записи кэша для отпечатка key."""
+
+        return self.root / key[:2] / (key + self.suffix)
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """
+        :param key: Отпечаток входа.
+        :return: Путь записи кэша или None, если запись отсутствует.
+        """
+
+        path = self.path(key)
+        return path if path.is_file() else None
+
+    def store(self, key: str, source: os.PathLike) -> Path:
+        """
+        Копирование контейнера source в кэш.
+
+        :param key: Отпечаток входа.
+        :param source: Путь собранного контейнера.
+        :return: Путь записи кэша.
+        :raises EnvironmentError: Ошибка при чтении source или записи в кэш.
+        """
+
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        replace_file(path, lambda temp: shutil.copyfile(source, temp))
+        return path
+
+    def restore(self, key: str, target: os.PathLike, link: bool = False) -> bool:
+        """
+        Восстановление контейнера из кэша в target.
+        С link target становится жесткой ссылкой на запись кэша, если файловая система это допускает, иначе копией.
+
+        :param key: Отпечаток входа.
+        :param target: Путь выходного контейнера.
+        :param link: Использовать жесткую ссылку вместо копирования.
+        :return: Запись найдена и восстановлена.
+        :raises EnvironmentError: Ошибка при записи target.
+        """
+
+        path = self.lookup(key)
+        if path is None:
+            return False
+
+        def make(temp: Path):
+            if link:
+                try:
+                    temp.unlink()
+                    os.link(path, temp)
+                    return
+                except OSError:
+                    pass
+            shutil.copyfile(path, temp)
+
+        replace_file(target, make)
+        return True
+
@@ -0,0 +1,282 @@
+"""
+Каталог содержимого множества контейнеров в базе SQLite.
+Контейнеры добавляются по сводке о файлах без распаковки содержимого, повторно добавляемые контейнеры
+с известными дайджестом, версией и платформой пропускаются.
+Поиск по имени файла и SHA1 дайджесту выполняется по индексам.
+"""
+
+from hashlib import md5
+import os
+from pathlib import Path
+import sqlite3
+from time import time
+from typing import Iterator, List, NamedTuple, Optional, Union
+from vromfs.bin import BinFile, Version
+from vromfs.common import file_apply
+from vromfs.vromfs import VromfsFile
+
+__all__ = [
+    'Catalog',
+    'CatalogContainer',
+    'CatalogEntry',
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS containers (
+    id INTEGER PRIMARY KEY,
+    identity TEXT NOT NULL UNIQUE,
+    digest BLOB NOT NULL,
+    md5 BLOB,
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    version TEXT,
+    version_key INTEGER,
+    platform TEXT NOT NULL,
+    pack_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    ingested REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS files (
+    container_id INTEGER NOT NULL REFERENCES containers(id) ON DELETE CASCADE,
+    path_id INTEGER NOT NULL REFERENCES paths(id),
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 BLOB NOT NULL,
+    PRIMARY KEY (path_id, container_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS files_sha1 ON files(sha1);
+CREATE INDEX IF NOT EXISTS files_container ON files(container_id);
+"""
+"""Схема базы. Имена файлов хранятся один раз в таблице paths."""
+
+ENTRY_QUERY = """
+SELECT c.name, c.source, c.md5, c.version, c.platform, p.path, f.offset, f.size, f.sha1
+FROM files f JOIN containers c ON c.id = f.container_id JOIN paths p ON p.id = f.path_id
+"""
+"""Общая часть запросов записей каталога."""
+
+ENTRY_ORDER = ' ORDER BY c.version_key, c.name, c.id'
+
+
+def version_key(version: Optional[Version]) -> Optional[int]:
+    """Целочисленный ключ версии для упорядочивания в запросах."""
+
+    if version is None:
+        return None
+    a, b, c, d = version
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+
+def parse_version(s: Optional[str]) -> Optional[Version]:
+    return None if s is None else tuple(map(int, s.split('.')))
+
+
+class CatalogContainer(NamedTuple):
+    name: str
+    """Имя файла контейнера."""
+
+    source: str
+    """Путь контейнера при добавлении."""
+
+    md5: Optional[bytes]
+    """MD5 дайджест содержимого из контейнера. None, если контейнер не содержит дайджеста."""
+
+    version: Optional[Version]
+    """Версия контейнера. None, если версия отсутствует в заголовке."""
+
+    platform: str
+    """Имя целевой платформы."""
+
+    pack_type: str
+    """Имя типа упаковки."""
+
+    count: int
+    """Число файлов в образе."""
+
+
+class CatalogEntry(NamedTuple):
+    container: str
+    """Имя файла контейнера."""
+
+    source: str
+    """Путь контейнера при добавлении."""
+
+    md5: Optional[bytes]
+    """MD5 дайджест содержимого контейнера. None, если контейнер не содержит дайджеста."""
+
+    version: Optional[Version]
+    """Версия контейнера."""
+
+    platform: str
+    """Имя целевой платформы."""
+
+    path: str
+    """Внутреннее имя файла."""
+
+    offset: int
+    """Смещение данных файла в образе."""
+
+    size: int
+    """Размер данных файла."""
+
+    sha1: bytes
+    """SHA1 дайджест содержимого файла."""
+
+
+class Catalog:
+    """
+    Каталог файлов множества контейнеров.
+    Контейнер идентифицируется версией, платформой и MD5 дайджестом содержимого из заголовка,
+    для контейнера без дайджеста - MD5 дайджестом файла контейнера.
+    """
+
+    def __init__(self, path: Union[os.PathLike, str]):
+        """
+        :param path: Путь файла базы. ``:memory:`` - база в памяти.
+        :raises sqlite3.Error: Ошибка при открытии базы.
+        """
+
+        self._connection = sqlite3.connect(os.fspath(path))
+        self._connection.execute('PRAGMA foreign_keys = ON')
+        self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> 'Catalog':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @staticmethod
+    def container_digest(bin_file: BinFile, source: os.PathLike) -> bytes:
+        """
+        Дайджест для идентификации контейнера: MD5 из контейнера или MD5 файла контейнера.
+
+        :raises BinUnpackError: Ошибка при построении пространства имен.
+        :raises EnvironmentError: Ошибка при чтении контейнера.
+        """
+
+        digest = bin_file.digest
+        if digest is None:
+            m = md5()
+            with open(source, 'rb') as istream:
+                file_apply(istream, m.update, os.fstat(istream.fileno()).st_size)
+            digest = m.digest()
+        return digest
+
+    def ingest(self, source: os.PathLike, jobs: int = 1) -> bool:
+        """
+        Добавление контейнера в каталог. Содержимое файлов не распаковывается, дайджесты берутся из таблицы
+        дайджестов образа или вычисляются.
+
+        :param source: Путь контейнера.
+        :param jobs: Число потоков для вычисления дайджестов.
+        :return: False, если контейнер с той же идентичностью уже в каталоге.
+        :raises TypeError: Неверный тип source.
+        :raises BinUnpackError: Ошибка при чтении контейнера.
+        :raises VromfsUnpackError: Ошибка при чтении образа.
+        :raises EnvironmentError: Ошибка при чтении контейнера.
+        :raises sqlite3.Error: Ошибка при записи в базу.
+        """
+
+        if not isinstance(source, os.PathLike):
+            raise TypeError('source: ожидался PathLike: {}'.format(type(source)))
+
+        with BinFile(source) as bin_file:
+            digest = self.container_digest(bin_file, source)
+            version = bin_file.version
+            version_s = None if version is None else '.'.join(map(str, version))
+            identity = self.identity(digest, version_s, bin_file.platform.name)
+            if self.has_container(identity):
+                return False
+
+            vromfs = VromfsFile(bin_file)
+            records = [(fd.info.name, fd.info.offset, fd.info.size, fd.digest)
+                       for fd in vromfs.digests_iter(jobs=jobs)]
+
+            with self._connection as connection:
+                cursor = connection.execute(
+                    'INSERT INTO containers (identity, digest, md5, source, name, version, version_key, platform, '
+                    'pack_type, size, count, ingested) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (identity, digest, bin_file.digest, os.fspath(source), Path(source).name,
+                     version_s, version_key(version),
+                     bin_file.platform.name, bin_file.pack_type.name, bin_file.size, len(records), time()))
+                container_id = cursor.lastrowid
+                connection.executemany('INSERT OR IGNORE INTO paths (path) VALUES (?)',
+                                       ((record[0],) for record in records))
+                connection.executemany(
+                    'INSERT INTO files (container_id, path_id, offset, size, sha1) '
+                    'SELECT ?, id, ?, ?, ? FROM paths WHERE path = ?',
+                    ((container_id, offset, size, sha1, path) for path, offset, size, sha1 in records))
+
+        return True
+
+    @staticmethod
+    def identity(digest: bytes, version: Optional[str], platform: str) -> str:
+        """Ключ идентичности контейнера."""
+
+        return '{}:{}:{}'.format(digest.hex(), version or '', platform)
+
+    def has_container(self, identity: str) -> bool:
+        """Содержит ли каталог контейнер с ключом идентичности identity?"""
+
+        row = self._connection.execute('SELECT 1 FROM containers WHERE identity = ?', (identity,)).fetchone()
+        return row is not None
+
+    def containers(self) -> List[CatalogContainer]:
+        """Контейнеры каталога в порядке возрастания версий."""
+
+        rows = self._connection.execute(
+            'SELECT name, source, md5, version, platform, pack_type, count FROM containers '
+            'ORDER BY version_key, name, id')
+        return [CatalogContainer(name, source, md5_, parse_version(version), platform, pack_type, count)
+                for name, source, md5_, version, platform, pack_type, count in rows]
+
+    @staticmethod
+    def _entries(rows) -> Iterator[CatalogEntry]:
+        for container, source, md5_, version, platform, path, offset, size, sha1 in rows:
+            yield CatalogEntry(container, source, md5_, parse_version(version), platform, path, offset, size, sha1)
+
+    def find(self, path: Union[os.PathLike, str]) -> List[CatalogEntry]:
+        """
+        Записи о файле с внутренним именем path во всех контейнерах в порядке возрастания версий.
+
+        :param path: Внутреннее имя файла.
+        """
+
+        rows = self._connection.execute(ENTRY_QUERY + ' WHERE p.path = ?' + ENTRY_ORDER,
+                                        (Path(path).as_posix(),))
+        return list(self._entries(rows))
+
+    def find_digest(self, sha1: bytes) -> List[CatalogEntry]:
+        """
+        Записи о файлах с SHA1 дайджестом содержимого sha1 в порядке возрастания версий.
+
+        :param sha1: SHA1 дайджест.
+        """
+
+        rows = self._connection.execute(ENTRY_QUERY + ' WHERE f.sha1 = ?' + ENTRY_ORDER, (sha1,))
+        return list(self._entries(rows))
+
+    def history(self, path: Union[os.PathLike, str]) -> List[CatalogEntry]:
+        """
+        Изменения файла path: записи, в которых дайджест содержимого отличается от предыдущей версии
+        на той же платформе, в порядке возрастания версий.
+
+        :param path: Внутреннее имя файла.
+        """
+
+        changes = []
+        last = {}
+        for entry in self.find(path):
+            if last.get(entry.platform) != entry.sha1:
+                changes.append(entry)
+                last[entry.platform] = entry.sha1
+        return changes
@@ -1,15 +1,28 @@
 import io
+import os
+from pathlib import Path
+import shutil
+from tempfile import mkstemp
 import typing as t
-import construct as ct
 
 __all__ = [
     'file_apply',
+    'replace_file',
+    'write_replacing',
 ]
 
 CHUNK_SIZE = 2 ** 20
 """Размер блока по умолчанию."""
 
 
+def _read(file: io.IOBase, size: int) -> bytes:
+    data = file.read(size)
+    if len(data) != size:
+        import construct as ct
+        raise ct.StreamError('stream read less then specified amount, expected {}, found {}'.format(size, len(data)))
+    return data
+
+
 def file_apply(file: io.IOBase, f: t.Callable[[bytes], t.Any], size: int, chunk_size: int = CHUNK_SIZE):
     """
     Вспомогательная функция для обхода файла по блокам.
@@ -23,7 +36,59 @@ def file_apply(file: io.IOBase, f: t.Callable[[bytes], t.Any], size: int, chunk_
 
     n, r = divmod(size, chunk_size)
     for _ in range(n):
-        chunk = ct.stream_read(file, chunk_size)
+        chunk = _read(file, chunk_size)
         f(chunk)
-    chunk = ct.stream_read(file, r)
+    chunk = _read(file, r)
     f(chunk)
+
+
+def _new_file_mode() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return 0o666 & ~mask
+
+
+def replace_file(target: os.PathLike, make: t.Callable[[Path], t.Any]) -> None:
+    """
+    Создание файла target через временный файл рядом с ним: make заполняет временный файл по пути,
+    затем временный файл заменяет target. Target заменяется, а не перезаписывается, поэтому жесткие ссылки
+    на прежний target не изменяются, а target может быть и входным файлом.
+    Права доступа сохраняются от прежнего target, у нового файла - как у open(target, 'wb') с учетом umask.
+    Временный файл удаляется при любой ошибке, включая KeyboardInterrupt.
+
+    :param target: Путь выходного файла.
+    :param make: Заполнение временного файла.
+    :raises EnvironmentError: Ошибка при создании временного файла или замене target.
+    """
+
+    target = Path(target)
+    fd, temp_name = mkstemp(suffix='.tmp', prefix=target.name, dir=target.absolute().parent)
+    os.close(fd)
+    temp = Path(temp_name)
+    try:
+        make(temp)
+        if target.exists():
+            shutil.copymode(target, temp)
+        else:
+            os.chmod(temp, _new_file_mode())
+        os.replace(temp, target)
+    except BaseException:
+        if temp.exists():
+            temp.unlink()
+        raise
+
+
+def write_replacing(target: os.PathLike, write: t.Callable[[t.BinaryIO], t.Any]) -> None:
+    """
+    Запись в двоичный поток временного файла с заменой target, как в replace_file.
+
+    :param target: Путь выходного файла.
+    :param write: Запись в поток временного файла.
+    :raises EnvironmentError: Ошибка при создании временного файла или замене target.
+    """
+
+    def make(temp: Path) -> None:
+        with open(temp, 'wb') as ostream:
+            write(ostream)
+
+    replace_file(target, make)
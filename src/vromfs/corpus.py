@@ -0,0 +1,276 @@
+"""
+Генератор синтетических деревьев файлов и контейнеров для нагрузочного тестирования.
+Результат полностью определяется параметрами и seed.
+"""
+
+from enum import Enum
+import math
+import os
+from pathlib import Path
+import random
+from tempfile import TemporaryDirectory, TemporaryFile
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+from zstandard import ZstdCompressionDict, ZstdCompressor, ZstdError, train_dictionary
+from vromfs.bin import BinFile, PackType, PlatformType, Version
+from vromfs.dictionary import make_dict_path, select_samples
+from vromfs.vromfs import VromfsFile
+
+__all__ = [
+    'CorpusSpec',
+    'SizeDistribution',
+    'generate_bin',
+    'generate_tree',
+]
+
+VOCABULARY_SIZE = 512
+"""Число различных имен в blk-подобных файлах."""
+
+LINES_CHUNK = 4096
+"""Число строк, выбираемых за один шаг при заполнении blk-подобного файла."""
+
+DICT_SIZE = 32 * 2 ** 10
+"""Размер обучаемого словаря, байт."""
+
+MAX_SAMPLES = 10000
+"""Число образцов для обучения словаря, выбираемых из blk-подобных файлов."""
+
+MAX_SAMPLE_SIZE = 128 * 2 ** 10
+"""Размер образца, байт. Начало файла большего размера."""
+
+
+class SizeDistribution(Enum):
+    FIXED = 'fixed'
+    """Все файлы размера mean_size."""
+
+    UNIFORM = 'uniform'
+    """Равномерное распределение на 0 .. 2*mean_size."""
+
+    EXPONENTIAL = 'exponential'
+    """Экспоненциальное распределение со средним mean_size."""
+
+    LOGNORMAL = 'lognormal'
+    """Логнормальное распределение со средним mean_size, много мелких файлов и редкие крупные."""
+
+
+class CorpusSpec(NamedTuple):
+    count: int = 1000
+    """Число файлов."""
+
+    mean_size: int = 4096
+    """Средний размер файла, байт."""
+
+    distribution: SizeDistribution = SizeDistribution.LOGNORMAL
+    """Распределение размеров файлов."""
+
+    depth: int = 3
+    """Максимальная глубина вложенности директорий."""
+
+    fanout: int = 8
+    """Число различных имен директорий на каждом уровне."""
+
+    blk_share: float = 0.8
+    """Доля blk-подобных, хорошо сжимаемых, файлов. Остальные файлы содержат случайные байты."""
+
+    nm: bool = False
+    """Добавить общую таблицу имен nm."""
+
+    dictionary: bool = False
+    """Обучить и добавить zstd словарь по содержимому blk-подобных файлов."""
+
+    seed: int = 0
+    """Начальное значение генератора случайных чисел."""
+
+
+def _check_spec(spec: CorpusSpec) -> None:
+    if not isinstance(spec.distribution, SizeDistribution):
+        raise TypeError('distribution: ожидался SizeDistribution: {}'.format(type(spec.distribution)))
+    for name in ('count', 'mean_size', 'depth'):
+        value = getattr(spec, name)
+        if value < 0:
+            raise ValueError('{}: ожидалось неотрицательное: {}'.format(name, value))
+    if spec.fanout < 1:
+        raise ValueError('fanout: ожидалось положительное: {}'.format(spec.fanout))
+    if not 0.0 <= spec.blk_share <= 1.0:
+        raise ValueError('blk_share: ожидалось 0.0 .. 1.0: {}'.format(spec.blk_share))
+
+
+def _make_vocabulary(rng: random.Random) -> List[str]:
+    syllables = ('ai', 'ar', 'co', 'de', 'en', 'fu', 'gun', 'mass', 'na', 'or', 'pa', 're', 'speed', 'ta', 'wing')
+    names = set()
+    while len(names) < VOCABULARY_SIZE:
+        parts = rng.choices(syllables, k=rng.randint(2, 4))
+        names.add(parts[0] + ''.join(p.capitalize() for p in parts[1:]))
+    return sorted(names)
+
+
+def _make_lines(rng: random.Random, vocabulary: Sequence[str]) -> List[str]:
+    lines = []
+    for name in vocabulary:
+        kind = rng.randrange(5)
+        if kind == 0:
+            lines.append(f'{name}:i={rng.randint(-1000, 100000)}\n')
+        elif kind == 1:
+            lines.append(f'{name}:r={rng.uniform(-100.0, 100.0):.3f}\n')
+        elif kind == 2:
+            lines.append(f'{name}:b={rng.choice(("yes", "no"))}\n')
+        elif kind == 3:
+            lines.append(f'{name}:t="{rng.choice(vocabulary)}"\n')
+        else:
+            lines.append(f'{name}{{\n')
+            lines.append('}\n')
+    return lines
+
+
+def _blk_content(rng: random.Random, lines: Sequence[str], size: int) -> bytes:
+    parts = []
+    total = 0
+    while total < size:
+        chunk = ''.join(rng.choices(lines, k=LINES_CHUNK)).encode()
+        parts.append(chunk)
+        total += len(chunk)
+    return b''.join(parts)[:size]
+
+
+def _random_content(rng: random.Random, size: int) -> bytes:
+    return rng.getrandbits(size * 8).to_bytes(size, 'little') if size else b''
+
+
+def _file_size(rng: random.Random, spec: CorpusSpec) -> int:
+    mean = spec.mean_size
+    if spec.distribution is SizeDistribution.FIXED:
+        return mean
+    if mean == 0:
+        return 0
+    if spec.distribution is SizeDistribution.UNIFORM:
+        return rng.randint(0, 2 * mean)
+    if spec.distribution is SizeDistribution.EXPONENTIAL:
+        return int(rng.expovariate(1.0 / mean))
+    sigma = 1.0
+    return int(rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma))
+
+
+def _rpath(rng: random.Random, spec: CorpusSpec, i: int, is_blk: bool) -> Path:
+    level = rng.randint(0, spec.depth)
+    parts = [f'dir_{rng.randrange(spec.fanout):02}' for _ in range(level)]
+    parts.append('file_{:06}.{}'.format(i, 'blk' if is_blk else 'bin'))
+    return Path(*parts)
+
+
+def _write_nm(path: Path, vocabulary: Sequence[str], dict_data: Optional[bytes]) -> None:
+    from blk.types import Name
+    from vromfs.files.shared_names import InvNamesMap, serialize_shared_names
+
+    if dict_data is None:
+        cctx = ZstdCompressor()
+        dict_path = None
+    else:
+        cctx = ZstdCompressor(dict_data=ZstdCompressionDict(dict_data))
+        dict_path = make_dict_path(dict_data)
+
+    inv_names_map = InvNamesMap.of(map(Name, vocabulary))
+    with open(path, 'wb') as ostream:
+        serialize_shared_names(inv_names_map, ostream, cctx, dict_path)
+
+
+def generate_tree(root: os.PathLike, spec: CorpusSpec = CorpusSpec()) -> Sequence[Path]:
+    """
+    Формирование дерева файлов в директории root.
+
+    :param root: Путь выходной директории.
+    :param spec: Параметры дерева.
+    :return: Последовательность относительных путей созданных файлов.
+    :raises TypeError: Неверный тип root. Неверный тип распределения.
+    :raises ValueError: Неверное значение параметра. Недостаточно данных для обучения словаря.
+    :raises EnvironmentError: Ошибка при записи файла.
+    """
+
+    if not isinstance(root, os.PathLike):
+        raise TypeError('root: ожидался PathLike: {}'.format(type(root)))
+    root = Path(root)
+    _check_spec(spec)
+
+    rng = random.Random(spec.seed)
+    vocabulary = _make_vocabulary(rng)
+    lines = _make_lines(rng, vocabulary)
+
+    rpaths = []
+
+    def write_files() -> Iterator[bytes]:
+        for i in range(spec.count):
+            is_blk = rng.random() < spec.blk_share
+            rpath = _rpath(rng, spec, i, is_blk)
+            size = _file_size(rng, spec)
+            content = _blk_content(rng, lines, size) if is_blk else _random_content(rng, size)
+            path = root / rpath
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content)
+            rpaths.append(rpath)
+            if spec.dictionary and is_blk and content:
+                yield content[:MAX_SAMPLE_SIZE]
+
+    # Образцы выбираются по мере записи: в памяти не более MAX_SAMPLES образцов, а не содержимое всего дерева.
+    samples = select_samples(write_files(), MAX_SAMPLES, seed=spec.seed)
+
+    dict_data = None
+    if spec.dictionary:
+        try:
+            dict_data = train_dictionary(DICT_SIZE, samples, level=3).as_bytes()
+        except ZstdError as e:
+            raise ValueError('Недостаточно blk-подобных файлов для обучения словаря.') from e
+        rpath = make_dict_path(dict_data)
+        (root / rpath).write_bytes(dict_data)
+        rpaths.append(rpath)
+
+    if spec.nm:
+        rpath = Path('nm')
+        _write_nm(root / rpath, vocabulary, dict_data)
+        rpaths.append(rpath)
+
+    return rpaths
+
+
+def generate_bin(target: os.PathLike, spec: CorpusSpec = CorpusSpec(),
+                 pack_type: PackType = PackType.ZSTD_OBFS, version: Optional[Version] = None,
+                 platform: PlatformType = PlatformType.PC, extended: bool = False, checked: bool = False,
+                 tree: Optional[os.PathLike] = None) -> int:
+    """
+    Формирование bin контейнера со случайным деревом файлов.
+    Дерево строится во временной директории, если tree не указан.
+
+    :param target: Путь выходного контейнера.
+    :param spec: Параметры дерева.
+    :param pack_type: Тип упаковки контейнера.
+    :param version: Версия контейнера. Заголовок VRFx, если указана, иначе VRFs.
+    :param platform: Тип платформы.
+    :param extended: Образ содержит заголовок с указателем на таблицу дайджестов.
+    :param checked: Образ содержит таблицу SHA1 дайджестов.
+    :param tree: Путь директории для сохранения дерева файлов.
+    :return: Размер образа VROMFS, байт.
+    :raises TypeError: Неверный тип target, tree, pack_type.
+    :raises ValueError: Неверное значение параметра дерева.
+    :raises VromfsPackError: Ошибка при формировании образа.
+    :raises BinPackError: Ошибка при формировании контейнера.
+    :raises EnvironmentError: Ошибка при записи.
+    """
+
+    if not isinstance(target, os.PathLike):
+        raise TypeError('target: ожидался PathLike: {}'.format(type(target)))
+    if not isinstance(pack_type, PackType):
+        raise TypeError('pack_type: ожидался PackType: {}'.format(type(pack_type)))
+
+    compressed = pack_type is not PackType.PLAIN
+    checked_bin = pack_type is not PackType.ZSTD_OBFS_NOCHECK
+
+    with TemporaryDirectory() as tmp_root:
+        root = Path(tmp_root) if tree is None else Path(tree)
+        root.mkdir(parents=True, exist_ok=True)
+        generate_tree(root, spec)
+
+        with TemporaryFile() as vromfs_stream:
+            VromfsFile.pack_into(root, vromfs_stream, extended, checked)
+            size = vromfs_stream.tell()
+            vromfs_stream.seek(0)
+            with open(target, 'wb') as bin_stream:
+                BinFile.pack_into(vromfs_stream, bin_stream, platform, version, compressed, checked_bin, size)
+
+    return size
@@ -0,0 +1,389 @@
+"""
+Разностные патчи между версиями vromfs bin контейнера на уровне файлов образа VROMFS.
+
+Новый образ описывается последовательностью сегментов, покрывающих его от начала до конца:
+копия диапазона старого образа для файлов с теми же SHA1 и размером, zstd кадр, сжатый со старым содержимым файла
+в качестве словаря, как ``zstd --patch-from``, для измененных файлов и метаданных, и обычный zstd кадр
+для новых данных. Данные, которые не помещаются в словарь, разбиваются на кадры по CHUNK_SIZE,
+поэтому в памяти одновременно находится не более двух файлов размера до MAX_DELTA_SIZE.
+
+Применение патча восстанавливает образ, проверяет MD5 образа - дайджест BinFile, и упаковывает контейнер
+с параметрами нового контейнера. Если при создании патча повторная упаковка нового образа дала тот же контейнер,
+патч помечен как точный, и при применении проверяется SHA1 всего контейнера.
+
+Формат патча: заголовок HEADER, параметры контейнера CONTAINER и дополнительные данные контейнера,
+сегменты SEGMENT с данными, сегмент END.
+"""
+
+from hashlib import md5, sha1
+from io import IOBase
+import os
+from pathlib import Path
+import struct
+from tempfile import TemporaryFile
+from typing import TYPE_CHECKING, Iterator, Optional, Tuple
+from vromfs.bin import BinFile, PackType, PlatformType
+from vromfs.common import CHUNK_SIZE
+from vromfs.spool_reader import SpoolReader
+
+if TYPE_CHECKING:
+    from zstandard import ZstdCompressionDict
+
+__all__ = [
+    'DeltaError',
+    'DeltaReport',
+    'apply_patch',
+    'make_patch',
+]
+
+MAGIC = b'VRFSDLT\x01'
+
+HEADER = struct.Struct('<8s16s16sQQ')
+"""Сигнатура, MD5 старого и нового образов, размеры старого и нового образов."""
+
+CONTAINER = struct.Struct('<4sBB4BB20sH')
+"""
+Параметры нового контейнера: платформа, тип упаковки, наличие версии, версия, точность патча,
+SHA1 контейнера, размер дополнительных данных.
+"""
+
+SEGMENT = struct.Struct('<BQQQQ')
+"""Тип сегмента, смещение и размер словаря в старом образе, размер данных в новом образе, размер кадра."""
+
+COPY = 0
+"""Копия диапазона старого образа: смещение, -, размер."""
+
+DATA = 1
+"""Zstd кадр без словаря: -, -, размер, размер кадра."""
+
+DELTA = 2
+"""Zstd кадр со словарем из старого образа: смещение словаря, размер словаря, размер, размер кадра."""
+
+END = 0xff
+
+MAX_DELTA_SIZE = 2 ** 26
+"""Наибольший размер словаря и данных разностного кадра, байт."""
+
+MAX_WINDOW_LOG = 27
+"""Наибольшее окно zstd, достаточное для словаря и данных размера MAX_DELTA_SIZE."""
+
+LEVEL = 19
+"""Уровень сжатия по умолчанию: патч создается один раз и загружается многократно."""
+
+
+class DeltaError(Exception):
+    pass
+
+
+class DeltaReport:
+    """Сводка создания патча. Заполняется, если передана как параметр report."""
+
+    def __init__(self):
+        self.copied = 0
+        """Число файлов, скопированных из старого образа."""
+
+        self.changed = 0
+        """Число файлов, сжатых со старым содержимым в качестве словаря."""
+
+        self.added = 0
+        """Число файлов без пары в старом образе."""
+
+        self.image_size = 0
+        """Размер нового образа."""
+
+        self.patch_size = 0
+        """Размер патча."""
+
+        self.exact = False
+        """Восстанавливает ли патч контейнер побайтно."""
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self) -> str:
+        return '{}({})'.format(type(self).__name__, ', '.join(f'{k}={v!r}' for k, v in vars(self).items()))
+
+
+class _Writer(IOBase):
+    """Поток записи, считающий SHA1 и размер записанных данных. Данные передаются в ostream, если задан."""
+
+    def __init__(self, ostream: Optional[IOBase] = None):
+        self._ostream = ostream
+        self.m = sha1()
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.m.update(b)
+        self.size += len(b)
+        if self._ostream is not None:
+            self._ostream.write(b)
+        return len(b)
+
+
+def _image(bin_file: BinFile) -> IOBase:
+    """Образ контейнера с произвольным доступом."""
+
+    bin_file.seek(0)
+    return SpoolReader(bin_file) if bin_file.compressed else bin_file.stream
+
+
+def _read_at(image: IOBase, offset: int, size: int) -> bytes:
+    image.seek(offset)
+    data = image.read(size)
+    if len(data) != size:
+        raise DeltaError('Неожиданный конец образа: смещение {}, размер {}.'.format(offset, size))
+    return data
+
+
+def _ranges(image: IOBase, offset: int, size: int) -> Iterator[bytes]:
+    end = offset + size
+    while offset < end:
+        n = min(CHUNK_SIZE, end - offset)
+        yield _read_at(image, offset, n)
+        offset += n
+
+
+def _image_md5(image: IOBase, size: int) -> bytes:
+    m = md5()
+    for chunk in _ranges(image, 0, size):
+        m.update(chunk)
+    return m.digest()
+
+
+def _raw_dict(ref: bytes) -> 'ZstdCompressionDict':
+    from zstandard import DICT_TYPE_RAWCONTENT, ZstdCompressionDict
+
+    return ZstdCompressionDict(ref, dict_type=DICT_TYPE_RAWCONTENT)
+
+
+def _delta_compress(ref: bytes, data: bytes, level: int) -> bytes:
+    """Сжатие data с содержимым ref в качестве словаря и окном, охватывающим словарь и данные."""
+
+    from zstandard import ZstdCompressionParameters, ZstdCompressor
+
+    window_log = min(MAX_WINDOW_LOG, max(10, (len(ref) + len(data)).bit_length()))
+    params = ZstdCompressionParameters.from_level(level, window_log=window_log)
+    return ZstdCompressor(dict_data=_raw_dict(ref), compression_params=params).compress(data)
+
+
+def _delta_decompress(ref: bytes, frame: bytes) -> bytes:
+    from zstandard import ZstdDecompressor
+
+    return ZstdDecompressor(dict_data=_raw_dict(ref), max_window_size=2 ** MAX_WINDOW_LOG).decompress(frame)
+
+
+def _pack(image: IOBase, size: int, platform: PlatformType, pack_type: PackType, version, extra: bytes,
+          ostream: IOBase) -> None:
+    image.seek(0)
+    BinFile.pack_into(image, ostream, platform, version, compressed=pack_type is not PackType.PLAIN,
+                      checked=pack_type is not PackType.ZSTD_OBFS_NOCHECK, size=size, extra=extra or None)
+
+
+def _file_sha1(path: os.PathLike) -> bytes:
+    m = sha1()
+    with open(path, 'rb') as istream:
+        for chunk in iter(lambda: istream.read(CHUNK_SIZE), b''):
+            m.update(chunk)
+    return m.digest()
+
+
+def make_patch(old: os.PathLike, new: os.PathLike, ostream: IOBase, level: int = LEVEL,
+               report: Optional[DeltaReport] = None, jobs: int = 1) -> DeltaReport:
+    """
+    Запись в ostream патча, восстанавливающего контейнер new из контейнера old.
+    Измененные файлы определяются по таблицам дайджестов, для образов без таблиц дайджесты вычисляются
+    пулом из jobs потоков.
+
+    :param old: Путь старого контейнера.
+    :param new: Путь нового контейнера.
+    :param ostream: Выходной поток патча.
+    :param level: Уровень сжатия.
+    :param report: Сводка, заполняется при создании патча.
+    :return: Сводка.
+    :raises TypeError: Неверный тип old или new.
+    :raises BinUnpackError: Ошибка при чтении контейнера.
+    :raises VromfsUnpackError: Ошибка при построении пространства имен.
+    :raises DeltaError: Неожиданный конец образа.
+    :raises EnvironmentError: Ошибка чтения или записи.
+    """
+
+    from zstandard import ZstdCompressor
+    from vromfs.vromfs import VromfsFile
+
+    for name, value in ('old', old), ('new', new):
+        if not isinstance(value, os.PathLike):
+            raise TypeError('{}: ожидался PathLike: {}'.format(name, type(value)))
+    if report is None:
+        report = DeltaReport()
+
+    with BinFile(old) as old_bin, BinFile(new) as new_bin:
+        old_image, new_image = _image(old_bin), _image(new_bin)
+        old_size, new_size = old_bin.size, new_bin.size
+        old_vromfs, new_vromfs = VromfsFile(old_image), VromfsFile(new_image)
+
+        old_infos = {info.name: info for info in old_vromfs.info_list}
+        old_blocks = {(fd.digest, fd.info.size): fd.info.offset for fd in old_vromfs.digests_iter(jobs=jobs)}
+        new_digests = {fd.info.name: fd.digest for fd in new_vromfs.digests_iter(jobs=jobs)}
+        old_data = min((info.offset for info in old_infos.values()), default=old_size)
+
+        platform, pack_type, version, extra = new_bin.platform, new_bin.pack_type, new_bin.version, new_bin.meta.extra
+        new_sha1 = _file_sha1(new)
+        writer = _Writer()
+        _pack(new_image, new_size, platform, pack_type, version, extra, writer)
+        report.exact = writer.m.digest() == new_sha1
+        report.image_size = new_size
+
+        out = _Writer(ostream)
+        out.write(HEADER.pack(MAGIC, _image_md5(old_image, old_size), _image_md5(new_image, new_size),
+                              old_size, new_size))
+        out.write(CONTAINER.pack(platform.value, pack_type.value, version is not None, *(version or (0, 0, 0, 0)),
+                                 report.exact, new_sha1 if report.exact else bytes(20), len(extra)))
+        out.write(extra)
+
+        cctx = ZstdCompressor(level=level)
+
+        def data(offset: int, size: int) -> None:
+            for chunk in _ranges(new_image, offset, size):
+                frame = cctx.compress(chunk)
+                out.write(SEGMENT.pack(DATA, 0, 0, len(chunk), len(frame)))
+                out.write(frame)
+
+        def delta(ref_offset: int, ref_size: int, offset: int, size: int) -> None:
+            if not ref_size or ref_size > MAX_DELTA_SIZE or size > MAX_DELTA_SIZE:
+                data(offset, size)
+                return
+            frame = _delta_compress(_read_at(old_image, ref_offset, ref_size), _read_at(new_image, offset, size),
+                                    level)
+            out.write(SEGMENT.pack(DELTA, ref_offset, ref_size, size, len(frame)))
+            out.write(frame)
+
+        pos = 0
+        for info in sorted(new_vromfs.info_list, key=lambda i: (i.offset, i.size)):
+            end = info.offset + info.size
+            if end <= pos or not info.size:
+                continue
+            if info.offset > pos:
+                # Метаданные перед первым файлом сжимаются с метаданными старого образа, остальное - выравнивание.
+                if pos == 0:
+                    delta(0, old_data, 0, info.offset)
+                else:
+                    data(pos, info.offset - pos)
+            elif info.offset < pos:
+                data(pos, end - pos)
+                pos = end
+                continue
+
+            old_offset = old_blocks.get((new_digests[info.name], info.size))
+            old_info = old_infos.get(info.name)
+            if old_offset is not None:
+                out.write(SEGMENT.pack(COPY, old_offset, 0, info.size, 0))
+                report.copied += 1
+            elif old_info is not None and old_info.size:
+                delta(old_info.offset, old_info.size, info.offset, info.size)
+                report.changed += 1
+            else:
+                data(info.offset, info.size)
+                report.added += 1
+            pos = end
+
+        if pos == 0 and new_size:
+            delta(0, old_data, 0, new_size)
+        elif pos < new_size:
+            data(pos, new_size - pos)
+        out.write(SEGMENT.pack(END, 0, 0, 0, 0))
+
+        if isinstance(old_image, SpoolReader):
+            old_image.close()
+        if isinstance(new_image, SpoolReader):
+            new_image.close()
+
+    report.patch_size = out.size
+    return report
+
+
+def _read_exactly(istream: IOBase, size: int) -> bytes:
+    data = istream.read(size)
+    if len(data) != size:
+        raise DeltaError('Неожиданный конец патча.')
+    return data
+
+
+def _segments(istream: IOBase) -> Iterator[Tuple[int, int, int, int, bytes]]:
+    while True:
+        kind, ref_offset, ref_size, size, frame_size = SEGMENT.unpack(_read_exactly(istream, SEGMENT.size))
+        if kind == END:
+            return
+        if kind not in (COPY, DATA, DELTA):
+            raise DeltaError('Неизвестный тип сегмента: {}'.format(kind))
+        yield kind, ref_offset, ref_size, size, _read_exactly(istream, frame_size)
+
+
+def apply_patch(old: os.PathLike, istream: IOBase, ostream: IOBase) -> bool:
+    """
+    Восстановление нового контейнера из контейнера old и патча istream с записью в ostream.
+    Образ собирается во временном файле.
+
+    :param old: Путь старого контейнера.
+    :param istream: Входной поток патча.
+    :param ostream: Выходной поток контейнера.
+    :return: Проверен ли контейнер побайтно. False, если патч не точный и проверен только MD5 образа.
+    :raises TypeError: Неверный тип old.
+    :raises BinUnpackError: Ошибка при чтении контейнера.
+    :raises DeltaError: Неверный формат патча. Патч создан для другого контейнера.
+        MD5 образа или SHA1 контейнера не совпали.
+    :raises EnvironmentError: Ошибка чтения или записи.
+    """
+
+    from zstandard import ZstdDecompressor, ZstdError
+
+    if not isinstance(old, os.PathLike):
+        raise TypeError('old: ожидался PathLike: {}'.format(type(old)))
+
+    magic, old_md5, new_md5, old_size, new_size = HEADER.unpack(_read_exactly(istream, HEADER.size))
+    if magic != MAGIC:
+        raise DeltaError('Неверная сигнатура патча: {!r}'.format(magic))
+    platform, pack_type, has_version, v0, v1, v2, v3, exact, new_sha1, extra_size = \
+        CONTAINER.unpack(_read_exactly(istream, CONTAINER.size))
+    extra = _read_exactly(istream, extra_size)
+    try:
+        platform, pack_type = PlatformType(platform), PackType(pack_type)
+    except ValueError as e:
+        raise DeltaError('Неверные параметры контейнера.') from e
+    version = (v0, v1, v2, v3) if has_version else None
+
+    dctx = ZstdDecompressor()
+    with BinFile(Path(old)) as old_bin, TemporaryFile() as image:
+        old_image = _image(old_bin)
+        if old_bin.size != old_size or _image_md5(old_image, old_size) != old_md5:
+            raise DeltaError('Патч создан для другого контейнера.')
+
+        m = md5()
+        for kind, ref_offset, ref_size, size, frame in _segments(istream):
+            try:
+                if kind == COPY:
+                    chunks = _ranges(old_image, ref_offset, size)
+                elif kind == DATA:
+                    chunks = [dctx.decompress(frame)]
+                else:
+                    chunks = [_delta_decompress(_read_at(old_image, ref_offset, ref_size), frame)]
+                for chunk in chunks:
+                    m.update(chunk)
+                    image.write(chunk)
+            except ZstdError as e:
+                raise DeltaError('Ошибка распаковки сегмента.') from e
+
+        if isinstance(old_image, SpoolReader):
+            old_image.close()
+
+        if image.tell() != new_size or m.digest() != new_md5:
+            raise DeltaError('MD5 восстановленного образа не совпал.')
+
+        writer = _Writer(ostream)
+        _pack(image, new_size, platform, pack_type, version, extra, writer)
+
+    if exact and writer.m.digest() != new_sha1:
+        raise DeltaError('SHA1 восстановленного контейнера не совпал.')
+    return bool(exact)
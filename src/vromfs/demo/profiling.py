@@ -0,0 +1,112 @@
+"""
+Профилирование этапов работы CLI: cProfile и пиковая память tracemalloc для каждого этапа.
+"""
+
+from contextlib import contextmanager
+import logging
+import os
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Iterator, List, NamedTuple, Optional, Tuple
+
+__all__ = [
+    'PhaseReport',
+    'Profiler',
+]
+
+if TYPE_CHECKING:
+    import cProfile
+
+TOP_FUNCTIONS = 3
+"""Число функций с наибольшим собственным временем в сводке этапа."""
+
+
+class PhaseReport(NamedTuple):
+    name: str
+    """Имя этапа."""
+
+    time: float
+    """Время этапа, с."""
+
+    peak: int
+    """Пиковый объем памяти, выделенной за этап, байт."""
+
+    top: List[Tuple[str, float]]
+    """Функции с наибольшим собственным временем: (функция, время, с)."""
+
+
+class Profiler:
+    """
+    Профилировщик этапов.
+    Для каждого этапа в выходную директорию записываются ``NN_name.pstats`` и ``NN_name.tracemalloc``.
+    Если директория не указана, этапы не профилируются.
+    """
+
+    def __init__(self, path: Optional[os.PathLike] = None):
+        """
+        :param path: Выходная директория.
+        """
+
+        self._path = None if path is None else Path(path)
+        self._reports: List[PhaseReport] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self._path is not None
+
+    @property
+    def reports(self) -> List[PhaseReport]:
+        return self._reports
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Профилирование этапа name.
+
+        :param name: Имя этапа.
+        :raises EnvironmentError: Ошибка при записи результатов.
+        """
+
+        if self._path is None:
+            yield
+            return
+
+        import cProfile
+        import tracemalloc
+
+        self._path.mkdir(parents=True, exist_ok=True)
+        stem = '{:02}_{}'.format(len(self._reports), name)
+        profile = cProfile.Profile()
+        tracemalloc.start()
+        t0 = perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            time = perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+            profile.dump_stats(self._path / f'{stem}.pstats')
+            snapshot.dump(str(self._path / f'{stem}.tracemalloc'))
+            self._reports.append(PhaseReport(name, time, peak, self._top(profile)))
+
+    @staticmethod
+    def _top(profile: 'cProfile.Profile') -> List[Tuple[str, float]]:
+        import pstats
+
+        stats = pstats.Stats(profile).stats
+        items = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:TOP_FUNCTIONS]
+        return [('{}:{}({})'.format(Path(file).name, line, func), tt) for (file, line, func), (_, _, tt, _, _)
+                in items]
+
+    def log_summary(self, logger: logging.Logger) -> None:
+        """Вывод сводки по этапам."""
+
+        for report in self._reports:
+            top = ', '.join(f'{func} {tt:.3f}s' for func, tt in report.top)
+            logger.info(f'[PROF] {report.name}: {report.time:.3f}s, пик памяти {report.peak} байт; {top}')
+        if self._path is not None:
+            logger.info(f'[PROF] Результаты профилирования: {self._path}')
@@ -0,0 +1,84 @@
+from argparse import ArgumentParser, Namespace
+import json
+import logging
+import os
+from pathlib import Path
+import sys
+from typing import NamedTuple, Optional
+from vromfs.bin import BinPackError, BinUnpackError
+from vromfs.common import write_replacing
+from vromfs.demo.vromfs_bin_unpacker import logger
+from vromfs.vromfs import VromfsUnpackError
+
+
+class Args(NamedTuple):
+    @classmethod
+    def from_namespace(cls, ns: Namespace) -> 'Args':
+        return cls(**vars(ns))
+
+    command: str
+    old_path: Path
+    out_path: Path
+    new_path: Optional[Path] = None
+    patch_path: Optional[Path] = None
+    level: int = 19
+    jobs: int = 1
+
+
+def get_args() -> Args:
+    parser = ArgumentParser(description='Разностные патчи между версиями vromfs bin контейнера.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    make = subparsers.add_parser('make', help='Создать патч.')
+    make.add_argument('-o', '--output', dest='out_path', type=Path, required=True, help='Файл патча.')
+    make.add_argument('--level', dest='level', type=int, default=19,
+                      help='Уровень сжатия. По умолчанию %(default)s.')
+    make.add_argument('-j', '--jobs', dest='jobs', type=int, default=os.cpu_count() or 1,
+                      help='Число потоков для вычисления дайджестов. По умолчанию %(default)s.')
+    make.add_argument(dest='old_path', type=Path, help='Старый контейнер.')
+    make.add_argument(dest='new_path', type=Path, help='Новый контейнер.')
+
+    apply = subparsers.add_parser('apply', help='Применить патч.')
+    apply.add_argument('-o', '--output', dest='out_path', type=Path, required=True, help='Новый контейнер.')
+    apply.add_argument(dest='old_path', type=Path, help='Старый контейнер.')
+    apply.add_argument(dest='patch_path', type=Path, help='Файл патча.')
+
+    args = parser.parse_args()
+    for path in (args.old_path, getattr(args, 'new_path', None), getattr(args, 'patch_path', None)):
+        if path is not None and not path.is_file():
+            parser.error('Файл не найден: {!r}'.format(str(path)))
+    if args.command == 'make' and args.jobs < 1:
+        parser.error('Число потоков должно быть положительным.')
+    return Args.from_namespace(args)
+
+
+def main() -> int:
+    args = get_args()
+    logger.setLevel(logging.INFO)
+
+    from vromfs.delta import DeltaError, DeltaReport, apply_patch, make_patch
+
+    try:
+        if args.command == 'make':
+            report = DeltaReport()
+            write_replacing(args.out_path, lambda ostream: make_patch(args.old_path, args.new_path, ostream,
+                                                                      args.level, report, args.jobs))
+            print(json.dumps(report.as_dict()))
+            if not report.exact:
+                logger.warning('Повторная упаковка не воспроизводит контейнер побайтно: '
+                               'при применении патча проверяется только MD5 образа.')
+        else:
+            result = []
+            with open(args.patch_path, 'rb') as istream:
+                write_replacing(args.out_path, lambda ostream: result.append(
+                    apply_patch(args.old_path, istream, ostream)))
+            logger.info(f'{args.old_path} + {args.patch_path} => {args.out_path}, '
+                        f'проверка: {"SHA1 контейнера" if result[0] else "MD5 образа"}')
+    except (DeltaError, BinUnpackError, BinPackError, VromfsUnpackError, EnvironmentError) as e:
+        logger.error(f'Ошибка: {e}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+import sys
+from typing import NamedTuple, Optional
+from vromfs.bin import BinPackError, PackType, Version
+from vromfs.corpus import CorpusSpec, SizeDistribution, generate_bin
+from vromfs.demo.vromfs_bin_packer import MakeVersion, logger
+from vromfs.vromfs import VromfsPackError
+
+
+class Args(NamedTuple):
+    @classmethod
+    def from_namespace(cls, ns: Namespace) -> 'Args':
+        return cls(**vars(ns))
+
+    count: int
+    mean_size: int
+    distribution: str
+    depth: int
+    fanout: int
+    blk_share: float
+    nm: bool
+    dictionary: bool
+    seed: int
+    pack_type: str
+    version: Optional[Version]
+    extended: bool
+    checked: bool
+    tree: Optional[Path]
+    out_path: Path
+
+
+def get_args() -> Args:
+    parser = ArgumentParser(description='Генератор синтетического vromfs bin контейнера.')
+    parser.add_argument('-n', '--count', dest='count', type=int, default=1000,
+                        help='Число файлов. По умолчанию %(default)s.')
+    parser.add_argument('--size', dest='mean_size', type=int, default=4096,
+                        help='Средний размер файла, байт. По умолчанию %(default)s.')
+    parser.add_argument('--distribution', dest='distribution', choices=[d.value for d in SizeDistribution],
+                        default=SizeDistribution.LOGNORMAL.value,
+                        help='Распределение размеров файлов. По умолчанию %(default)s.')
+    parser.add_argument('--depth', dest='depth', type=int, default=3,
+                        help='Максимальная глубина вложенности директорий. По умолчанию %(default)s.')
+    parser.add_argument('--fanout', dest='fanout', type=int, default=8,
+                        help='Число имен директорий на уровне. По умолчанию %(default)s.')
+    parser.add_argument('--blk_share', dest='blk_share', type=float, default=0.8,
+                        help='Доля blk-подобных файлов. По умолчанию %(default)s.')
+    parser.add_argument('--nm', dest='nm', action='store_true', default=False,
+                        help='Добавить общую таблицу имен nm.')
+    parser.add_argument('--dict', dest='dictionary', action='store_true', default=False,
+                        help='Обучить и добавить zstd словарь.')
+    parser.add_argument('--seed', dest='seed', type=int, default=0,
+                        help='Начальное значение генератора. По умолчанию %(default)s.')
+    parser.add_argument('--pack', dest='pack_type', choices=[p.name.lower() for p in PackType],
+                        default=PackType.ZSTD_OBFS.name.lower(),
+                        help='Тип упаковки контейнера. По умолчанию %(default)s.')
+    parser.add_argument('-v', '--ver', dest='version', action=MakeVersion, default=None,
+                        help='Версия архива xxx.yyy.zzz.www, заголовок VRFx. Если не указана, заголовок VRFs.')
+    parser.add_argument('--extended', dest='extended', action='store_true', default=False,
+                        help='Образ с заголовком таблицы дайджестов.')
+    parser.add_argument('--checked', dest='checked', action='store_true', default=False,
+                        help='Образ с таблицей SHA1 дайджестов, предполагает --extended.')
+    parser.add_argument('--tree', dest='tree', type=Path, default=None,
+                        help='Сохранить дерево файлов в указанной директории.')
+    parser.add_argument('-o', '--output', dest='out_path', type=Path, default=Path('gen.vromfs.bin'),
+                        help='Выходной файл. По умолчанию %(default)s.')
+
+    args = parser.parse_args()
+    if args.checked:
+        args.extended = True
+    return Args.from_namespace(args)
+
+
+def main() -> int:
+    args = get_args()
+    spec = CorpusSpec(
+        count=args.count,
+        mean_size=args.mean_size,
+        distribution=SizeDistribution(args.distribution),
+        depth=args.depth,
+        fanout=args.fanout,
+        blk_share=args.blk_share,
+        nm=args.nm,
+        dictionary=args.dictionary,
+        seed=args.seed,
+    )
+    pack_type = PackType[args.pack_type.upper()]
+
+    try:
+        size = generate_bin(args.out_path, spec, pack_type, args.version,
+                            extended=args.extended, checked=args.checked, tree=args.tree)
+    except (ValueError, VromfsPackError, BinPackError) as e:
+        logger.error(f'Ошибка при формировании {args.out_path}')
+        logger.exception(e)
+        return 1
+
+    logger.debug(f'Размер образа: {size}')
+    logger.info(f'{spec.count} файлов, {pack_type.name} => {args.out_path}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,16 @@
 from argparse import Action, ArgumentError, ArgumentParser, Namespace
-import os.path
-from io import BytesIO, SEEK_END
+import os
+from io import SEEK_END
 import logging
 from pathlib import Path
 import sys
-from typing import NamedTuple, Optional, Type
+from tempfile import TemporaryDirectory, TemporaryFile
+from typing import Any, Dict, NamedTuple, Optional, Type
 from vromfs.bin import BinFile, Version, BinPackError, PlatformType
-from vromfs.vromfs import VromfsFile, VromfsPackError
+from vromfs.common import write_replacing
+from vromfs.demo.profiling import Profiler
+from vromfs.files.errors import ConstructError
+from vromfs.vromfs import Layout, PackReport, VromfsFile, VromfsPackError
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -30,6 +34,16 @@ class Args(NamedTuple):
 
     version: Version
     out_path: Path
+    profile_path: Optional[Path]
+    jobs: int
+    dedup: bool
+    layout: Layout
+    slim: bool
+    dict_path: Optional[Path]
+    train_dict: bool
+    cache_path: Optional[Path]
+    cache_hash: bool
+    cache_link: bool
     in_path: Path
 
 
@@ -81,40 +95,149 @@ def get_args() -> Args:
                         help='Версия архива xxx.yyy.zzz.www')
     parser.add_argument('-o', '--output', dest='out_path', type=Path, default=Path('out.vromfs.bin'),
                         help='Выходной файл. По умолчанию %(default)s')
+    parser.add_argument('--profile', dest='profile_path', type=Path, default=None,
+                        help='Директория для результатов cProfile и tracemalloc по этапам.')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=os.cpu_count() or 1,
+                        help='Число потоков для чтения файлов. По умолчанию число процессоров: %(default)s.')
+    parser.add_argument('--dedup', action='store_true', default=False,
+                        help='Файлы с одинаковым содержимым ссылаются на один блок данных.')
+    parser.add_argument('--layout', dest='layout', choices=[layout.value for layout in Layout],
+                        default=Layout.PATH.value,
+                        help='Порядок размещения данных файлов. По умолчанию %(default)s.')
+    parser.add_argument('--slim', action='store_true', default=False,
+                        help='Преобразовать FAT blk в SLIM_ZST_DICT с общей таблицей имен nm.')
+    parser.add_argument('--dict', dest='dict_path', type=Path, default=None,
+                        help='Словарь zstd для --slim.')
+    parser.add_argument('--train_dict', action='store_true', default=False,
+                        help='Обучить словарь для --slim по данным SLIM блоков.')
+    parser.add_argument('--cache', dest='cache_path', type=Path, default=None,
+                        help='Каталог кэша сборки. При совпадении отпечатка входа контейнер берется из кэша.')
+    parser.add_argument('--cache_hash', action='store_true', default=False,
+                        help='Отпечаток по содержимому файлов вместо времени изменения.')
+    parser.add_argument('--cache_link', action='store_true', default=False,
+                        help='Выходной файл - жесткая ссылка на запись кэша вместо копии.')
     parser.add_argument('in_path', action=make_in_path('out_path'), help='Директория для упаковки.')
 
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error('Число потоков должно быть положительным.')
+    args.layout = Layout(args.layout)
+    if (args.dict_path is not None or args.train_dict) and not args.slim:
+        parser.error('Словарь используется только с --slim.')
+    if args.dict_path is not None and args.train_dict:
+        parser.error('Укажите либо --dict, либо --train_dict.')
+    if (args.cache_hash or args.cache_link) and args.cache_path is None:
+        parser.error('Параметры кэша используются только с --cache.')
     return Args.from_namespace(args)
 
 
 def main() -> int:
     args_ns = get_args()
-    vromfs_stream = BytesIO()
+    profiler = Profiler(args_ns.profile_path)
     try:
-        VromfsFile.pack_into(args_ns.in_path, vromfs_stream)
-    except VromfsPackError as e:
+        return process(args_ns, profiler)
+    finally:
+        profiler.log_summary(logger)
+
+
+def prepare_slim(args_ns: Args, tmp: Path) -> Path:
+    from vromfs.files.slim_packer import SlimReport, prepare_slim_tree
+
+    dict_data = None if args_ns.dict_path is None else args_ns.dict_path.read_bytes()
+    report = SlimReport()
+    prepare_slim_tree(args_ns.in_path, tmp, dict_data, args_ns.train_dict, jobs=args_ns.jobs, report=report)
+    logger.info(f'SLIM: файлов {report.converted}, имен {report.names}, '
+                f'размер {report.in_size} => {report.out_size}, словарь {report.dict_path}')
+    return tmp
+
+
+def cache_options(args_ns: Args) -> Dict[str, Any]:
+    """Параметры упаковки, от которых зависит выходной контейнер."""
+
+    from vromfs.build_cache import file_digest
+
+    return dict(
+        version=list(args_ns.version),
+        platform=PlatformType.PC.name,
+        dedup=args_ns.dedup,
+        layout=args_ns.layout.value,
+        slim=args_ns.slim,
+        dict=None if args_ns.dict_path is None else file_digest(args_ns.dict_path),
+        train_dict=args_ns.train_dict,
+    )
+
+
+def process(args_ns: Args, profiler: Profiler) -> int:
+    cache = key = None
+    if args_ns.cache_path is not None:
+        from vromfs.build_cache import BuildCache, fingerprint
+
+        cache = BuildCache(args_ns.cache_path)
+        try:
+            with profiler.phase('fingerprint'):
+                key = fingerprint(args_ns.in_path, cache_options(args_ns), args_ns.cache_hash, args_ns.jobs)
+            if cache.restore(key, args_ns.out_path, args_ns.cache_link):
+                logger.info(f'{args_ns.in_path} => {args_ns.out_path}: из кэша, отпечаток {key}')
+                return 0
+        except EnvironmentError as e:
+            logger.error(f'{args_ns.in_path} => {args_ns.cache_path}')
+            logger.exception(e)
+            return 1
+
+    # Образ собирается во временном файле рядом с выходным: память не зависит от размера дерева.
+    out_path = args_ns.out_path
+    try:
+        vromfs_stream = TemporaryFile(dir=out_path.parent)
+    except EnvironmentError as e:
         logger.error(f'{args_ns.in_path} => temp vromfs')
         logger.exception(e)
         return 1
 
-    logger.debug(f'{args_ns.in_path} => temp vromfs')
+    with vromfs_stream:
+        report = PackReport()
+        try:
+            with TemporaryDirectory() as tmp:
+                in_path = args_ns.in_path
+                if args_ns.slim:
+                    with profiler.phase('slim'):
+                        in_path = prepare_slim(args_ns, Path(tmp))
+                with profiler.phase('image'):
+                    VromfsFile.pack_into(in_path, vromfs_stream, jobs=args_ns.jobs, dedup=args_ns.dedup,
+                                         report=report, layout=args_ns.layout)
+        except (VromfsPackError, ValueError, ConstructError, EnvironmentError) as e:
+            logger.error(f'{args_ns.in_path} => temp vromfs')
+            logger.exception(e)
+            return 1
+
+        logger.debug(f'{args_ns.in_path} => temp vromfs')
+        if args_ns.dedup:
+            logger.info(f'Дедупликация: файлов {report.duplicates} из {report.files}, '
+                        f'сэкономлено байт {report.saved_size}')
 
-    vromfs_size = vromfs_stream.seek(0, SEEK_END)
-    vromfs_stream.seek(0)
+        vromfs_size = vromfs_stream.seek(0, SEEK_END)
+        vromfs_stream.seek(0)
 
-    logger.debug(f'Размер временного образа: {vromfs_size}')
+        logger.debug(f'Размер временного образа: {vromfs_size}')
 
-    with open(args_ns.out_path, 'wb') as bin_stream:
+        # Выходной файл заменяется, а не перезаписывается: он может быть жесткой ссылкой на запись кэша.
         try:
-            BinFile.pack_into(vromfs_stream, bin_stream, PlatformType.PC, args_ns.version,
-                              compressed=True, checked=True, size=vromfs_size)
-        except BinPackError as e:
-            logger.error(f'temp vromfs => {args_ns.out_path}')
+            with profiler.phase('write'):
+                write_replacing(out_path, lambda bin_stream: BinFile.pack_into(
+                    vromfs_stream, bin_stream, PlatformType.PC, args_ns.version,
+                    compressed=True, checked=True, size=vromfs_size))
+        except (BinPackError, EnvironmentError) as e:
+            logger.error(f'temp vromfs => {out_path}')
             logger.exception(e)
             return 1
 
-    logger.debug(f'temp vromfs => {args_ns.out_path}')
-    logger.info(f'{args_ns.in_path} => {args_ns.out_path}')
+    logger.debug(f'temp vromfs => {out_path}')
+    logger.info(f'{args_ns.in_path} => {out_path}')
+
+    if cache is not None:
+        try:
+            cache.store(key, out_path)
+        except EnvironmentError as e:
+            logger.warning(f'Контейнер не сохранен в кэше: {e}')
 
     return 0
 
@@ -0,0 +1,57 @@
+from argparse import ArgumentParser, Namespace
+import logging
+from pathlib import Path
+import sys
+from typing import NamedTuple, Optional
+from vromfs.bin import BinFile, BinPackError, BinUnpackError, PackType
+from vromfs.common import write_replacing
+from vromfs.demo.vromfs_bin_unpacker import logger
+
+
+class Args(NamedTuple):
+    @classmethod
+    def from_namespace(cls, ns: Namespace) -> 'Args':
+        return cls(**vars(ns))
+
+    out_path: Optional[Path]
+    pack_type: str
+    level: int
+    in_path: Path
+
+
+def get_args() -> Args:
+    parser = ArgumentParser(description='Перепаковка vromfs bin контейнера в другой тип упаковки.')
+    parser.add_argument('-o', '--output', dest='out_path', type=Path, default=None,
+                        help='Выходной файл. По умолчанию контейнер перепаковывается на месте.')
+    parser.add_argument('-t', '--type', dest='pack_type', required=True,
+                        choices=[pack_type.name.lower() for pack_type in PackType],
+                        help='Тип упаковки выходного контейнера.')
+    parser.add_argument('--level', dest='level', type=int, default=3,
+                        help='Уровень сжатия zstd. По умолчанию %(default)s.')
+    parser.add_argument('in_path', type=Path, help='Входной контейнер.')
+
+    args = parser.parse_args()
+    if not args.in_path.is_file():
+        parser.error('Контейнер не найден: {!r}'.format(str(args.in_path)))
+    return Args.from_namespace(args)
+
+
+def main() -> int:
+    args = get_args()
+    logger.setLevel(logging.INFO)
+    out_path = args.out_path or args.in_path
+    pack_type = PackType[args.pack_type.upper()]
+
+    try:
+        with BinFile(args.in_path) as bin_file:
+            source_type = bin_file.pack_type
+            write_replacing(out_path, lambda ostream: bin_file.transcode(pack_type, ostream, args.level))
+    except (BinUnpackError, BinPackError, EnvironmentError) as e:
+        logger.error(f'Ошибка: {e}')
+        return 1
+    logger.info(f'{args.in_path} ({source_type.name}) => {out_path} ({pack_type.name})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
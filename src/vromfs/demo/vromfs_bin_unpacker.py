@@ -1,21 +1,43 @@
 from argparse import Action, ArgumentParser, FileType, Namespace
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+import glob
+from io import StringIO
 import json
 import logging
+import os
 from pathlib import Path
 import sys
-from typing import BinaryIO, Iterable, NamedTuple, Optional, TextIO
-from blk import Format
-from vromfs.bin import BinFile
-from vromfs.vromfs import VromfsFile
+from threading import Event, Lock
+from typing import TYPE_CHECKING, Any, Callable, Iterable, List, Mapping, NamedTuple, Optional, Sequence, TextIO
+from vromfs.bin import BinFile, BinUnpackError
+from vromfs.demo.profiling import Profiler
+from vromfs.stats import IOStats
+from vromfs.vromfs import DependencyCache, MetricsSummary, VromfsFile, VromfsUnpackError
+from vromfs.vromfs.file_index import name_key
+from vromfs.vromfs.vromfs_file import Item
+
+if TYPE_CHECKING:
+    from blk import Format
 
 FILES_INFO_VERSION = '1.1'
+FILES_INFO_EXT_VERSION = '2.0'
+"""Версия расширенной схемы: смещения и размеры файлов, сведения о контейнере."""
 
+FORMAT_NAMES = ('json', 'json_2', 'json_3', 'raw', 'strict_blk')
+"""Имена blk.Format в нижнем регистре. Модуль blk загружается только при распаковке."""
 
-def iname(f: Format) -> str:
-    return f.name.lower()
+METADATA_FORMAT_NAMES = ('json', 'ndjson')
+"""Форматы сводки о файлах: документ JSON или поток записей NDJSON по одной на файл."""
 
+CONTAINER_PATTERN = '*.vromfs.bin'
+"""Шаблон имен контейнеров во входной директории."""
+
+
+def format_(s: str) -> 'Format':
+    from blk import Format
 
-def format_(s: str) -> Format:
     return Format[s.upper()]
 
 
@@ -38,22 +60,29 @@ class Args(NamedTuple):
     def from_namespace(cls, ns: Namespace) -> 'Args':
         return cls(**vars(ns))
 
-    out_format: Format
+    out_format: str
     is_sorted: bool
     is_minified: bool
     dump_files_info: bool
+    schema: str
     out_path: Optional[Path]
-    input: BinaryIO
+    inputs: Sequence[Path]
     in_files: Optional[TextIO]
     exit_first: bool
     loglevel: str
+    with_stats: bool
+    metrics_path: Optional[Path]
+    top: int
+    profile_path: Optional[Path]
+    jobs: int
+    include: Optional[List[str]]
+    exclude: Optional[List[str]]
 
 
 class CreateFormat(Action):
     def __call__(self, parser: ArgumentParser, namespace: Namespace,
                  values: str, option_string=None) -> None:
-        f = format_(values)
-        setattr(namespace, self.dest, f)
+        setattr(namespace, self.dest, values.lower())
 
 
 class CreateLogLevel(Action):
@@ -64,18 +93,28 @@ class CreateLogLevel(Action):
 
 def get_args() -> Args:
     parser = ArgumentParser(description='Распаковщик vromfs bin контейнера.')
-    parser.add_argument('--format', dest='out_format', choices=sorted(map(iname, Format)),
-                        action=CreateFormat, default=Format.JSON,
-                        help='Формат блоков. По умолчанию {}.'.format(iname(Format.JSON)))
+    parser.add_argument('--format', dest='out_format', choices=sorted(set(FORMAT_NAMES + METADATA_FORMAT_NAMES)),
+                        action=CreateFormat, default='json',
+                        help=('Формат блоков или формат сводки о файлах ({}) для --metadata. '
+                              'По умолчанию %(default)s.').format(', '.join(METADATA_FORMAT_NAMES)))
     parser.add_argument('--sort', dest='is_sorted', action='store_true', default=False,
                         help='Сортировать ключи для JSON*.')
     parser.add_argument('--minify', dest='is_minified', action='store_true', default=False,
                         help='Минифицировать JSON*.')
     parser.add_argument('--metadata', dest='dump_files_info', action='store_true', default=False,
                         help='Сводка о файлах: имя => SHA1 дайджест.')
+    parser.add_argument('--schema', dest='schema', choices=(FILES_INFO_VERSION, FILES_INFO_EXT_VERSION),
+                        default=FILES_INFO_VERSION,
+                        help=('Версия схемы сводки о файлах. {} добавляет смещения и размеры файлов '
+                              'и сведения о контейнере. По умолчанию %(default)s.').format(FILES_INFO_EXT_VERSION))
     parser.add_argument('--input_filelist', dest='in_files', type=FileType(), default=None,
                         help=('Файл со списком файлов в формате JSON. '
                               '"-" - читать из stdin.'))
+    parser.add_argument('--include', dest='include', action='append', default=None, metavar='PATTERN',
+                        help=('Обрабатывать только файлы, внутренние пути которых соответствуют шаблону, '
+                              'например config/**/*.blk. Можно указать несколько раз.'))
+    parser.add_argument('--exclude', dest='exclude', action='append', default=None, metavar='PATTERN',
+                        help='Не обрабатывать файлы, соответствующие шаблону. Можно указать несколько раз.')
     parser.add_argument('-x', '--exitfirst', dest='exit_first', action='store_true', default=False,
                         help='Закончить распаковку при первой ошибке.')
     parser.add_argument('-o', '--output', dest='out_path', type=Path, default=None,
@@ -86,35 +125,396 @@ def get_args() -> Args:
     parser.add_argument('--loglevel', action=CreateLogLevel, choices=('critical', 'error', 'warning', 'info', 'debug'),
                         default='INFO',
                         help='Уровень сообщений. По умолчанию info.')
-    parser.add_argument(dest='input', type=FileType('rb'), help='Контейнер.')
+    parser.add_argument('--stats', dest='with_stats', action='store_true', default=False,
+                        help='Вывести счетчики ввода-вывода по уровням потоков.')
+    parser.add_argument('--metrics', dest='metrics_path', type=Path, default=None,
+                        help='Файл NDJSON с метриками распаковки по файлам и итоговой сводкой.')
+    parser.add_argument('--top', dest='top', type=int, default=10,
+                        help='Число самых медленных файлов в сводке метрик. По умолчанию %(default)s.')
+    parser.add_argument('--profile', dest='profile_path', type=Path, default=None,
+                        help='Директория для результатов cProfile и tracemalloc по этапам.')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=os.cpu_count() or 1,
+                        help=('Число потоков для распаковки нескольких контейнеров. '
+                              'По умолчанию число процессоров: %(default)s.'))
+    parser.add_argument(dest='inputs', nargs='+',
+                        help='Контейнеры, директории с контейнерами {} или шаблоны glob.'.format(CONTAINER_PATTERN))
     args = parser.parse_args()
+    args.inputs = expand_inputs(args.inputs)
+    if not args.inputs:
+        parser.error('Нет контейнеров для обработки.')
+    for path in args.inputs:
+        if not path.is_file():
+            parser.error('Контейнер не найден: {!r}'.format(str(path)))
+    if args.jobs < 1:
+        parser.error('Число потоков должно быть положительным.')
+    if args.out_format not in (METADATA_FORMAT_NAMES if args.dump_files_info else FORMAT_NAMES):
+        parser.error('Формат {} не поддерживается в этом режиме.'.format(args.out_format))
     return Args.from_namespace(args)
 
 
+def expand_inputs(specs: Iterable[str]) -> List[Path]:
+    """
+    Пути контейнеров из входных аргументов. Для директории принимаются контейнеры по шаблону CONTAINER_PATTERN,
+    для шаблона glob - совпавшие пути. Повторы исключаются с сохранением порядка.
+    """
+
+    paths = []
+    for spec in specs:
+        path = Path(spec)
+        if path.is_dir():
+            paths.extend(sorted(path.glob(CONTAINER_PATTERN)))
+        elif any(c in spec for c in '*?['):
+            paths.extend(sorted(map(Path, glob.glob(spec, recursive=True))))
+        else:
+            paths.append(path)
+    return list(OrderedDict.fromkeys(paths))
+
+
+def output_names(inputs: Sequence[Path]) -> Mapping[Path, Path]:
+    """
+    Выходные директории контейнеров относительно --output: имя контейнера или, если имена контейнеров
+    из разных директорий совпадают, путь контейнера относительно общего корня входных директорий.
+    """
+
+    names = {path.name for path in inputs}
+    if len(names) == len(inputs):
+        return {path: Path(path.name) for path in inputs}
+    root = os.path.commonpath([path.absolute().parent for path in inputs])
+    return {path: path.absolute().relative_to(root) for path in inputs}
+
+
+def container_header(bin_file: BinFile, vromfs: VromfsFile) -> Mapping[str, Any]:
+    """Сведения о контейнере для расширенной схемы сводки."""
+
+    version = bin_file.version
+    digest = bin_file.digest
+    return {
+        'name': bin_file.name,
+        'version': None if version is None else '.'.join(map(str, version)),
+        'platform': bin_file.platform.name,
+        'pack_type': bin_file.pack_type.name,
+        'md5': None if digest is None else digest.hex(),
+        'size': bin_file.size,
+        'checked': vromfs.checked,
+    }
+
+
 def dump_files_info(vromfs: VromfsFile,
-                    paths: Optional[Iterable[Path]] = None, ostream: Optional[TextIO] = None):
+                    paths: Optional[Iterable[Path]] = None, ostream: Optional[TextIO] = None,
+                    container: Optional[str] = None, header: Optional[Mapping[str, Any]] = None, jobs: int = 1):
+    """
+    Вывод сводки о файлах. Если указано имя контейнера, сводка содержит его и выводится одной строкой,
+    чтобы сводки нескольких контейнеров можно было разделить.
+    Если указаны сведения о контейнере, сводка выводится по расширенной схеме.
+
+    :param jobs: Число потоков для вычисления дайджестов.
+    """
+
     if ostream is None:
         ostream = sys.stdout
 
     absent = []
-    table = vromfs.digests_table(paths, absent)
-    filelist = {str(path): digest.hex() for path, digest in table.items()}
+    if header is None:
+        table = vromfs.digests_table(paths, absent, jobs)
+        filelist = {str(path): digest.hex() for path, digest in table.items()}
+        m = {
+            'version': FILES_INFO_VERSION,
+            'filelist': filelist,
+        }
+    else:
+        filelist = {fd.info.name: dict(offset=fd.info.offset, size=fd.info.size, sha1=fd.digest.hex())
+                    for fd in vromfs.digests_iter(paths, absent, jobs)}
+        m = {
+            'version': FILES_INFO_EXT_VERSION,
+            'container': header,
+            'filelist': filelist,
+        }
     _filelist = [str(path) for path in absent]
-    m = {
-        'version': FILES_INFO_VERSION,
-        'filelist': filelist,
-    }
     if _filelist:
         m['~filelist'] = _filelist
-    json.dump(m, ostream)
+    if container is None:
+        json.dump(m, ostream)
+    else:
+        if header is None:
+            m['container'] = container
+        ostream.write(json.dumps(m) + '\n')
+
+
+def dump_files_records(vromfs: VromfsFile, paths: Optional[Iterable[Path]], write: Callable[[str], Any],
+                       container: str, header: Optional[Mapping[str, Any]] = None, jobs: int = 1):
+    """
+    Вывод сводки о файлах потоком записей NDJSON, по записи на файл, как только известен его дайджест.
+    Тип blk определяется по первому байту, если данные файла читались для вычисления дайджеста.
+    Если указаны сведения о контейнере, первой выводится запись ``{container, header}``.
+
+    :param write: Функция вывода строки.
+    :param jobs: Число потоков для вычисления дайджестов.
+    """
+
+    if header is not None:
+        write(json.dumps(dict(container=container, header=header)) + '\n')
+
+    absent = []
+    for fd in vromfs.digests_iter(paths, absent, jobs):
+        for path in absent:
+            write(json.dumps(dict(container=container, path=str(path), absent=True)) + '\n')
+        absent.clear()
+
+        info = fd.info
+        record = dict(container=container, path=info.name, offset=info.offset, size=info.size,
+                      sha1=fd.digest.hex(), blk_type=blk_type_name(info.name, fd.head))
+        write(json.dumps(record) + '\n')
+
+    for path in absent:
+        write(json.dumps(dict(container=container, path=str(path), absent=True)) + '\n')
+
+
+def blk_type_name(name: str, head: Optional[bytes]) -> Optional[str]:
+    """Имя типа blk по внутреннему имени и первому байту данных. None, если тип не определен."""
+
+    if not head or not name.endswith('.blk'):
+        return None
+
+    from blk.binary import BlkType
+
+    try:
+        return BlkType.from_byte(head).name
+    except Exception:
+        return None
+
+
+def log_stats(stats: IOStats):
+    for name in stats:
+        layer = stats[name]
+        logger.info(f'[STAT] {name}: reads={layer.reads} bytes={layer.read_bytes} seeks={layer.seeks} '
+                    f'backward={layer.backward_seeks} resets={layer.resets} time={layer.time:.3f}s')
+
+
+def log_metrics_summary(summary: MetricsSummary):
+    for path, metrics in summary.slowest:
+        logger.info(f'[SLOW] {path!r}: {metrics.total_time:.6f}s {metrics.in_size} => {metrics.out_size}')
+    for name, totals in summary.totals.items():
+        logger.info(f'[TYPE] {name}: count={totals["count"]} in={totals["in_size"]} out={totals["out_size"]} '
+                    f'read={totals["read_time"]:.3f}s decompress={totals["decompress_time"]:.3f}s '
+                    f'compose={totals["compose_time"]:.3f}s serialize={totals["serialize_time"]:.3f}s')
+
+
+def input_size(path: Path) -> int:
+    """Размер контейнера для порядка обработки. Недоступный контейнер обрабатывается последним."""
+
+    try:
+        return path.stat().st_size
+    except EnvironmentError:
+        return -1
+
+
+class ContainerResult(NamedTuple):
+    path: Path
+    """Путь контейнера."""
+
+    successful: int
+    """Число успешно обработанных файлов."""
+
+    failed: int
+    """Число файлов с ошибками."""
+
+    code: int
+    """Код завершения обработки контейнера."""
+
+
+class Session:
+    """
+    Обработка группы контейнеров. Кэш словарей и таблиц имен, сводка метрик и выходные потоки
+    общие для всех контейнеров. Контейнеры распределяются по потокам пула, начиная с наибольшего.
+    """
+
+    def __init__(self, args: Args, paths: Optional[Sequence[Path]], stats: Optional[IOStats], profiler: Profiler,
+                 ostream: Optional[TextIO], metrics_stream: Optional[TextIO]):
+        self.args = args
+        self.paths = paths
+        self.stats = stats
+        self.profiler = profiler
+        self.ostream = ostream
+        self.metrics_stream = metrics_stream
+        self.batch = len(args.inputs) > 1
+        # Потоки, оставшиеся от обработки контейнеров, вычисляют дайджесты.
+        self.hash_jobs = max(1, args.jobs // min(args.jobs, len(args.inputs)))
+        self.cache = DependencyCache()
+        self.out_names = output_names(args.inputs)
+        self.summary = None if metrics_stream is None else MetricsSummary(args.top)
+        self.out_format = None
+        if not (args.dump_files_info or args.out_format == 'raw'):
+            self.out_format = format_(args.out_format)
+        self._lock = Lock()
+        self._stop = Event()
+
+    def run(self) -> List[ContainerResult]:
+        """Обработка всех контейнеров. Результаты в порядке обработки, начиная с наибольшего контейнера."""
+
+        inputs = sorted(self.args.inputs, key=input_size, reverse=True)
+        jobs = min(self.args.jobs, len(inputs))
+        if jobs == 1:
+            return [self.process(path, self.profiler) for path in inputs]
+
+        # cProfile учитывает только поток, в котором включен, поэтому этапы контейнеров не профилируются.
+        with self.profiler.phase('batch'):
+            with ThreadPoolExecutor(jobs) as executor:
+                return list(executor.map(lambda path: self.process(path, Profiler()), inputs))
+
+    def process(self, input_path: Path, profiler: Profiler) -> ContainerResult:
+        """Обработка одного контейнера."""
+
+        if self._stop.is_set():
+            return ContainerResult(input_path, 0, 0, 1)
+
+        stats = None if self.stats is None else IOStats()
+        try:
+            bin_file = BinFile(input_path, stats)
+        except EnvironmentError as e:
+            logger.error(f'Ошибка при открытии контейнера {str(input_path)!r}.')
+            logger.exception(e)
+            result = ContainerResult(input_path, 0, 0, 1)
+        else:
+            # Любая ошибка засчитывается контейнеру и не прерывает обработку остальных.
+            try:
+                with bin_file:
+                    result = self._process(input_path, bin_file, profiler)
+            except Exception as e:
+                logger.error(f'Ошибка при обработке контейнера {str(input_path)!r}.')
+                logger.exception(e)
+                result = ContainerResult(input_path, 0, 0, 1)
+        finally:
+            if stats is not None:
+                with self._lock:
+                    self.stats.update(stats)
+
+        if result.code and self.args.exit_first:
+            self._stop.set()
+        return result
+
+    def select(self, vromfs: VromfsFile) -> Optional[List[Item]]:
+        """
+        Файлы контейнера для обработки: файлы из списка или все файлы, отобранные шаблонами --include и --exclude.
+        Файлы из списка, отсутствующие в образе, сохраняются для вывода как отсутствующие.
+        """
+
+        args = self.args
+        if args.include is None and args.exclude is None:
+            return self.paths
+
+        items = vromfs.select(args.include, args.exclude)
+        if self.paths is not None:
+            wanted = set(map(name_key, self.paths))
+            info_map = vromfs.info_map
+            items = [info for info in items if info.name in wanted] + [p for p in self.paths if p not in info_map]
+        return items
+
+    def _write(self, line: str) -> None:
+        with self._lock:
+            self.ostream.write(line)
+
+    def _process(self, input_path: Path, bin_file: BinFile, profiler: Profiler) -> ContainerResult:
+        args = self.args
+        name = str(input_path)
+        vromfs = VromfsFile(bin_file, cache=self.cache)
+
+        try:
+            with profiler.phase('header'):
+                bin_file.meta
+            with profiler.phase('image'):
+                vromfs.info_map
+        except (BinUnpackError, VromfsUnpackError) as e:
+            logger.error(f'Ошибка при чтении метаданных контейнера {name!r}.')
+            logger.exception(e)
+            return ContainerResult(input_path, 0, 0, 1)
+
+        paths = self.select(vromfs)
+
+        if args.dump_files_info:
+            try:
+                with profiler.phase('metadata'):
+                    header = None
+                    if args.schema == FILES_INFO_EXT_VERSION:
+                        header = container_header(bin_file, vromfs)
+                    if args.out_format == 'ndjson':
+                        dump_files_records(vromfs, paths, self._write, name, header, self.hash_jobs)
+                    elif self.batch:
+                        buffer = StringIO()
+                        dump_files_info(vromfs, paths, buffer, name, header, self.hash_jobs)
+                        with self._lock:
+                            self.ostream.write(buffer.getvalue())
+                    else:
+                        dump_files_info(vromfs, paths, self.ostream, header=header, jobs=self.hash_jobs)
+            except Exception as e:
+                logger.error(f'Ошибка при формировании сводки о файлах {name!r}.')
+                logger.exception(e)
+                return ContainerResult(input_path, 0, 0, 1)
+            return ContainerResult(input_path, 0, 0, 0)
+
+        if args.out_path is None:
+            out_path = Path(name + '_u')
+        else:
+            out_path = args.out_path / self.out_names[input_path]
+
+        if self.out_format is not None:
+            with profiler.phase('dependencies'):
+                try:
+                    vromfs.nm
+                    vromfs.dctx
+                except Exception as e:
+                    logger.warning(f'Ошибка при загрузке таблицы имен или словаря {name!r}: {e}')
+
+        with_metrics = self.summary is not None
+        failed = successful = 0
+        try:
+            logger.info(f'Начало распаковки {name!r}.' if self.batch else 'Начало распаковки.')
+            with profiler.phase('extraction'):
+                for result in vromfs.unpack_iter(paths, out_path, self.out_format, args.is_sorted,
+                                                 args.is_minified, with_metrics):
+                    if result.metrics is not None:
+                        record = dict(container=name, path=str(result.path),
+                                      error=None if result.error is None else str(result.error),
+                                      **result.metrics.as_dict())
+                        key = f'{name}::{result.path}' if self.batch else result.path
+                        with self._lock:
+                            self.summary.add(key, result.metrics)
+                            self.metrics_stream.write(json.dumps(record) + '\n')
+                    if result.error is not None:
+                        failed += 1
+                        logger.info(f'[FAIL] {name!r}::{str(result.path)!r}: {result.error}')
+                        if args.exit_first:
+                            break
+                    else:
+                        logger.info(f'[ OK ] {name!r}::{str(result.path)!r}')
+                        successful += 1
+                    if self._stop.is_set():
+                        # Ошибка в другом контейнере при -x.
+                        break
+        except Exception as e:
+            logger.error(f'Ошибка при распаковке файлов {name!r}.')
+            logger.exception(e)
+            return ContainerResult(input_path, successful, failed, 1)
+
+        if self.batch:
+            logger.info(f'[DONE] {name!r}: {successful}/{successful+failed}')
+        return ContainerResult(input_path, successful, failed, 1 if failed else 0)
 
 
 def main():
     args = get_args()
     logger.setLevel(args.loglevel)
 
-    vromfs = VromfsFile(BinFile(args.input))
+    stats = IOStats() if args.with_stats else None
+    profiler = Profiler(args.profile_path)
+    try:
+        return process(args, stats, profiler)
+    finally:
+        if stats is not None:
+            log_stats(stats)
+        profiler.log_summary(logger)
+
 
+def process(args: Args, stats: Optional[IOStats], profiler: Profiler):
     if args.in_files is None:
         paths = args.in_files
     else:
@@ -130,47 +530,40 @@ def main():
                 logger.info('Нет файлов для извлечения.')
                 return 0
 
-    if args.dump_files_info:
-        try:
-            if args.out_path is None:
-                dump_files_info(vromfs, paths)
-            else:
-                with open(args.out_path, 'w') as ostream:
-                    dump_files_info(vromfs, paths, ostream)
-        except Exception as e:
-            logger.error('Ошибка при формировании сводки о файлах.')
-            logger.exception(e)
-            return 1
-    else:
-        if args.out_path is None:
-            out_path = Path(args.input.name + '_u')
+    with ExitStack() as stack:
+        if not args.dump_files_info:
+            ostream = None
+        elif args.out_path is None:
+            ostream = sys.stdout
         else:
-            out_path = args.out_path / Path(args.input.name).name
+            ostream = stack.enter_context(open(args.out_path, 'w'))
+        with_metrics = args.metrics_path is not None and not args.dump_files_info
+        metrics_stream = stack.enter_context(open(args.metrics_path, 'w')) if with_metrics else None
 
-        failed = successful = 0
-        try:
-            logger.info('Начало распаковки.')
-            for result in vromfs.unpack_iter(paths, out_path, args.out_format, args.is_sorted, args.is_minified):
-                if result.error is not None:
-                    failed += 1
-                    logger.info(f'[FAIL] {args.input.name!r}::{str(result.path)!r}: {result.error}')
-                    if args.exit_first:
-                        break
-                else:
-                    logger.info(f'[ OK ] {args.input.name!r}::{str(result.path)!r}')
-                    successful += 1
+        session = Session(args, paths, stats, profiler, ostream, metrics_stream)
+        results = session.run()
 
-            logger.info('Успешно распаковано: {}/{}.'.format(successful, successful+failed))
-            if failed:
-                logger.info('Ошибка при обработке файлов.')
-                return 1
-
-        except Exception as e:
-            logger.error('Ошибка при распаковке файлов.')
-            logger.exception(e)
-            return 1
-
-    return 0
+        if with_metrics:
+            if session.batch:
+                record = dict(containers=[str(path) for path in args.inputs], summary=session.summary.as_dict())
+            else:
+                record = dict(container=str(args.inputs[0]), summary=session.summary.as_dict())
+            metrics_stream.write(json.dumps(record) + '\n')
+            log_metrics_summary(session.summary)
+
+    if session.batch:
+        done = sum(1 for result in results if not result.code)
+        logger.info('Обработано контейнеров: {}/{}.'.format(done, len(args.inputs)))
+
+    successful = sum(result.successful for result in results)
+    failed = sum(result.failed for result in results)
+    code = 1 if any(result.code for result in results) else 0
+    if not args.dump_files_info and (successful or failed or not code):
+        logger.info('Успешно распаковано: {}/{}.'.format(successful, successful+failed))
+        if failed:
+            logger.info('Ошибка при обработке файлов.')
+
+    return code
 
 
 if __name__ == '__main__':
@@ -0,0 +1,100 @@
+from argparse import ArgumentParser, Namespace
+import os
+from pathlib import Path
+import sys
+from tempfile import TemporaryFile
+from typing import List, NamedTuple, Optional
+from vromfs.bin import BinFile, BinPackError, BinUnpackError, Version
+from vromfs.common import write_replacing
+from vromfs.demo.vromfs_bin_packer import MakeVersion, logger
+from vromfs.vromfs import PackReport, VromfsFile, VromfsPackError, VromfsUnpackError
+
+
+class Args(NamedTuple):
+    @classmethod
+    def from_namespace(cls, ns: Namespace) -> 'Args':
+        return cls(**vars(ns))
+
+    out_path: Optional[Path]
+    update_path: Optional[Path]
+    remove: List[str]
+    version: Optional[Version]
+    jobs: int
+    in_path: Path
+
+
+def get_args() -> Args:
+    parser = ArgumentParser(description='Обновление файлов vromfs bin контейнера без полной переупаковки.')
+    parser.add_argument('-o', '--output', dest='out_path', type=Path, default=None,
+                        help='Выходной файл. По умолчанию контейнер обновляется на месте.')
+    parser.add_argument('-u', '--update', dest='update_path', type=Path, default=None,
+                        help='Директория с заменяемыми и добавляемыми файлами, пути относительно директории.')
+    parser.add_argument('-r', '--remove', dest='remove', action='append', default=[],
+                        help='Внутреннее имя удаляемого файла. Может повторяться.')
+    parser.add_argument('-v', '--ver', dest='version', action=MakeVersion, default=None,
+                        help='Новая версия контейнера xxx.yyy.zzz.www. По умолчанию версия сохраняется.')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=os.cpu_count() or 1,
+                        help='Число потоков для чтения файлов. По умолчанию число процессоров: %(default)s.')
+    parser.add_argument('in_path', type=Path, help='Обновляемый контейнер.')
+
+    args = parser.parse_args()
+    if not args.in_path.is_file():
+        parser.error('Контейнер не найден: {!r}'.format(str(args.in_path)))
+    if args.update_path is not None and not args.update_path.is_dir():
+        parser.error('Ожидалась директория: {!r}'.format(str(args.update_path)))
+    if args.update_path is None and not args.remove:
+        parser.error('Нет изменений: укажите --update или --remove.')
+    if args.jobs < 1:
+        parser.error('Число потоков должно быть положительным.')
+    return Args.from_namespace(args)
+
+
+def update_files(update_path: Optional[Path]):
+    from vromfs.vromfs import scan_tree
+
+    return {} if update_path is None else {f.name: f.path for f in scan_tree(os.fspath(update_path))}
+
+
+def main() -> int:
+    args_ns = get_args()
+    out_path = args_ns.out_path or args_ns.in_path
+    report = PackReport()
+
+    # Образ собирается во временном файле рядом с выходным: память не зависит от размера контейнера.
+    with BinFile(args_ns.in_path) as bin_file, TemporaryFile(dir=out_path.parent) as vromfs_stream:
+        vromfs = VromfsFile(bin_file)
+        files = update_files(args_ns.update_path)
+        try:
+            existing = sum(name in vromfs for name in files)
+            vromfs.update_into(files, args_ns.remove, vromfs_stream, args_ns.jobs, report)
+        except KeyError as e:
+            logger.error(f'Файл отсутствует в контейнере: {e}')
+            return 1
+        except (BinUnpackError, VromfsUnpackError, VromfsPackError, ValueError, EnvironmentError) as e:
+            logger.error(f'{args_ns.in_path} => temp vromfs')
+            logger.exception(e)
+            return 1
+
+        logger.info(f'Заменено {existing}, добавлено {len(files) - existing}, удалено {len(args_ns.remove)}, '
+                    f'скопировано из контейнера {report.copied}, из них с общим блоком данных {report.shared}')
+        vromfs_size = vromfs_stream.tell()
+        vromfs_stream.seek(0)
+        version = bin_file.version if args_ns.version is None else args_ns.version
+        extra = bin_file.meta.extra or None
+
+        # Запись во временный файл рядом с выходным: контейнер может обновляться на месте.
+        try:
+            write_replacing(out_path, lambda bin_stream: BinFile.pack_into(
+                vromfs_stream, bin_stream, bin_file.platform, version, compressed=bin_file.compressed,
+                checked=bin_file.checked, size=vromfs_size, extra=extra))
+        except (BinPackError, EnvironmentError) as e:
+            logger.error(f'temp vromfs => {out_path}')
+            logger.exception(e)
+            return 1
+
+    logger.info(f'{args_ns.in_path} => {out_path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+from argparse import ArgumentParser, Namespace
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import sys
+from typing import List, NamedTuple, Optional
+from vromfs.bin import BinUnpackError
+from vromfs.catalog import Catalog, CatalogEntry
+from vromfs.demo.vromfs_bin_unpacker import expand_inputs, logger
+from vromfs.vromfs import VromfsUnpackError
+
+
+class Args(NamedTuple):
+    @classmethod
+    def from_namespace(cls, ns: Namespace) -> 'Args':
+        return cls(**vars(ns))
+
+    db_path: Path
+    command: str
+    inputs: Optional[List[Path]] = None
+    jobs: int = 1
+    path: Optional[str] = None
+    with_history: bool = False
+    sha1: Optional[str] = None
+
+
+def get_args() -> Args:
+    parser = ArgumentParser(description='Каталог файлов множества vromfs bin контейнеров.')
+    parser.add_argument('-d', '--db', dest='db_path', type=Path, default=Path('vromfs_catalog.db'),
+                        help='Файл базы каталога. По умолчанию %(default)s.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest = subparsers.add_parser('ingest', help='Добавить контейнеры в каталог.')
+    ingest.add_argument('-j', '--jobs', dest='jobs', type=int, default=os.cpu_count() or 1,
+                        help='Число потоков для вычисления дайджестов. По умолчанию %(default)s.')
+    ingest.add_argument(dest='inputs', nargs='+',
+                        help='Контейнеры, директории с контейнерами *.vromfs.bin или шаблоны glob.')
+
+    find = subparsers.add_parser('find', help='Контейнеры, содержащие файл.')
+    find.add_argument('--history', dest='with_history', action='store_true', default=False,
+                      help='Только версии, в которых изменился дайджест файла.')
+    find.add_argument(dest='path', help='Внутреннее имя файла.')
+
+    digest = subparsers.add_parser('digest', help='Файлы с заданным SHA1 дайджестом.')
+    digest.add_argument(dest='sha1', help='SHA1 дайджест, hex.')
+
+    subparsers.add_parser('containers', help='Контейнеры каталога.')
+
+    args = parser.parse_args()
+    if args.command == 'ingest':
+        args.inputs = expand_inputs(args.inputs)
+    return Args.from_namespace(args)
+
+
+def dump_entry(entry: CatalogEntry) -> str:
+    m = entry._asdict()
+    m['md5'] = None if entry.md5 is None else entry.md5.hex()
+    m['version'] = None if entry.version is None else '.'.join(map(str, entry.version))
+    m['sha1'] = entry.sha1.hex()
+    return json.dumps(m)
+
+
+def ingest(catalog: Catalog, args: Args) -> int:
+    added = skipped = failed = 0
+    for path in args.inputs:
+        try:
+            if catalog.ingest(path, args.jobs):
+                added += 1
+                logger.info(f'[ OK ] {str(path)!r}')
+            else:
+                skipped += 1
+                logger.info(f'[SKIP] {str(path)!r}: уже в каталоге')
+        except (BinUnpackError, VromfsUnpackError, EnvironmentError) as e:
+            failed += 1
+            logger.info(f'[FAIL] {str(path)!r}: {e}')
+
+    logger.info(f'Добавлено: {added}, пропущено: {skipped}, ошибок: {failed}.')
+    return 1 if failed else 0
+
+
+def main() -> int:
+    args = get_args()
+    logger.setLevel(logging.INFO)
+
+    try:
+        with Catalog(args.db_path) as catalog:
+            if args.command == 'ingest':
+                return ingest(catalog, args)
+
+            if args.command == 'containers':
+                for container in catalog.containers():
+                    m = container._asdict()
+                    m['md5'] = None if container.md5 is None else container.md5.hex()
+                    m['version'] = None if container.version is None else '.'.join(map(str, container.version))
+                    print(json.dumps(m))
+                return 0
+
+            if args.command == 'find':
+                entries = catalog.history(args.path) if args.with_history else catalog.find(args.path)
+            else:
+                try:
+                    sha1 = bytes.fromhex(args.sha1)
+                except ValueError:
+                    logger.error('Неверный SHA1 дайджест.')
+                    return 1
+                entries = catalog.find_digest(sha1)
+
+            for entry in entries:
+                print(dump_entry(entry))
+            return 0 if entries else 1
+    except sqlite3.Error as e:
+        logger.error('Ошибка при работе с базой каталога.')
+        logger.exception(e)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+from argparse import ArgumentParser, Namespace
+import json
+import logging
+from pathlib import Path
+import sys
+from typing import Iterator, List, NamedTuple, Optional
+from vromfs.bin import BinUnpackError
+from vromfs.demo.vromfs_bin_unpacker import expand_inputs, logger
+from vromfs.vromfs import VromfsUnpackError
+
+
+class Args(NamedTuple):
+    @classmethod
+    def from_namespace(cls, ns: Namespace) -> 'Args':
+        return cls(**vars(ns))
+
+    out_path: Path
+    dict_size: int
+    level: int
+    max_samples: int
+    max_size: Optional[int]
+    seed: int
+    suffix: str
+    inputs: List[Path]
+
+
+def get_args() -> Args:
+    from vromfs.dictionary import DICT_SIZE
+
+    parser = ArgumentParser(description='Обучение zstd словаря по blk файлам деревьев и vromfs bin контейнеров.')
+    parser.add_argument('-o', '--output', dest='out_path', type=Path, default=Path.cwd(),
+                        help='Директория для словаря. Имя словаря - SHA-256 дайджест содержимого. По умолчанию cwd.')
+    parser.add_argument('--size', dest='dict_size', type=int, default=DICT_SIZE,
+                        help='Размер словаря, байт. По умолчанию %(default)s.')
+    parser.add_argument('--level', dest='level', type=int, default=3,
+                        help='Уровень сжатия. По умолчанию %(default)s.')
+    parser.add_argument('--max_samples', dest='max_samples', type=int, default=10000,
+                        help='Наибольшее число образцов. По умолчанию %(default)s.')
+    parser.add_argument('--max_size', dest='max_size', type=int, default=None,
+                        help='Наибольший суммарный размер образцов, байт.')
+    parser.add_argument('--seed', dest='seed', type=int, default=0,
+                        help='Начальное значение для выборки образцов. По умолчанию %(default)s.')
+    parser.add_argument('--suffix', dest='suffix', default='.blk',
+                        help='Суффикс имен файлов-образцов. По умолчанию %(default)s.')
+    parser.add_argument(dest='inputs', nargs='+',
+                        help='Деревья файлов, контейнеры, директории с контейнерами *.vromfs.bin или шаблоны glob. '
+                             'Директория без контейнеров считается деревом файлов.')
+    args = parser.parse_args()
+    inputs = []
+    for spec in args.inputs:
+        path = Path(spec)
+        expanded = expand_inputs([spec])
+        inputs.extend(expanded if expanded or not path.is_dir() else [path])
+    args.inputs = inputs
+    if not args.inputs:
+        parser.error('Нет входных данных.')
+    if args.max_samples < 1:
+        parser.error('Число образцов должно быть положительным.')
+    if not args.out_path.is_dir():
+        parser.error('Выходная директория не найдена: {!r}'.format(str(args.out_path)))
+    return Args.from_namespace(args)
+
+
+def iter_samples(args: Args) -> Iterator[bytes]:
+    from vromfs.dictionary import sample_containers, sample_tree
+
+    for path in args.inputs:
+        if path.is_dir():
+            yield from sample_tree(path, args.suffix)
+        else:
+            yield from sample_containers([path], args.suffix)
+
+
+def main() -> int:
+    args = get_args()
+    logger.setLevel(logging.INFO)
+
+    from vromfs.dictionary import evaluate_dict, make_dict_path, select_samples, train_dict
+
+    try:
+        samples = select_samples(iter_samples(args), args.max_samples, args.max_size, args.seed)
+    except (BinUnpackError, VromfsUnpackError, EnvironmentError) as e:
+        logger.error('Ошибка при чтении образцов.')
+        logger.exception(e)
+        return 1
+
+    logger.info(f'Образцов: {len(samples)}, размер: {sum(map(len, samples))}')
+    try:
+        dict_ = train_dict(samples, args.dict_size, args.level)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+
+    dict_data = dict_.as_bytes()
+    path = args.out_path / make_dict_path(dict_data)
+    path.write_bytes(dict_data)
+    logger.info(f'Словарь: {str(path)!r}')
+
+    report = evaluate_dict(dict_, samples, args.level)
+    m = report._asdict()
+    m.update(plain_ratio=report.plain_ratio, dict_ratio=report.dict_ratio, speedup=report.speedup)
+    print(json.dumps(m))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Обучение zstd словарей по корпусу blk файлов.
+Образцы выбираются из дерева файлов или из содержимого контейнеров, сжатые блоки *_ZST предварительно распаковываются.
+Имя словаря - SHA-256 дайджест его содержимого, как ожидает поле dict_path общей таблицы имен.
+"""
+
+from hashlib import sha256
+import os
+from pathlib import Path
+import random
+from time import perf_counter
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Union
+from zstandard import ZstdCompressionDict, ZstdCompressor, ZstdDecompressor, ZstdError, train_dictionary
+from vromfs.bin import BinFile
+
+__all__ = [
+    'DictReport',
+    'blk_payload',
+    'evaluate_dict',
+    'make_dict_path',
+    'sample_containers',
+    'sample_tree',
+    'select_samples',
+    'train_dict',
+]
+
+DICT_SIZE = 32 * 2 ** 10
+"""Размер словаря по умолчанию, байт."""
+
+BLK_SUFFIX = '.blk'
+
+PLAIN_TYPES = frozenset((0x01, 0x03))
+"""Первый байт несжатых двоичных blk: FAT, SLIM."""
+
+ZST_TYPES = frozenset((0x02, 0x04, 0x05))
+"""Первый байт сжатых двоичных blk: FAT_ZST, SLIM_ZST, SLIM_ZST_DICT."""
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+FRAME_OFFSETS = (1, 4)
+"""Возможные смещения zstd кадра в сжатом blk: сразу за типом или за 3-байтовым размером."""
+
+
+def make_dict_path(dict_data: bytes) -> Path:
+    """
+    Имя файла словаря по его содержимому: SHA-256 дайджест в шестнадцатеричной записи с суффиксом ``.dict``.
+    Длина дайджеста совпадает с шириной поля dict_path в CompressedSharedNames.
+
+    :param dict_data: Содержимое словаря.
+    :return: Имя файла словаря.
+    """
+
+    return Path(f'{sha256(dict_data).hexdigest()}.dict')
+
+
+def blk_payload(data: bytes, dctx: Optional[ZstdDecompressor] = None) -> Optional[bytes]:
+    """
+    Данные blk файла для обучения словаря. Для несжатых двоичных blk - данные без байта типа,
+    для сжатых - распакованный zstd кадр, для текстовых - содержимое как есть.
+    None, если данные пусты или сжатый кадр не удалось распаковать, например без нужного словаря.
+
+    :param data: Содержимое файла.
+    :param dctx: Декомпрессор контейнера, для SLIM_ZST_DICT - со словарем контейнера.
+    """
+
+    if not data:
+        return None
+
+    type_ = data[0]
+    if type_ in PLAIN_TYPES:
+        return data[1:] or None
+    if type_ in ZST_TYPES:
+        for offset in FRAME_OFFSETS:
+            if data[offset:offset+len(ZSTD_MAGIC)] == ZSTD_MAGIC:
+                try:
+                    return (dctx or ZstdDecompressor()).decompressobj().decompress(data[offset:]) or None
+                except ZstdError:
+                    return None
+        return None
+    return data
+
+
+def sample_tree(root: os.PathLike, suffix: str = BLK_SUFFIX) -> Iterator[bytes]:
+    """
+    Образцы из файлов дерева root с суффиксом suffix в порядке путей.
+
+    :raises TypeError: Неверный тип root.
+    :raises EnvironmentError: Ошибка чтения файла.
+    """
+
+    if not isinstance(root, os.PathLike):
+        raise TypeError('root: ожидался PathLike: {}'.format(type(root)))
+
+    for path in sorted(Path(root).rglob('*' + suffix)):
+        if path.is_file():
+            payload = blk_payload(path.read_bytes())
+            if payload is not None:
+                yield payload
+
+
+def sample_containers(paths: Iterable[os.PathLike], suffix: str = BLK_SUFFIX) -> Iterator[bytes]:
+    """
+    Образцы из файлов с суффиксом suffix в контейнерах paths. Сжатые blk распаковываются декомпрессором контейнера.
+
+    :raises BinUnpackError: Ошибка при чтении контейнера.
+    :raises VromfsUnpackError: Ошибка при построении пространства имен.
+    :raises EnvironmentError: Ошибка доступа к контейнеру.
+    """
+
+    from vromfs.vromfs import VromfsFile
+
+    for path in paths:
+        with BinFile(Path(path)) as bin_file:
+            vromfs = VromfsFile(bin_file)
+            infos = [info for info in vromfs.info_list if info.name.endswith(suffix)]
+            if not infos:
+                continue
+            dctx = vromfs.dctx
+            for info in infos:
+                payload = blk_payload(vromfs.unpack_into(info).getvalue(), dctx)
+                if payload is not None:
+                    yield payload
+
+
+def select_samples(samples: Iterable[bytes], max_count: int = 10000, max_size: Optional[int] = None,
+                   seed: int = 0) -> List[bytes]:
+    """
+    Равновероятная выборка не более max_count образцов, reservoir sampling с начальным значением seed.
+    Если задан max_size, в выборку входят образцы в пределах суммарного размера max_size.
+    Результат полностью определяется образцами и seed.
+
+    :raises ValueError: Max_count меньше 1.
+    """
+
+    if max_count < 1:
+        raise ValueError('max_count: ожидалось положительное: {}'.format(max_count))
+
+    rng = random.Random(seed)
+    reservoir = []
+    for i, sample in enumerate(samples):
+        if i < max_count:
+            reservoir.append(sample)
+        else:
+            j = rng.randrange(i + 1)
+            if j < max_count:
+                reservoir[j] = sample
+
+    if max_size is not None:
+        selected = []
+        total = 0
+        for sample in reservoir:
+            if total + len(sample) > max_size:
+                continue
+            selected.append(sample)
+            total += len(sample)
+        reservoir = selected
+
+    return reservoir
+
+
+def train_dict(samples: Sequence[bytes], dict_size: int = DICT_SIZE, level: int = 3, threads: int = 0
+               ) -> ZstdCompressionDict:
+    """
+    Обучение словаря размера dict_size по образцам samples.
+
+    :param level: Уровень сжатия, под который оптимизируется словарь.
+    :param threads: Число потоков обучения, 0 - один поток, -1 - по числу процессоров.
+    :raises ValueError: Недостаточно образцов для обучения.
+    """
+
+    try:
+        return train_dictionary(dict_size, list(samples), level=level, threads=threads)
+    except ZstdError as e:
+        raise ValueError('Недостаточно образцов для обучения словаря.') from e
+
+
+class DictReport(NamedTuple):
+    samples: int
+    """Число образцов."""
+
+    size: int
+    """Суммарный размер образцов, байт."""
+
+    plain_size: int
+    """Размер после сжатия без словаря, байт."""
+
+    dict_size: int
+    """Размер после сжатия со словарем, байт."""
+
+    plain_time: float
+    """Время распаковки без словаря, с."""
+
+    dict_time: float
+    """Время распаковки со словарем, с."""
+
+    @property
+    def plain_ratio(self) -> float:
+        return self.size / self.plain_size if self.plain_size else 0.0
+
+    @property
+    def dict_ratio(self) -> float:
+        return self.size / self.dict_size if self.dict_size else 0.0
+
+    @property
+    def speedup(self) -> float:
+        """Отношение времени распаковки без словаря ко времени со словарем."""
+
+        return self.plain_time / self.dict_time if self.dict_time else 0.0
+
+
+def _compress_all(samples: Sequence[bytes], cctx: ZstdCompressor) -> List[bytes]:
+    return [cctx.compress(sample) for sample in samples]
+
+
+def _decompress_time(frames: Sequence[bytes], dctx: ZstdDecompressor) -> float:
+    t = perf_counter()
+    for frame in frames:
+        dctx.decompress(frame)
+    return perf_counter() - t
+
+
+def evaluate_dict(dict_data: Union[bytes, ZstdCompressionDict], samples: Sequence[bytes], level: int = 3
+                  ) -> DictReport:
+    """
+    Сравнение сжатия образцов по отдельности без словаря и со словарем dict_data на уровне level.
+
+    :raises ZstdError: Неверные данные словаря.
+    """
+
+    if not isinstance(dict_data, ZstdCompressionDict):
+        dict_data = ZstdCompressionDict(dict_data)
+
+    plain = _compress_all(samples, ZstdCompressor(level=level))
+    with_dict = _compress_all(samples, ZstdCompressor(level=level, dict_data=dict_data))
+    plain_time = _decompress_time(plain, ZstdDecompressor())
+    dict_time = _decompress_time(with_dict, ZstdDecompressor(dict_data=dict_data))
+    return DictReport(len(samples), sum(map(len, samples)), sum(map(len, plain)), sum(map(len, with_dict)),
+                      plain_time, dict_time)
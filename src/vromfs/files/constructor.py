@@ -0,0 +1,74 @@
+"""
+Двоичные blk блоки на уровне таблиц: имена, параметры и блоки без построения секций.
+Используется упаковщиком SLIM: перевод FAT в SLIM сводится к замене индексов имен, данные параметров копируются.
+
+Данные блока после байта типа, для FAT_ZST - после распаковки::
+
+    names_count       ULEB128
+    names_size        ULEB128
+    names             names_size байт, имена завершены нулем
+    blocks_count      ULEB128
+    params_count      ULEB128
+    params_data_size  ULEB128
+    params_data       params_data_size байт: строки и значения больше 4 байт
+    params            params_count * (UInt24ul индекс имени, UInt8 тип, UInt32ul значение)
+    blocks            blocks_count * (ULEB128 индекс имени + 1, 0 - без имени; ULEB128 число параметров;
+                      ULEB128 число дочерних блоков; ULEB128 индекс первого дочернего блока, если они есть)
+
+Блок 0 - корень. Параметры распределяются по блокам подряд в порядке блоков.
+Значение строки - смещение строки, завершенной нулем, в params_data или, с флагом NAME_ID_FLAG, индекс имени.
+FAT_ZST: UInt24ul размер zstd кадра и кадр с данными FAT.
+SLIM, SLIM_ZST, SLIM_ZST_DICT: индексы имен меньше числа имен общей таблицы ``nm`` ссылаются на нее,
+остальные - на names блока.
+"""
+
+import construct as ct
+from construct import this
+
+__all__ = [
+    'BlkData',
+    'FatZstData',
+    'NAME_ID_FLAG',
+    'STRING_TYPE',
+]
+
+STRING_TYPE = 1
+"""Тип строкового параметра."""
+
+NAME_ID_FLAG = 0x80000000
+"""Флаг значения строки: индекс имени вместо смещения в params_data."""
+
+RawCString = ct.NullTerminated(ct.GreedyBytes)
+
+Names = ct.FocusedSeq(
+    'names',
+    'count' / ct.Rebuild(ct.VarInt, ct.len_(this.names)),
+    'names' / ct.Prefixed(ct.VarInt, ct.Array(this.count, RawCString)),
+)
+
+ParamInfo = ct.Struct(
+    'name_id' / ct.Int24ul,
+    'type' / ct.Int8ul,
+    'value' / ct.Int32ul,
+)
+
+BlockInfo = ct.Struct(
+    'name_id' / ct.VarInt,
+    'params_count' / ct.VarInt,
+    'blocks_count' / ct.VarInt,
+    'first_block_id' / ct.If(this.blocks_count > 0, ct.VarInt),
+)
+
+BlkData = ct.Struct(
+    'names' / Names,
+    'blocks_count' / ct.Rebuild(ct.VarInt, ct.len_(this.blocks)),
+    'params_count' / ct.Rebuild(ct.VarInt, ct.len_(this.params)),
+    'params_data' / ct.Prefixed(ct.VarInt, ct.GreedyBytes),
+    'params' / ct.Array(this.params_count, ParamInfo),
+    'blocks' / ct.Array(this.blocks_count, BlockInfo),
+    ct.Terminated,
+)
+"""Данные FAT или SLIM блока без байта типа."""
+
+FatZstData = ct.Prefixed(ct.Int24ul, ct.GreedyBytes)
+"""Сжатые данные FAT_ZST блока без байта типа."""
@@ -1,13 +1,19 @@
+from array import array
 from collections import OrderedDict
+from itertools import accumulate, chain, count
 from pathlib import Path
 import typing as t
 import construct as ct
 from construct import this
 import zstandard as zstd
-from blk.types import Name, Str
-from blk.binary.constructor import Names
+from vromfs.dictionary import make_dict_path  # Перенесен в vromfs.dictionary, имя сохранено для совместимости.
 from .errors import *
 
+if t.TYPE_CHECKING:
+    from blk.types import Name, Str
+
+# Модуль blk загружается при первом использовании: декодирование таблицы и сжатие SharedNames его не требуют.
+
 T = t.TypeVar('T')
 VT = t.Union[T, t.Callable[[ct.Container], T]]
 
@@ -16,29 +22,29 @@ def not_implemented(obj: t.Any, context: ct.Container) -> t.NoReturn:
     raise NotImplementedError
 
 
-MAX_OUTPUT_SIZE = 5 * 2 ** 20
 NO_DICT = '00' * 32
+HEADER_SIZE = 40
+"""Размер заголовка сжатой таблицы: хеш и dict_path."""
 
 
 class ZstdCompressed(ct.Tunnel):
-    def __init__(self, subcon,
-                 dctx: VT[zstd.ZstdDecompressor], cctx: VT[zstd.ZstdCompressor], max_output_size: VT[int]):
+    """Zstd кадр без ограничения размера распакованных данных."""
+
+    def __init__(self, subcon, dctx: VT[zstd.ZstdDecompressor], cctx: VT[zstd.ZstdCompressor]):
         super().__init__(subcon)
         self.dctx = dctx
         self.cctx = cctx
-        self.max_output_size = max_output_size
 
     def _decode(self, data: bytes, context: ct.Container, path: str):
         dctx = ct.evaluate(self.dctx, context)
-        max_output_size = ct.evaluate(self.max_output_size, context)
-        return dctx.decompress(data, max_output_size=max_output_size)
+        return dctx.decompressobj().decompress(data)
 
     def _encode(self, data: bytes, context: ct.Container, path: str) -> bytes:
         cctx = ct.evaluate(self.cctx, context)
         return cctx.compress(data)
 
 
-NameLike = t.Union[Name, Str]
+NameLike = t.Union['Name', 'Str']
 
 
 class InvNamesMap(OrderedDict):
@@ -76,10 +82,143 @@ CompressedSharedNames = ct.FocusedSeq(
     'names_bs',
     'hash' / ct.Rebuild(ct.Int64ul, 0x6873616868736168),  # как формируется хеш?
     'dict_path' / ct.Rebuild(DictPath(ct.Bytes(32)), this._.dict_path),  # как формируется хеш?
-    'names_bs' / ZstdCompressed(ct.GreedyBytes, this._.dctx, this._.cctx, MAX_OUTPUT_SIZE),
+    'names_bs' / ZstdCompressed(ct.GreedyBytes, this._.dctx, this._.cctx),
 )
 
 
+def _read_uleb(data: bytes, pos: int) -> t.Tuple[int, int]:
+    """Число в записи LEB128 с позиции pos и позиция за ним."""
+
+    value = shift = 0
+    while True:
+        try:
+            byte = data[pos]
+        except IndexError:
+            raise ComposeError('Неожиданный конец таблицы имен.') from None
+        value |= (byte & 0x7f) << shift
+        pos += 1
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _uleb(value: int) -> bytes:
+    """Запись числа в LEB128."""
+
+    bs = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            bs.append(byte | 0x80)
+        else:
+            bs.append(byte)
+            return bytes(bs)
+
+
+class SharedNames(t.Sequence[NameLike]):
+    """
+    Общая таблица имен в компактном виде: распакованные данные таблицы и смещения имен в них.
+    Имена декодируются при обращении, отображение имя => индекс строится при первом запросе.
+    Разбор таблицы и raw не требуют blk, имена по индексу и отображение возвращаются как blk.types.Name.
+    """
+
+    def __init__(self, names_bs: bytes):
+        """
+        :param names_bs: Распакованные данные таблицы: число имен, размер блока имен в LEB128 и имена,
+            завершенные нулем, как в blk.binary.constructor.Names.
+        :raises ComposeError: Неверный формат данных.
+        """
+
+        count, pos = _read_uleb(names_bs, 0)
+        size, pos = _read_uleb(names_bs, pos)
+        end = pos + size
+        if end > len(names_bs) or (size and names_bs[end-1] != 0):
+            raise ComposeError('Неверный размер блока имен: {}'.format(size))
+
+        lengths = (len(name) + 1 for name in names_bs[pos:end-1].split(b'\x00')) if size else ()
+        offsets = array('I', accumulate(chain((pos,), lengths)))
+        if len(offsets) - 1 != count:
+            raise ComposeError('Число имен {} не совпадает с заявленным {}.'.format(len(offsets) - 1, count))
+
+        self.names_bs = names_bs
+        """Распакованные данные таблицы."""
+
+        self._offsets = offsets
+        self._inv_names_map: t.Optional[InvNamesMap] = None
+
+    @classmethod
+    def of(cls, names: t.Iterable[str]) -> 'SharedNames':
+        """
+        Таблица из последовательности имен в порядке индексов.
+
+        :raises SerializeError: Имя содержит нулевой символ.
+        """
+
+        encoded = [name.encode('utf8') for name in names]
+        if any(b'\x00' in name for name in encoded):
+            raise SerializeError('Имя содержит нулевой символ.')
+        block = b''.join(name + b'\x00' for name in encoded)
+        return cls(_uleb(len(encoded)) + _uleb(len(block)) + block)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def raw(self, i: int) -> bytes:
+        """Имя с индексом i в кодировке utf8."""
+
+        return self.names_bs[self._offsets[i]:self._offsets[i+1]-1]
+
+    def __getitem__(self, i):
+        """
+        :raises IndexError: Индекс вне таблицы.
+        :raises ComposeError: Имя не в кодировке utf8.
+        """
+
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('Индекс имени вне таблицы: {}'.format(i))
+        from blk.types import Name
+
+        try:
+            return Name(self.raw(i).decode('utf8'))
+        except UnicodeDecodeError as e:
+            raise ComposeError('Имя {} не в кодировке utf8: {}'.format(i, e)) from e
+
+    def inv_names_map(self) -> InvNamesMap:
+        """
+        Отображение имя => индекс для сериализации блоков. Строится при первом вызове.
+
+        :raises ComposeError: Имена не в кодировке utf8.
+        """
+
+        if self._inv_names_map is None:
+            from blk.types import Name
+
+            if len(self):
+                try:
+                    text = self.names_bs[self._offsets[0]:self._offsets[-1]-1].decode('utf8')
+                except UnicodeDecodeError as e:
+                    raise ComposeError('Имена не в кодировке utf8: {}'.format(e)) from e
+                inv_names_map = InvNamesMap(zip(map(Name, text.split('\x00')), count()))
+            else:
+                inv_names_map = InvNamesMap()
+            if len(inv_names_map) != len(self):
+                # Повторы: индекс имени - первое вхождение.
+                inv_names_map = InvNamesMap.of(self)
+            self._inv_names_map = inv_names_map
+        return self._inv_names_map
+
+    def index(self, name: NameLike) -> int:
+        return self.inv_names_map()[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.inv_names_map()
+
+
 def decompress_shared_names(istream: t.BinaryIO, dctx: zstd.ZstdDecompressor) -> bytes:
     try:
         return CompressedSharedNames.parse_stream(istream, dctx=dctx)
@@ -95,17 +234,37 @@ def compress_shared_names(names_bs: bytes, ostream: t.BinaryIO,
         raise SerializeError(str(e))
 
 
-def compose_shared_names(istream: t.BinaryIO, dctx: zstd.ZstdDecompressor) -> InvNamesMap:
+def decode_shared_names(istream: t.BinaryIO, dctx: zstd.ZstdDecompressor) -> SharedNames:
+    """
+    Потоковое чтение общей таблицы имен без ограничения размера распакованных данных.
+
+    :raises ComposeError: Неверный формат таблицы или ошибка распаковки.
+    """
+
+    if len(istream.read(HEADER_SIZE)) != HEADER_SIZE:
+        raise ComposeError('Неожиданный конец заголовка таблицы имен.')
     try:
-        shared_names_bs = CompressedSharedNames.parse_stream(istream, dctx=dctx)
-        names = Names.parse(shared_names_bs)
-        return InvNamesMap.of(names)
-    except (TypeError, ValueError, ct.ConstructError, zstd.ZstdError) as e:
+        with dctx.stream_reader(istream, closefd=False) as reader:
+            names_bs = reader.readall()
+    except zstd.ZstdError as e:
         raise ComposeError(str(e))
+    return SharedNames(names_bs)
+
+
+def compose_shared_names(istream: t.BinaryIO, dctx: zstd.ZstdDecompressor) -> InvNamesMap:
+    return decode_shared_names(istream, dctx).inv_names_map()
 
 
-def serialize_shared_names(inv_names_map: InvNamesMap, ostream: t.BinaryIO,
+def serialize_shared_names(inv_names_map: t.Union[InvNamesMap, SharedNames], ostream: t.BinaryIO,
                            cctx: zstd.ZstdCompressor, dict_path: t.Optional[Path]):
+    """Данные SharedNames сжимаются как есть, без построения отображения."""
+
+    if isinstance(inv_names_map, SharedNames):
+        compress_shared_names(inv_names_map.names_bs, ostream, cctx, dict_path)
+        return
+
+    from blk.binary.constructor import Names
+
     try:
         shared_names_bs = Names.build(inv_names_map)
         CompressedSharedNames.build_stream(shared_names_bs, ostream, cctx=cctx, dict_path=dict_path)
@@ -0,0 +1,263 @@
+"""
+Подготовка дерева файлов к упаковке в формате игры: общая таблица имен ``nm``, zstd словарь и blk блоки
+SLIM_ZST_DICT (SLIM_ZST без словаря) вместо самодостаточных FAT блоков.
+
+Имена параметров и блоков, а также строки, заданные индексом имени, всех FAT и FAT_ZST блоков собираются пулом
+процессов в общую таблицу, частые имена получают меньшие индексы. Блоки переводятся в SLIM на уровне таблиц
+vromfs.files.constructor: индексы имен заменяются индексами общей таблицы, данные параметров копируются как есть,
+поэтому секции blk не строятся и blk не требуется. Остальные файлы копируются как есть.
+"""
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import os
+from pathlib import Path
+import shutil
+from typing import Callable, Iterable, Iterator, List, Mapping, Optional, Sequence, TypeVar
+import construct as ct
+from zstandard import ZstdCompressionDict, ZstdCompressor, ZstdDecompressor, ZstdError
+from vromfs.dictionary import DICT_SIZE, make_dict_path, select_samples, train_dict
+from vromfs.vromfs.packer import SourceFile, scan_tree
+from .constructor import NAME_ID_FLAG, STRING_TYPE, BlkData, FatZstData
+from .errors import ComposeError, SerializeError
+
+__all__ = [
+    'SlimReport',
+    'prepare_slim_tree',
+]
+
+T = TypeVar('T')
+
+BLK_SUFFIX = '.blk'
+
+FAT = 0x01
+FAT_ZST = 0x02
+SLIM_ZST = 0x04
+SLIM_ZST_DICT = 0x05
+
+
+class SlimReport:
+    """Сводка подготовки дерева. Заполняется, если передана как параметр report."""
+
+    def __init__(self):
+        self.files = 0
+        """Число файлов исходного дерева."""
+
+        self.converted = 0
+        """Число blk файлов, преобразованных в SLIM."""
+
+        self.names = 0
+        """Число имен в общей таблице имен."""
+
+        self.in_size = 0
+        """Суммарный размер преобразованных файлов до преобразования."""
+
+        self.out_size = 0
+        """Суммарный размер преобразованных файлов после преобразования."""
+
+        self.dict_path: Optional[Path] = None
+        """Имя файла словаря. None, если блоки сжаты без словаря."""
+
+    def as_dict(self) -> Mapping[str, object]:
+        m = dict(vars(self))
+        m['dict_path'] = None if self.dict_path is None else self.dict_path.as_posix()
+        return m
+
+    def __repr__(self) -> str:
+        return '{}({})'.format(type(self).__name__, ', '.join(f'{k}={v!r}' for k, v in vars(self).items()))
+
+
+def _compose(data: bytes) -> Optional[ct.Container]:
+    """Таблицы FAT или FAT_ZST блока, имена декодированы. None для остальных файлов."""
+
+    if not data or data[0] not in (FAT, FAT_ZST):
+        return None
+
+    try:
+        if data[0] == FAT:
+            blk_data = BlkData.parse(data[1:])
+        else:
+            frame = FatZstData.parse(data[1:])
+            blk_data = BlkData.parse(ZstdDecompressor().decompressobj().decompress(frame))
+        blk_data.names = [name.decode('utf8') for name in blk_data.names]
+    except (ct.ConstructError, ZstdError, UnicodeDecodeError) as e:
+        raise ComposeError(str(e)) from e
+    return blk_data
+
+
+def _is_name_ref(param: ct.Container) -> bool:
+    return param.type == STRING_TYPE and bool(param.value & NAME_ID_FLAG)
+
+
+def _used_names(blk_data: ct.Container) -> Iterator[str]:
+    """Имена параметров, блоков и строки-имена с повторами, в порядке таблиц."""
+
+    names = blk_data.names
+    try:
+        for param in blk_data.params:
+            yield names[param.name_id]
+            if _is_name_ref(param):
+                yield names[param.value & ~NAME_ID_FLAG]
+        for block in blk_data.blocks:
+            if block.name_id:
+                yield names[block.name_id - 1]
+    except IndexError as e:
+        raise ComposeError('Индекс имени вне таблицы имен блока.') from e
+
+
+def _serialize_slim(blk_data: ct.Container, index: Mapping[str, int]) -> bytes:
+    """Данные SLIM блока без байта типа: все имена в общей таблице index."""
+
+    names = blk_data.names
+    params = []
+    for param in blk_data.params:
+        value = param.value
+        if _is_name_ref(param):
+            value = NAME_ID_FLAG | index[names[value & ~NAME_ID_FLAG]]
+        params.append(dict(name_id=index[names[param.name_id]], type=param.type, value=value))
+    blocks = [dict(block, name_id=index[names[block.name_id - 1]] + 1 if block.name_id else 0)
+              for block in blk_data.blocks]
+    try:
+        return BlkData.build(dict(names=[], params_data=blk_data.params_data, params=params, blocks=blocks))
+    except ct.ConstructError as e:
+        raise SerializeError(str(e)) from e
+
+
+def _count_names(path: str) -> Optional[Counter]:
+    with open(path, 'rb') as istream:
+        blk_data = _compose(istream.read())
+    return None if blk_data is None else Counter(_used_names(blk_data))
+
+
+_index: Optional[Mapping[str, int]] = None
+
+
+def _init_worker(index: Optional[Mapping[str, int]]) -> None:
+    global _index
+    _index = index
+
+
+def _slim_data(path: str) -> bytes:
+    with open(path, 'rb') as istream:
+        return _serialize_slim(_compose(istream.read()), _index)
+
+
+def _map(f: Callable[[str], T], paths: Sequence[str], jobs: int, index: Optional[Mapping[str, int]] = None
+         ) -> Iterator[T]:
+    if jobs == 1:
+        _init_worker(index)
+        yield from map(f, paths)
+        return
+    with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(index,)) as executor:
+        yield from executor.map(f, paths, chunksize=16)
+
+
+def order_names(counters: Iterable[Counter]) -> List[str]:
+    """
+    Имена в порядке индексов общей таблицы: по убыванию числа вхождений, при равенстве - по первому появлению.
+    Индексы SLIM блока кодируются числами переменной длины, поэтому частые имена получают меньшие индексы.
+    """
+
+    total = Counter()
+    first = {}
+    for counter in counters:
+        for name in counter:
+            first.setdefault(name, len(first))
+        total.update(counter)
+    return sorted(first, key=lambda name: (-total[name], first[name]))
+
+
+def prepare_slim_tree(source: os.PathLike, target: os.PathLike, dict_data: Optional[bytes] = None,
+                      train: bool = False, dict_size: int = DICT_SIZE, level: int = 3, jobs: int = 1,
+                      report: Optional[SlimReport] = None) -> Sequence[Path]:
+    """
+    Запись в пустую директорию target дерева source с общей таблицей имен ``nm``, словарем и SLIM блоками.
+    Результат упаковывается VromfsFile.pack_into.
+
+    :param source: Исходное дерево. Не должно содержать ``nm``.
+    :param target: Выходная директория.
+    :param dict_data: Словарь zstd для сжатия блоков и ``nm``.
+    :param train: Обучить словарь по данным SLIM блоков, если dict_data не задан.
+    :param dict_size: Размер обучаемого словаря.
+    :param level: Уровень сжатия.
+    :param jobs: Число процессов для разбора FAT и формирования SLIM блоков.
+    :param report: Сводка, заполняется при подготовке.
+    :return: Относительные пути файлов выходного дерева.
+    :raises TypeError: Неверный тип source или target.
+    :raises ValueError: Source содержит ``nm`` или словарь при заданном словаре. Недостаточно данных для обучения
+        словаря.
+    :raises ComposeError: Ошибка при разборе FAT или FAT_ZST блока.
+    :raises SerializeError: Ошибка при формировании SLIM блока или ``nm``.
+    :raises EnvironmentError: Ошибка чтения или записи файла.
+    """
+
+    if not isinstance(source, os.PathLike):
+        raise TypeError('source: ожидался PathLike: {}'.format(type(source)))
+    if not isinstance(target, os.PathLike):
+        raise TypeError('target: ожидался PathLike: {}'.format(type(target)))
+    if report is None:
+        report = SlimReport()
+
+    files = scan_tree(os.fspath(source))
+    if any(f.name == 'nm' for f in files):
+        raise ValueError('source: дерево уже содержит общую таблицу имен nm.')
+    if (dict_data is not None or train) and any(f.name.endswith('.dict') for f in files):
+        raise ValueError('source: дерево уже содержит словарь.')
+    report.files = len(files)
+
+    from .shared_names import SharedNames, serialize_shared_names
+
+    blk_files = [f for f in files if f.name.endswith(BLK_SUFFIX)]
+    counters = list(_map(_count_names, [f.path for f in blk_files], jobs))
+    slim_files: List[SourceFile] = [f for f, c in zip(blk_files, counters) if c is not None]
+    names = order_names(c for c in counters if c is not None)
+    index = {name: i for i, name in enumerate(names)}
+    report.names = len(names)
+
+    target = Path(target)
+    rpaths = []
+
+    def write(name: str, data: bytes) -> None:
+        path = target / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        rpaths.append(Path(name))
+
+    slim = _map(_slim_data, [f.path for f in slim_files], jobs, index)
+    if dict_data is None and train and slim_files:
+        slim = list(slim)
+        dict_data = train_dict(select_samples(slim), dict_size, level).as_bytes()
+
+    if dict_data is None:
+        cctx = ZstdCompressor(level=level)
+        block_type = bytes([SLIM_ZST])
+    else:
+        cctx = ZstdCompressor(level=level, dict_data=ZstdCompressionDict(dict_data))
+        block_type = bytes([SLIM_ZST_DICT])
+        report.dict_path = make_dict_path(dict_data)
+
+    converted = set()
+    for f, data in zip(slim_files, slim):
+        block = block_type + cctx.compress(data)
+        write(f.name, block)
+        converted.add(f.name)
+        report.converted += 1
+        report.in_size += os.stat(f.path).st_size
+        report.out_size += len(block)
+
+    for f in files:
+        if f.name not in converted:
+            path = target / f.name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(f.path, path)
+            rpaths.append(Path(f.name))
+
+    if report.dict_path is not None:
+        write(report.dict_path.as_posix(), dict_data)
+
+    nm = BytesIO()
+    serialize_shared_names(SharedNames.of(names), nm, cctx, report.dict_path)
+    write('nm', nm.getvalue())
+
+    return rpaths
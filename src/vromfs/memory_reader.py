@@ -0,0 +1,73 @@
+from io import IOBase, SEEK_CUR, SEEK_END, SEEK_SET
+
+__all__ = [
+    'MemoryReader',
+]
+
+
+class MemoryReader(IOBase):
+    """
+    Поток только для чтения поверх буфера, например отображенного в память файла, без копирования буфера.
+    """
+
+    def __init__(self, buffer):
+        """
+        :param buffer: Объект с буферным протоколом.
+        """
+
+        self._view = memoryview(buffer).cast('B')
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, target: int, whence: int = SEEK_SET) -> int:
+        if whence == SEEK_SET:
+            if target < 0:
+                raise ValueError('negative seek value {}'.format(target))
+            pos = target
+        elif whence == SEEK_CUR:
+            pos = self.pos + target
+        elif whence == SEEK_END:
+            pos = len(self._view) + target
+        else:
+            raise ValueError('invalid whence ({}, should be {}, {} or {})'.format(whence, SEEK_SET, SEEK_CUR, SEEK_END))
+        self.pos = 0 if pos < 0 else pos
+
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            end = len(self._view)
+        else:
+            end = self.pos + size
+        data = bytes(self._view[self.pos:end])
+        self.pos += len(data)
+        return data
+
+    def readinto(self, b) -> int:
+        n = self.readinto_at(self.pos, memoryview(b).cast('B'))
+        self.pos += n
+        return n
+
+    def readinto_at(self, offset: int, b: memoryview) -> int:
+        """
+        Чтение в буфер b с позиции offset без смены текущей позиции потока.
+
+        :return: Число прочитанных байт.
+        """
+
+        chunk = self._view[offset:offset+len(b)]
+        n = len(chunk)
+        b[:n] = chunk
+        return n
+
+    def close(self) -> None:
+        self._view.release()
+        super().close()
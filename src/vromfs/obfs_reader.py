@@ -3,6 +3,7 @@ from typing import Iterable
 
 __all__ = [
     'ObfsReader',
+    'ObfsWriter',
     'deobfuscate',
     'obfuscate',
 ]
@@ -108,3 +109,53 @@ class ObfsReader(IOBase):
                         data = bytes(buf)
 
         return data
+
+
+class ObfsWriter(IOBase):
+    """
+    Обфускация при последовательной записи в wrapped.
+    Положение хвоста зависит от итогового размера, поэтому последние байты удерживаются до close.
+    """
+
+    hold = 32
+
+    def __init__(self, wrapped: IOBase):
+        self.wrapped = wrapped
+        self.size = 0
+        self._held = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        if self.closed:
+            raise ValueError("write to closed file")
+        self._held += b
+        # Удержанных байт должно хватать и на хвост, и на голову маленького образа.
+        if len(self._held) > 2 * self.hold:
+            pos = len(self._held) - self.hold
+            self._emit(self._held[:pos], self.size + len(self._held))
+            del self._held[:pos]
+        return len(b)
+
+    def _emit(self, buf: bytearray, sz: int) -> None:
+        # sz - нижняя граница итогового размера, достаточная для решения об обфускации головы.
+        if sz >= 16 and self.size < 16:
+            ks = head_ks[self.size:]
+            inplace_xor(buf, 0, len(ks), ks)
+        self.wrapped.write(buf)
+        self.size += len(buf)
+
+    def close(self) -> None:
+        """Запись удержанных байт с обфускацией хвоста. Wrapped не закрывается."""
+
+        if not self.closed:
+            buf = self._held
+            sz = self.size + len(buf)
+            if sz >= 32:
+                pos = (sz & 0x03ff_fffc) - 16 - self.size
+                for i, k in enumerate(tail_ks):
+                    buf[pos + i] ^= k
+            self._emit(buf, sz)
+            self._held = bytearray()
+        super().close()
@@ -0,0 +1,111 @@
+from io import IOBase, SEEK_CUR, SEEK_END, SEEK_SET
+import os
+import sys
+from tempfile import TemporaryFile
+from threading import RLock
+from typing import BinaryIO, Optional
+from vromfs.common import CHUNK_SIZE
+
+__all__ = [
+    'SpoolReader',
+]
+
+
+class SpoolReader(IOBase):
+    """
+    Поток с произвольным доступом поверх потока, который читается только последовательно.
+    Прочитанные данные сохраняются во временном файле, поэтому каждый байт исходного потока читается один раз,
+    а переходы назад не требуют повторного чтения, например, повторной распаковки zstd потока контейнера.
+    """
+
+    def __init__(self, wrapped: IOBase, spool: Optional[BinaryIO] = None):
+        """
+        :param wrapped: Исходный поток в начальной позиции.
+        :param spool: Поток для сохранения прочитанных данных. Если не указан, создается временный файл.
+        """
+
+        self.wrapped = wrapped
+        self._spool = TemporaryFile() if spool is None else spool
+        self._spooled = 0
+        self._eof = False
+        self._lock = RLock()
+        self.pos = 0
+
+    @property
+    def spooled(self) -> int:
+        """Число байт, прочитанных из исходного потока."""
+
+        return self._spooled
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def _fill(self, end: int) -> None:
+        # Проверка без блокировки: spooled увеличивается только после записи порции в файл,
+        # поэтому учтенные данные доступны для os.preadv.
+        if self._eof or self._spooled >= end:
+            return
+
+        with self._lock:
+            self._spool.seek(self._spooled)
+            while not self._eof and self._spooled < end:
+                chunk = self.wrapped.read(CHUNK_SIZE)
+                if not chunk:
+                    self._eof = True
+                    break
+                self._spool.write(chunk)
+                self._spool.flush()
+                self._spooled += len(chunk)
+
+    def seek(self, target: int, whence: int = SEEK_SET) -> int:
+        if whence == SEEK_SET:
+            if target < 0:
+                raise ValueError('negative seek value {}'.format(target))
+            pos = target
+        elif whence == SEEK_CUR:
+            pos = self.pos + target
+        elif whence == SEEK_END:
+            self._fill(sys.maxsize)
+            pos = self._spooled + target
+        else:
+            raise ValueError('invalid whence ({}, should be {}, {} or {})'.format(whence, SEEK_SET, SEEK_CUR, SEEK_END))
+        self.pos = 0 if pos < 0 else pos
+
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            self._fill(sys.maxsize)
+            size = -1
+        else:
+            self._fill(self.pos + size)
+
+        with self._lock:
+            self._spool.seek(self.pos)
+            data = self._spool.read(size)
+        self.pos += len(data)
+        return data
+
+    def readinto_at(self, offset: int, b: memoryview) -> int:
+        """
+        Чтение в буфер b с позиции offset без смены текущей позиции потока.
+
+        :return: Число прочитанных байт.
+        """
+
+        self._fill(offset + len(b))
+        if hasattr(os, 'preadv'):
+            return os.preadv(self._spool.fileno(), [b], offset)
+        with self._lock:
+            self._spool.seek(offset)
+            return self._spool.readinto(b)
+
+    def close(self) -> None:
+        self._spool.close()
+        super().close()
@@ -0,0 +1,121 @@
+"""
+Счетчики ввода-вывода по уровням потоков.
+Сбор включается передачей объекта IOStats в BinFile или VromfsFile. Без него потоки не оборачиваются.
+"""
+
+from io import IOBase, SEEK_CUR, SEEK_SET
+from time import perf_counter
+from typing import Dict, Iterator, Mapping
+
+__all__ = [
+    'IOStats',
+    'LayerStats',
+    'StatsReader',
+]
+
+
+class LayerStats:
+    """Счетчики одного уровня потоков."""
+
+    def __init__(self):
+        self.reads = 0
+        """Число вызовов read."""
+
+        self.read_bytes = 0
+        """Число прочитанных байт."""
+
+        self.seeks = 0
+        """Число вызовов seek."""
+
+        self.backward_seeks = 0
+        """Число переходов назад."""
+
+        self.resets = 0
+        """Число сбросов потока."""
+
+        self.time = 0.0
+        """Время в read и seek, включая нижележащие уровни, с."""
+
+    def as_dict(self) -> Mapping[str, float]:
+        return dict(vars(self))
+
+    def __repr__(self) -> str:
+        return '{}({})'.format(type(self).__name__, ', '.join(f'{k}={v!r}' for k, v in vars(self).items()))
+
+
+class IOStats:
+    """
+    Счетчики ввода-вывода, сгруппированные по именам уровней:
+
+    - ``ranged`` чтение данных контейнера из входного потока,
+    - ``obfs`` чтение после снятия обфускации,
+    - ``zstd`` распакованные данные, ``resets`` - число сбросов zstd потока,
+    - ``vromfs`` чтение образа VROMFS.
+    """
+
+    def __init__(self):
+        self._layers: Dict[str, LayerStats] = {}
+
+    def layer(self, name: str) -> LayerStats:
+        """Счетчики уровня name, создаются при первом обращении."""
+
+        layer = self._layers.get(name)
+        if layer is None:
+            layer = self._layers[name] = LayerStats()
+        return layer
+
+    def __getitem__(self, name: str) -> LayerStats:
+        return self._layers[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._layers
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layers)
+
+    def update(self, other: 'IOStats') -> None:
+        """Добавление счетчиков other, например, при сведении счетчиков нескольких контейнеров."""
+
+        for name, other_layer in other._layers.items():
+            layer = self.layer(name)
+            for key, value in vars(other_layer).items():
+                setattr(layer, key, getattr(layer, key) + value)
+
+    def as_dict(self) -> Mapping[str, Mapping[str, float]]:
+        return {name: layer.as_dict() for name, layer in self._layers.items()}
+
+
+class StatsReader(IOBase):
+    """Обертка потока для чтения, учитывающая вызовы read и seek в счетчиках уровня."""
+
+    def __init__(self, wrapped: IOBase, stats: LayerStats):
+        self.wrapped = wrapped
+        self.stats = stats
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self.wrapped.seekable()
+
+    def tell(self) -> int:
+        return self.wrapped.tell()
+
+    def seek(self, target: int, whence: int = SEEK_SET) -> int:
+        stats = self.stats
+        stats.seeks += 1
+        if (whence == SEEK_SET and target < self.wrapped.tell()) or (whence == SEEK_CUR and target < 0):
+            stats.backward_seeks += 1
+        t0 = perf_counter()
+        pos = self.wrapped.seek(target, whence)
+        stats.time += perf_counter() - t0
+        return pos
+
+    def read(self, size: int = -1) -> bytes:
+        stats = self.stats
+        t0 = perf_counter()
+        data = self.wrapped.read(size)
+        stats.time += perf_counter() - t0
+        stats.reads += 1
+        stats.read_bytes += len(data)
+        return data
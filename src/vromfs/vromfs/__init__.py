@@ -1,3 +1,23 @@
+from importlib import import_module
+from typing import Any
 from .common import *
 from .error import *
 from .vromfs_file import *
+from .metrics import *
+from .cache import *
+from .overlay import *
+from .file_reader import *
+from .path_index import *
+from .file_index import *
+from .file_table import *
+from .shared import *
+from .common import CONSTRUCTOR_NAMES as _CONSTRUCTOR_NAMES, PACK_NAMES as _PACK_NAMES
+
+
+def __getattr__(name: str) -> Any:
+    if name in _CONSTRUCTOR_NAMES:
+        from . import constructor
+        return getattr(constructor, name)
+    if name in _PACK_NAMES:
+        return getattr(import_module('.' + _PACK_NAMES[name], __name__), name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
@@ -0,0 +1,75 @@
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from zstandard import ZstdCompressionDict
+
+__all__ = [
+    'DependencyCache',
+]
+
+
+class DependencyCache:
+    """
+    Кэш зависимостей образов: словарей zstd и общих таблиц имен.
+    Разделяется между образами одного сеанса распаковки, чтобы одинаковые зависимости загружались один раз.
+    Безопасен для использования из нескольких потоков. Блокировка удерживается только для поиска ключа:
+    зависимости с разными ключами загружаются параллельно, ожидающие одного ключа получают результат одной загрузки.
+    Декомпрессоры не кэшируются: объект ZstdDecompressor не допускает одновременного использования потоками.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._dicts: Dict[Hashable, 'Future[ZstdCompressionDict]'] = {}
+        self._names: Dict[Hashable, 'Future[Sequence[str]]'] = {}
+        self.hits = 0
+        """Число обращений, обслуженных из кэша."""
+
+        self.misses = 0
+        """Число загрузок зависимостей."""
+
+    def _get(self, table: Dict[Hashable, Future], key: Hashable, load: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = table.get(key)
+            owner = future is None
+            if owner:
+                future = table[key] = Future()
+            else:
+                self.hits += 1
+
+        if owner:
+            try:
+                value = load()
+            except BaseException as e:
+                # Неудачная загрузка не кэшируется: следующее обращение повторит ее.
+                with self._lock:
+                    del table[key]
+                future.set_exception(e)
+                raise
+            with self._lock:
+                self.misses += 1
+            future.set_result(value)
+            return value
+
+        return future.result()
+
+    def get_dict(self, key: Hashable, load: Callable[[], 'ZstdCompressionDict']) -> 'ZstdCompressionDict':
+        """
+        Словарь zstd по ключу key. Если словаря нет в кэше, он загружается вызовом load.
+
+        :param key: Ключ словаря.
+        :param load: Функция загрузки словаря.
+        """
+
+        return self._get(self._dicts, key, load)
+
+    def get_names(self, key: Hashable, load: Callable[[], Sequence[str]]) -> Sequence[str]:
+        """
+        Общая таблица имен по ключу key. Если таблицы нет в кэше, она загружается вызовом load.
+
+        :param key: Ключ таблицы.
+        :param load: Функция загрузки таблицы.
+        """
+
+        return self._get(self._names, key, load)
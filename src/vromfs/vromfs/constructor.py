@@ -0,0 +1,125 @@
+from pathlib import PurePath
+from typing import BinaryIO, Callable, MutableSequence, Sequence, TypeVar, Union
+import construct as ct
+from construct import this
+
+__all__ = [
+    'Image',
+    'Name',
+    'NamesData',
+]
+
+T = TypeVar('T')
+VT = Union[T, Callable[[ct.Container], T]]
+
+RawCString = ct.NullTerminated(ct.GreedyBytes)
+
+
+class NameAdapter(ct.Adapter):
+    """
+    Внутреннее имя файла. Имя разбирается в строку без ведущих ``/``, объекты Path не создаются.
+    При построении принимается строка или относительный путь.
+    """
+
+    def _decode(self, obj: bytes, context: ct.Container, path: str) -> str:
+        name = 'nm' if obj == b'\xff\x3fnm' else obj.decode().lstrip('/')
+        if not name:
+            raise ValueError('Пустое имя')
+
+        return name
+
+    def _encode(self, obj: Union[str, PurePath], context: ct.Container, path: str) -> bytes:
+        if isinstance(obj, PurePath):
+            if obj.is_absolute():
+                raise ValueError('Ожидался относительный путь: {}'.format(obj))
+            name = obj.as_posix()
+        else:
+            if obj.startswith('/'):
+                raise ValueError('Ожидался относительный путь: {}'.format(obj))
+            name = obj
+
+        return b'\xff\x3fnm' if name == 'nm' else name.encode()
+
+
+Name = NameAdapter(RawCString)
+
+
+class NamesData(ct.Construct):
+    def __init__(self, offsets: VT[Union[Sequence[int], MutableSequence[int]]]):
+        super().__init__()
+        self.offsets = offsets
+
+    def _parse(self, stream: BinaryIO, context: ct.Container, path: str) -> Sequence[str]:
+        offsets: Sequence[int] = ct.evaluate(self.offsets, context)
+        if not offsets:
+            raise ct.CheckError('Ожидалась не пустая последовательность смещений.')
+
+        names = []
+        max_end_offset = 0
+        for offset in offsets:
+            ct.stream_seek(stream, offset)
+            name = Name._parsereport(stream, context, path)
+            end_offset = ct.stream_tell(stream)
+            max_end_offset = max(end_offset, max_end_offset)
+            names.append(name)
+        ct.stream_seek(stream, max_end_offset)
+        return names
+
+    def _build(self, obj: Sequence[Union[str, PurePath]], stream: ct.Container, context: ct.Container, path: str
+               ) -> Sequence[Union[str, PurePath]]:
+        if not obj:
+            raise ct.CheckError('Ожидалась не пустая последовательность имен.')
+
+        offsets: MutableSequence[int] = ct.evaluate(self.offsets, context)
+        offsets.clear()
+
+        for name in obj:
+            offset = ct.stream_tell(stream)
+            offsets.append(offset)
+            Name._build(name, stream, context, path)
+
+        return obj
+
+
+Names = ct.Struct(
+    'names_info' / ct.Aligned(16, ct.Int64ul[this.count]),
+    'names_data' / ct.Aligned(16, NamesData(this.names_info)),
+)
+
+
+Image = ct.Struct(
+    'names_header' / ct.Aligned(16, ct.Struct(
+        'offset' / ct.Int32ul,
+        'count' / ct.Int32ul,
+    )),
+
+    'data_header' / ct.Aligned(16, ct.Struct(
+        'offset' / ct.Int32ul,
+        'count' / ct.Int32ul,
+    )),
+
+    'digests_header' / ct.If(this.names_header.offset == 0x30, ct.Aligned(16, ct.Struct(
+        'end' / ct.Int64ul,
+        'begin' / ct.Int16ul,
+    ))),
+
+    ct.Check(lambda ctx: ctx.names_header.offset == ctx._io.tell()),
+    'names_info' / ct.Aligned(16, ct.Int64ul[this.names_header.count]),
+    'names_data' / ct.Aligned(16, NamesData(this.names_info)),
+
+    ct.Check(lambda ctx: ctx.data_header.offset == ctx._io.tell()),
+    'data_info' / ct.Aligned(16, ct.Aligned(16, ct.Struct(
+        'offset' / ct.Int32ul,
+        'size' / ct.Int32ul,
+    ))[this.data_header.count]),
+
+    ct.If(lambda ctx: ctx.digests_header and ctx.digests_header.begin,
+          ct.Check(lambda ctx: this.digests_header.begin == ctx._io.tell())),
+    'digests_data' / ct.If(lambda ctx: ctx.digests_header and ctx.digests_header.begin,
+                           ct.Aligned(16, ct.Bytes(20)[this.data_header.count])),
+
+    'offset' / ct.Tell,
+
+    ct.If(lambda ctx: ctx.digests_header and not ctx.digests_header.begin,
+          ct.Check(lambda ctx: ctx.digests_header.end == ctx._io.tell())),
+)
@@ -0,0 +1,107 @@
+from collections.abc import ItemsView, Mapping
+import os
+from pathlib import Path, PurePosixPath
+from typing import Any, Iterable, Iterator, Optional, Tuple, Union
+from .common import FileInfo
+from .file_table import FileTable
+
+__all__ = [
+    'FileIndex',
+    'name_key',
+]
+
+Key = Union[str, os.PathLike]
+
+
+def name_key(path: Key) -> str:
+    """
+    Внутреннее имя файла для пути path: компоненты разделены ``/``.
+
+    :raises TypeError: Неверный тип path.
+    """
+
+    if isinstance(path, str):
+        name = path
+    elif isinstance(path, os.PathLike):
+        name = os.fspath(path)
+        if not isinstance(name, str):
+            raise TypeError('path: ожидалось str | PathLike[str]: {}'.format(type(path)))
+    else:
+        raise TypeError('path: ожидалось str | PathLike: {}'.format(type(path)))
+
+    if os.sep != '/':
+        name = name.replace(os.sep, '/')
+    return name
+
+
+def normalized_name(name: str) -> str:
+    """Имя без ведущих ``/``, повторных ``/`` и компонентов ``.``."""
+
+    return PurePosixPath(name).as_posix().lstrip('/')
+
+
+class _Items(ItemsView):
+    def __iter__(self) -> Iterator[Tuple[Path, FileInfo]]:
+        for info in self._mapping.table:
+            yield info.path, info
+
+
+class FileIndex(Mapping):
+    """
+    Отображение ``{внутренний путь файла => метаданные файла}`` в порядке возрастания смещений поверх FileTable.
+    Поиск по строке не создает объектов Path, ключи Path и объекты FileInfo создаются только при обращении.
+    Поиск принимает str и PathLike.
+    """
+
+    def __init__(self, source: Union[FileTable, Iterable[FileInfo]]):
+        """
+        :param source: Таблица файлов или объекты файлов.
+        """
+
+        self.table = source if isinstance(source, FileTable) else FileTable.from_infos(source)
+
+    def lookup(self, path: Key) -> Optional[FileInfo]:
+        """
+        Метаданные файла по внутреннему пути path. None, если файл отсутствует.
+
+        :raises TypeError: Неверный тип path.
+        """
+
+        name = name_key(path)
+        table = self.table
+        i = table.row(name)
+        if i is None:
+            normalized = normalized_name(name)
+            if normalized != name:
+                i = table.row(normalized)
+        return None if i is None else table[i]
+
+    def __getitem__(self, path: Key) -> FileInfo:
+        info = self.lookup(path)
+        if info is None:
+            raise KeyError(path)
+        return info
+
+    def __contains__(self, path: Any) -> bool:
+        try:
+            return self.lookup(path) is not None
+        except TypeError:
+            return False
+
+    def __iter__(self) -> Iterator[Path]:
+        for name in self.table.names():
+            yield Path(name)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def names(self) -> Iterator[str]:
+        """Внутренние имена файлов строками."""
+
+        return self.table.names()
+
+    def values(self) -> FileTable:
+        return self.table
+
+    def items(self) -> ItemsView:
+        return _Items(self)
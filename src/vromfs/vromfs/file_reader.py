@@ -0,0 +1,211 @@
+from io import BytesIO, IOBase, RawIOBase, SEEK_CUR, SEEK_END, SEEK_SET, UnsupportedOperation
+import os
+from threading import Lock
+from typing import Callable, Optional
+from vromfs.bin import BinFile
+from vromfs.memory_reader import MemoryReader
+from vromfs.ranged_reader import RangedReader
+from vromfs.spool_reader import SpoolReader
+from .common import FileInfo
+
+__all__ = [
+    'VromfsFileReader',
+]
+
+ReadIntoAt = Callable[[int, memoryview], int]
+"""Чтение в буфер с заданного смещения потока без смены позиции потока. Возвращает число прочитанных байт."""
+
+
+def _memory_readinto_at(stream: BytesIO) -> ReadIntoAt:
+    def readinto_at(offset: int, b: memoryview) -> int:
+        with stream.getbuffer() as buffer:
+            chunk = buffer[offset:offset+len(b)]
+            n = len(chunk)
+            b[:n] = chunk
+            chunk.release()
+        return n
+
+    return readinto_at
+
+
+def _fd_readinto_at(fd: int) -> ReadIntoAt:
+    if hasattr(os, 'preadv'):
+        def readinto_at(offset: int, b: memoryview) -> int:
+            return os.preadv(fd, [b], offset)
+    else:
+        def readinto_at(offset: int, b: memoryview) -> int:
+            data = os.pread(fd, len(b), offset)
+            n = len(data)
+            b[:n] = data
+            return n
+
+    return readinto_at
+
+
+def _ranged_readinto_at(inner: ReadIntoAt, base: int, size: int) -> ReadIntoAt:
+    def readinto_at(offset: int, b: memoryview) -> int:
+        n = min(len(b), size - offset)
+        if n <= 0:
+            return 0
+        return inner(base + offset, b[:n])
+
+    return readinto_at
+
+
+def positional_reader(stream: IOBase) -> Optional[ReadIntoAt]:
+    """
+    Чтение с заданного смещения без смены позиции потока stream, если поток это допускает:
+    данные в памяти, файл с дескриптором, несжатый контейнер, спул распакованного контейнера,
+    отображенный в память образ.
+
+    :return: Функция чтения или None, если чтение без смены позиции невозможно.
+    """
+
+    if isinstance(stream, BytesIO):
+        return _memory_readinto_at(stream)
+
+    if isinstance(stream, (SpoolReader, MemoryReader)):
+        return stream.readinto_at
+
+    if isinstance(stream, BinFile):
+        return None if stream.compressed else positional_reader(stream.stream)
+
+    if isinstance(stream, RangedReader):
+        inner = positional_reader(stream.wrapped)
+        return None if inner is None else _ranged_readinto_at(inner, stream.offset, stream.size)
+
+    if not (hasattr(os, 'pread') and hasattr(stream, 'fileno')):
+        return None
+
+    try:
+        fd = stream.fileno()
+    except (OSError, UnsupportedOperation):
+        return None
+    return _fd_readinto_at(fd)
+
+
+def locked_reader(stream: IOBase, lock: Lock) -> ReadIntoAt:
+    """
+    Чтение с заданного смещения через перемещение по потоку stream под блокировкой lock.
+    """
+
+    def readinto_at(offset: int, b: memoryview) -> int:
+        with lock:
+            stream.seek(offset)
+            data = stream.read(len(b))
+        n = len(data)
+        b[:n] = data
+        return n
+
+    return readinto_at
+
+
+class _LockedSequentialReader(IOBase):
+    """
+    Последовательное чтение потока stream со своей позицией. Поток перемещается под блокировкой lock,
+    поэтому может использоваться и другими читателями.
+    """
+
+    def __init__(self, stream: IOBase, lock: Lock):
+        self._stream = stream
+        self._lock = lock
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        with self._lock:
+            self._stream.seek(self._pos)
+            data = self._stream.read(size)
+        self._pos += len(data)
+        return data
+
+
+def spooled_reader(stream: IOBase, lock: Lock) -> SpoolReader:
+    """
+    Спул потока stream, который допускает переход назад только ценой повторного чтения с начала,
+    например, сжатого контейнера. Поток читается один раз последовательно, переходы выполняются по спулу.
+    """
+
+    return SpoolReader(_LockedSequentialReader(stream, lock))
+
+
+class VromfsFileReader(RawIOBase):
+    """
+    Поток только для чтения содержимого одного файла образа VROMFS.
+    Данные читаются из источника образа по запросу, без копирования файла целиком.
+    Позиция у каждого потока своя, поэтому одновременно может быть открыто много потоков одного образа.
+    """
+
+    def __init__(self, readinto_at: ReadIntoAt, info: FileInfo):
+        """
+        :param readinto_at: Чтение с заданного смещения образа.
+        :param info: Объект файла в образе.
+        """
+
+        self._readinto_at = readinto_at
+        self._info = info
+        self._pos = 0
+
+    @property
+    def info(self) -> FileInfo:
+        """Объект файла в образе."""
+
+        return self._info
+
+    @property
+    def name(self) -> str:
+        """Внутреннее имя файла."""
+
+        return self._info.name
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, target: int, whence: int = SEEK_SET) -> int:
+        self._checkClosed()
+        if whence == SEEK_SET:
+            if target < 0:
+                raise ValueError('negative seek value {}'.format(target))
+            pos = target
+        elif whence == SEEK_CUR:
+            pos = self._pos + target
+        elif whence == SEEK_END:
+            pos = self._info.size + target
+        else:
+            raise ValueError('invalid whence ({}, should be {}, {} or {})'.format(whence, SEEK_SET, SEEK_CUR, SEEK_END))
+        self._pos = 0 if pos < 0 else pos
+
+        return self._pos
+
+    def tell(self) -> int:
+        self._checkClosed()
+        return self._pos
+
+    def readinto(self, b) -> int:
+        self._checkClosed()
+        view = memoryview(b).cast('B')
+        n = min(len(view), self._info.size - self._pos)
+        if n <= 0:
+            return 0
+        n = self._readinto_at(self._info.offset + self._pos, view[:n])
+        self._pos += n
+        return n
+
+    def readall(self) -> bytes:
+        self._checkClosed()
+        b = bytearray(max(0, self._info.size - self._pos))
+        view = memoryview(b)
+        n = 0
+        while n < len(b):
+            m = self.readinto(view[n:])
+            if not m:
+                break
+            n += m
+        view.release()
+        del b[n:]
+        return bytes(b)
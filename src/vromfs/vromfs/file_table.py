@@ -0,0 +1,272 @@
+from array import array
+from collections.abc import Sequence
+from io import IOBase
+from itertools import repeat
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+from .common import FileInfo
+from .error import VromfsUnpackError
+
+__all__ = [
+    'FileTable',
+    'PathView',
+    'TableHeader',
+]
+
+DIGEST_SIZE = 20
+"""Размер SHA1 дайджеста."""
+
+NM_NAME = b'\xff\x3fnm'
+"""Имя общей таблицы имен в образе."""
+
+SECTION_HEADER = struct.Struct('<II8x')
+DIGESTS_HEADER = struct.Struct('<QH6x')
+
+
+def aligned(size: int) -> int:
+    return (size + 15) & ~15
+
+
+def _array(typecode: str, data: bytes) -> array:
+    a = array(typecode)
+    a.frombytes(data)
+    if sys.byteorder != 'little':
+        a.byteswap()
+    return a
+
+
+def _normalized_name(raw: bytes) -> bytes:
+    name = b'nm' if raw == NM_NAME else raw.lstrip(b'/')
+    if not name:
+        raise ValueError('Пустое имя')
+    return name
+
+
+class TableHeader(NamedTuple):
+    names_offset: int
+    """Смещение таблицы смещений имен."""
+
+    count: int
+    """Число файлов."""
+
+    data_offset: int
+    """Смещение таблицы смещений и размеров данных."""
+
+    digests_end: Optional[int]
+    """Конец таблицы дайджестов. None, если образ без расширенного заголовка."""
+
+    digests_begin: Optional[int]
+    """Начало таблицы дайджестов. None или 0, если образ не содержит дайджестов."""
+
+    @property
+    def extended(self) -> bool:
+        return self.names_offset == 0x30
+
+    @property
+    def checked(self) -> bool:
+        return bool(self.digests_begin)
+
+
+class FileTable(Sequence):
+    """
+    Таблица файлов образа по столбцам: смещения и размеры в array('I'), SHA1 дайджесты одним блоком 20×N байт,
+    внутренние имена одним блоком UTF-8 с массивом смещений. Строки упорядочены по возрастанию смещений данных.
+    Объекты FileInfo создаются при обращении к строке, отображение ``{имя => строка}`` строится при первом поиске.
+    """
+
+    def __init__(self, names: bytes, name_offsets: array, offsets: array, sizes: array, digests: Optional[bytes]):
+        """
+        Столбцы принимаются и как memoryview, например из разделяемой памяти, числовые - с форматом 'I'.
+
+        :param names: Внутренние имена в UTF-8 подряд.
+        :param name_offsets: Смещения имен в names, N+1 элемент.
+        :param offsets: Смещения данных файлов.
+        :param sizes: Размеры данных файлов.
+        :param digests: SHA1 дайджесты подряд. None, если образ не содержит дайджестов.
+        """
+
+        self._names = names
+        self._name_offsets = name_offsets
+        self._offsets = offsets
+        self._sizes = sizes
+        self._digests = digests
+        self._rows: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_columns(cls, names: Iterable[bytes], offsets: Iterable[int], sizes: Iterable[int],
+                     digests: Optional[Iterable[bytes]]) -> 'FileTable':
+        """Таблица по столбцам в произвольном порядке строк. Строки упорядочиваются по смещениям данных."""
+
+        names = list(names)
+        offsets = array('I', offsets)
+        sizes = array('I', sizes)
+        digests = None if digests is None else list(digests)
+        order = sorted(range(len(offsets)), key=offsets.__getitem__)
+
+        name_offsets = array('I', [0])
+        end = 0
+        for i in order:
+            end += len(names[i])
+            name_offsets.append(end)
+
+        return cls(b''.join(names[i] for i in order), name_offsets,
+                   array('I', (offsets[i] for i in order)), array('I', (sizes[i] for i in order)),
+                   None if digests is None else b''.join(digests[i] for i in order))
+
+    @classmethod
+    def from_infos(cls, infos: Iterable[FileInfo]) -> 'FileTable':
+        """Таблица по объектам файлов. Дайджесты сохраняются, если они есть у всех объектов."""
+
+        infos = list(infos)
+        digests = [info.digest for info in infos]
+        return cls.from_columns((info.name.encode() for info in infos), (info.offset for info in infos),
+                                (info.size for info in infos), None if None in digests else digests)
+
+    @classmethod
+    def read(cls, stream: IOBase) -> Tuple[TableHeader, 'FileTable']:
+        """
+        Чтение заголовков и таблиц образа с текущей позиции потока без построения метаданных construct.
+
+        :raises VromfsUnpackError: Ошибка чтения или неверная структура таблиц.
+        """
+
+        def read(size: int) -> bytes:
+            data = stream.read(size)
+            if len(data) != size:
+                raise VromfsUnpackError('Неожиданный конец образа: ожидалось {} байт, прочитано {}.'
+                                        .format(size, len(data)))
+            return data
+
+        def expect(offset: int, what: str) -> None:
+            pos = stream.tell()
+            if pos != offset:
+                raise VromfsUnpackError('Неверное смещение {}: {:#x}, ожидалось {:#x}.'.format(what, offset, pos))
+
+        names_offset, names_count = SECTION_HEADER.unpack(read(SECTION_HEADER.size))
+        data_offset, data_count = SECTION_HEADER.unpack(read(SECTION_HEADER.size))
+        digests_end = digests_begin = None
+        if names_offset == 0x30:
+            digests_end, digests_begin = DIGESTS_HEADER.unpack(read(DIGESTS_HEADER.size))
+        header = TableHeader(names_offset, names_count, data_offset, digests_end, digests_begin)
+
+        if names_count != data_count:
+            raise VromfsUnpackError('Число имен {} не совпадает с числом файлов {}.'.format(names_count, data_count))
+        if not names_count:
+            raise VromfsUnpackError('Ожидалась не пустая последовательность имен.')
+
+        expect(names_offset, 'таблицы имен')
+        names_info = _array('Q', read(aligned(8 * names_count)))[:names_count]
+        names_data_offset = stream.tell()
+        if data_offset < names_data_offset:
+            raise VromfsUnpackError('Неверное смещение таблицы данных: {:#x}.'.format(data_offset))
+        names_data = read(data_offset - names_data_offset)
+
+        raw_names = []
+        try:
+            for offset in names_info:
+                begin = offset - names_data_offset
+                if begin < 0:
+                    raise ValueError('Смещение имени вне блока имен: {:#x}'.format(offset))
+                end = names_data.index(b'\x00', begin)
+                raw_names.append(_normalized_name(names_data[begin:end]))
+        except ValueError as e:
+            raise VromfsUnpackError('Ошибка при чтении имен.') from e
+
+        expect(data_offset, 'таблицы данных')
+        data_info = _array('I', read(16 * data_count))
+        offsets = data_info[0::4]
+        sizes = data_info[1::4]
+
+        digests = None
+        if header.checked:
+            expect(digests_begin, 'таблицы дайджестов')
+            blob = read(aligned(DIGEST_SIZE * data_count))
+            digests = (blob[i:i+DIGEST_SIZE] for i in range(0, DIGEST_SIZE * data_count, DIGEST_SIZE))
+        elif header.extended:
+            expect(digests_end, 'конца таблиц')
+
+        return header, cls.from_columns(raw_names, offsets, sizes, digests)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def _index(self, i: int) -> int:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('FileTable index out of range')
+        return i
+
+    def name(self, i: int) -> str:
+        """Внутреннее имя файла в строке i."""
+
+        return str(self._names[self._name_offsets[i]:self._name_offsets[i+1]], 'utf-8')
+
+    def names(self) -> Iterator[str]:
+        """Внутренние имена файлов в порядке строк."""
+
+        names = self._names
+        begin = 0
+        for end in self._name_offsets[1:]:
+            yield str(names[begin:end], 'utf-8')
+            begin = end
+
+    def digest(self, i: int) -> Optional[bytes]:
+        """SHA1 дайджест файла в строке i. None, если таблица без дайджестов."""
+
+        if self._digests is None:
+            return None
+        return bytes(self._digests[i*DIGEST_SIZE:(i+1)*DIGEST_SIZE])
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[FileInfo, Sequence]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = self._index(i)
+        return FileInfo(self.name(i), self._offsets[i], self._sizes[i], self.digest(i))
+
+    def __iter__(self) -> Iterator[FileInfo]:
+        digests = repeat(None) if self._digests is None else map(self.digest, range(len(self)))
+        for name, offset, size, digest in zip(self.names(), self._offsets, self._sizes, digests):
+            yield FileInfo(name, offset, size, digest)
+
+    def row(self, name: str) -> Optional[int]:
+        """Номер строки файла с внутренним именем name. None, если файл отсутствует."""
+
+        if self._rows is None:
+            self._rows = {n: i for i, n in enumerate(self.names())}
+        return self._rows.get(name)
+
+    def columns(self) -> Tuple[bytes, array, array, array, Optional[bytes]]:
+        """Столбцы таблицы: имена, смещения имен, смещения данных, размеры данных, дайджесты."""
+
+        return self._names, self._name_offsets, self._offsets, self._sizes, self._digests
+
+    @property
+    def nbytes(self) -> int:
+        """Размер данных столбцов в байтах."""
+
+        return (len(self._names) + self._name_offsets.itemsize * len(self._name_offsets)
+                + self._offsets.itemsize * len(self._offsets) + self._sizes.itemsize * len(self._sizes)
+                + (0 if self._digests is None else len(self._digests)))
+
+
+class PathView(Sequence):
+    """Внутренние пути файлов таблицы. Объекты Path создаются при обращении."""
+
+    def __init__(self, table: FileTable):
+        self._table = table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Path, Sequence[Path]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return Path(self._table.name(self._table._index(i)))
+
+    def __iter__(self) -> Iterator[Path]:
+        for name in self._table.names():
+            yield Path(name)
@@ -0,0 +1,119 @@
+"""
+Порядок размещения данных файлов в образе.
+Сжатие контейнера zstd выигрывает, если похожие файлы лежат рядом: порядок влияет на размер и время сжатия,
+но не на содержимое образа. Общая таблица имен ``nm`` всегда остается последней.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from heapq import nsmallest
+import os
+from typing import Callable, Iterable, List, Sequence, Tuple
+from .file_table import _array
+from .packer import SourceFile
+
+__all__ = [
+    'Layout',
+    'order_files',
+]
+
+SAMPLE_SIZE = 1024
+"""Размер начала файла, по которому оценивается сходство содержимого, байт."""
+
+SHINGLE_SIZE = 8
+"""Размер фрагмента содержимого, байт. Фрагменты берутся с шагом SHINGLE_SIZE/2."""
+
+SKETCH_SIZE = 3
+"""Число наименьших фрагментов в сигнатуре."""
+
+BLK_SUFFIX = '.blk'
+
+
+class Layout(Enum):
+    PATH = 'path'
+    """По компонентам внутренних путей, как в исходном упаковщике."""
+
+    EXTENSION = 'extension'
+    """По расширениям, blk файлы дополнительно по типу - первому байту, затем по путям."""
+
+    SIZE = 'size'
+    """По возрастанию размеров, затем по путям."""
+
+    SIMILARITY = 'similarity'
+    """
+    По расширениям, затем по сигнатуре начала файла - наименьшим 8-байтовым фрагментам:
+    файлы с общими фрагментами оказываются рядом.
+    """
+
+
+def _suffix(name: str) -> str:
+    return os.path.splitext(name.rpartition('/')[2])[1]
+
+
+def _path_key(f: SourceFile) -> List[str]:
+    return f.name.split('/')
+
+
+def _head(path: str) -> bytes:
+    with open(path, 'rb') as istream:
+        return istream.read(1)
+
+
+def _size(path: str) -> int:
+    return os.stat(path).st_size
+
+
+def _signature(path: str) -> Tuple[int, ...]:
+    """
+    Сигнатура начала файла: SKETCH_SIZE наименьших различных фрагментов как целых little-endian.
+    Пустой кортеж для файла короче фрагмента.
+    """
+
+    with open(path, 'rb') as istream:
+        sample = istream.read(SAMPLE_SIZE)
+    half = SHINGLE_SIZE // 2
+    shingles = set()
+    for begin in (0, half):
+        end = begin + (len(sample) - begin) // SHINGLE_SIZE * SHINGLE_SIZE
+        shingles.update(_array('Q', sample[begin:end]))
+    return tuple(nsmallest(SKETCH_SIZE, shingles))
+
+
+def _map(f: Callable, paths: Sequence[str], jobs: int) -> List:
+    if jobs == 1:
+        return list(map(f, paths))
+    with ThreadPoolExecutor(jobs) as executor:
+        return list(executor.map(f, paths, chunksize=64))
+
+
+def order_files(files: Iterable[SourceFile], layout: Layout = Layout.PATH, jobs: int = 1) -> List[SourceFile]:
+    """
+    Файлы в порядке размещения данных. Порядок полностью определяется путями и содержимым файлов.
+    Для EXTENSION читается первый байт blk файлов, для SIZE - размеры, для SIMILARITY - начало каждого файла,
+    пулом из jobs потоков.
+
+    :param files: Файлы в порядке scan_tree.
+    :raises TypeError: Неверный тип layout.
+    :raises EnvironmentError: Ошибка чтения файла.
+    """
+
+    if not isinstance(layout, Layout):
+        raise TypeError('layout: ожидался Layout: {}'.format(type(layout)))
+
+    files = sorted(files, key=_path_key)
+    nm = [f for f in files if f.name == 'nm']
+    files = [f for f in files if f.name != 'nm']
+
+    if layout is Layout.EXTENSION:
+        blk = [f.path for f in files if _suffix(f.name) == BLK_SUFFIX]
+        heads = dict(zip(blk, _map(_head, blk, jobs)))
+        files.sort(key=lambda f: (_suffix(f.name), heads.get(f.path, b''), _path_key(f)))
+    elif layout is Layout.SIZE:
+        sizes = dict(zip((f.path for f in files), _map(_size, [f.path for f in files], jobs)))
+        files.sort(key=lambda f: sizes[f.path])
+    elif layout is Layout.SIMILARITY:
+        signatures = _map(_signature, [f.path for f in files], jobs)
+        order = sorted(range(len(files)), key=lambda i: (_suffix(files[i].name), signatures[i], _path_key(files[i])))
+        files = [files[i] for i in order]
+
+    return files + nm
@@ -0,0 +1,143 @@
+from heapq import heappush, heappushpop
+from io import IOBase
+from itertools import count
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+__all__ = [
+    'FileMetrics',
+    'MetricsSummary',
+]
+
+
+class FileMetrics:
+    """Метрики распаковки одного файла."""
+
+    def __init__(self):
+        self.read_time = 0.0
+        """Время чтения данных файла из образа, с. Для распаковки как есть - время копирования."""
+
+        self.decompress_time = 0.0
+        """Время zstd распаковки для блоков *_ZST, с."""
+
+        self.compose_time = 0.0
+        """Время построения секции без учета распаковки, с."""
+
+        self.serialize_time = 0.0
+        """Время вывода секции в текстовом формате, с."""
+
+        self.in_size = 0
+        """Размер данных файла в образе, байт."""
+
+        self.out_size = 0
+        """Размер выходного файла, байт."""
+
+        self.blk_type = None
+        """Тип двоичного blk. None, если тип не определялся."""
+
+    @property
+    def total_time(self) -> float:
+        return self.read_time + self.decompress_time + self.compose_time + self.serialize_time
+
+    def as_dict(self) -> Mapping[str, Any]:
+        m = dict(vars(self))
+        m['blk_type'] = None if self.blk_type is None else self.blk_type.name
+        return m
+
+
+class TimedReader(IOBase):
+    """Обертка потока распаковки, учитывающая время чтения в decompress_time."""
+
+    def __init__(self, wrapped: Any, metrics: FileMetrics):
+        self.wrapped = wrapped
+        self.metrics = metrics
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        t0 = perf_counter()
+        data = self.wrapped.read(size)
+        self.metrics.decompress_time += perf_counter() - t0
+        return data
+
+    def readinto(self, b) -> int:
+        t0 = perf_counter()
+        n = self.wrapped.readinto(b)
+        self.metrics.decompress_time += perf_counter() - t0
+        return n
+
+    def tell(self) -> int:
+        return self.wrapped.tell()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.wrapped, name)
+
+
+class TimedDecompressor:
+    """Обертка ZstdDecompressor, учитывающая время распаковки в decompress_time."""
+
+    def __init__(self, wrapped: Any, metrics: FileMetrics):
+        self.wrapped = wrapped
+        self.metrics = metrics
+
+    def decompress(self, *args, **kwargs) -> bytes:
+        t0 = perf_counter()
+        data = self.wrapped.decompress(*args, **kwargs)
+        self.metrics.decompress_time += perf_counter() - t0
+        return data
+
+    def stream_reader(self, *args, **kwargs) -> TimedReader:
+        return TimedReader(self.wrapped.stream_reader(*args, **kwargs), self.metrics)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.wrapped, name)
+
+
+class MetricsSummary:
+    """Сводка метрик: самые медленные файлы и итоги по типам blk."""
+
+    def __init__(self, top: int = 10):
+        """
+        :param top: Число самых медленных файлов в сводке.
+        """
+
+        self._top = top
+        self._heap: List[Tuple[float, int, str, FileMetrics]] = []
+        self._seq = count()
+        self._totals: Dict[str, Dict[str, float]] = {}
+
+    def add(self, path: Union[str, Path], metrics: FileMetrics) -> None:
+        item = (metrics.total_time, next(self._seq), str(path), metrics)
+        if len(self._heap) < self._top:
+            heappush(self._heap, item)
+        elif self._top:
+            heappushpop(self._heap, item)
+
+        key = 'NONE' if metrics.blk_type is None else metrics.blk_type.name
+        totals = self._totals.get(key)
+        if totals is None:
+            totals = self._totals[key] = dict.fromkeys(
+                ('count', 'read_time', 'decompress_time', 'compose_time', 'serialize_time', 'in_size', 'out_size'), 0)
+        totals['count'] += 1
+        for name in ('read_time', 'decompress_time', 'compose_time', 'serialize_time', 'in_size', 'out_size'):
+            totals[name] += getattr(metrics, name)
+
+    @property
+    def slowest(self) -> List[Tuple[str, FileMetrics]]:
+        """Самые медленные файлы в порядке убывания полного времени."""
+
+        return [(path, metrics) for _, _, path, metrics in sorted(self._heap, reverse=True)]
+
+    @property
+    def totals(self) -> Mapping[str, Mapping[str, float]]:
+        """Итоги ``{имя типа blk => {метрика => сумма}}``, ``NONE`` для файлов без типа."""
+
+        return self._totals
+
+    def as_dict(self) -> Mapping[str, Any]:
+        return {
+            'slowest': [dict(path=path, **metrics.as_dict()) for path, metrics in self.slowest],
+            'totals': self._totals,
+        }
@@ -0,0 +1,247 @@
+from collections import OrderedDict
+from io import IOBase
+import os
+from pathlib import Path
+from typing import (TYPE_CHECKING, Iterable, Iterator, List, Mapping, MutableSequence, NamedTuple, Optional,
+                    OrderedDict as ODict, Sequence, Tuple, Union)
+from vromfs.bin import BinFile
+from vromfs.spool_reader import SpoolReader
+from .cache import DependencyCache
+from .common import FileInfo
+from .file_index import Key, name_key, normalized_name
+from .file_reader import VromfsFileReader
+from .vromfs_file import ExtractResult, FileDigest, Item, VromfsFile
+
+if TYPE_CHECKING:
+    from blk import Format
+
+__all__ = [
+    'OverlayEntry',
+    'VromfsOverlay',
+]
+
+Source = Union[os.PathLike, BinFile, VromfsFile]
+
+
+class OverlayEntry(NamedTuple):
+    source: int
+    """Индекс образа-источника в VromfsOverlay.sources."""
+
+    info: FileInfo
+    """Метаданные файла в образе-источнике."""
+
+
+class VromfsOverlay:
+    """
+    Объединение нескольких образов VROMFS в одно пространство имен.
+    Источники перечисляются в порядке убывания приоритета: файл берется из первого источника, который его содержит.
+    Сжатые контейнеры читаются через SpoolReader, поэтому каждый контейнер распаковывается не более одного раза.
+    """
+
+    def __init__(self, sources: Iterable[Source], cache: Optional[DependencyCache] = None):
+        """
+        :param sources: Контейнеры, образы или пути контейнеров в порядке убывания приоритета.
+        VromfsFile используется как есть.
+        :param cache: Кэш словарей и таблиц имен, общий для образов.
+        :raises TypeError: Неверный тип источника.
+        :raises EnvironmentError: Ошибка доступа к источнику.
+        """
+
+        if cache is None:
+            cache = DependencyCache()
+
+        self._sources: List[VromfsFile] = []
+        self._owned: List[IOBase] = []
+        try:
+            for source in sources:
+                self._sources.append(self._open_source(source, cache))
+        except Exception:
+            self.close()
+            raise
+
+        self._entry_map = None
+
+    def _open_source(self, source: Source, cache: DependencyCache) -> VromfsFile:
+        if isinstance(source, VromfsFile):
+            return source
+
+        if isinstance(source, os.PathLike):
+            source = BinFile(source)
+            self._owned.append(source)
+        elif not isinstance(source, BinFile):
+            raise TypeError('source: ожидалось PathLike | BinFile | VromfsFile: {}'.format(type(source)))
+
+        source.seek(0)
+        if source.compressed:
+            stream = SpoolReader(source)
+            self._owned.append(stream)
+        else:
+            stream = source
+        return VromfsFile(stream, cache=cache)
+
+    def close(self) -> None:
+        for stream in reversed(self._owned):
+            stream.close()
+        self._owned.clear()
+
+    def __enter__(self) -> 'VromfsOverlay':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @property
+    def sources(self) -> Sequence[VromfsFile]:
+        """Образы в порядке убывания приоритета."""
+
+        return tuple(self._sources)
+
+    @property
+    def entry_map(self) -> ODict[str, OverlayEntry]:
+        """
+        Объединенное отображение ``{внутреннее имя файла => (индекс источника, метаданные файла)}``.
+        Строится один раз. Порядок: по источникам, в источнике - по возрастанию смещений.
+
+        :raises VromfsUnpackError: Ошибка при построении пространства имен источника.
+        """
+
+        if self._entry_map is None:
+            entry_map = OrderedDict()
+            for i, source in enumerate(self._sources):
+                for info in source.info_map.values():
+                    if info.name not in entry_map:
+                        entry_map[info.name] = OverlayEntry(i, info)
+            self._entry_map = entry_map
+
+        return self._entry_map
+
+    def get_entry(self, path: Key) -> OverlayEntry:
+        """
+        Действующая запись о файле по внутреннему пути path.
+
+        :raises TypeError: Неверный тип path.
+        :raises KeyError: Рath отсутствует во всех источниках.
+        :raises VromfsUnpackError: Ошибка при построении пространства имен источника.
+        """
+
+        name = name_key(path)
+        entry_map = self.entry_map
+        entry = entry_map.get(name)
+        if entry is None:
+            entry = entry_map.get(normalized_name(name))
+            if entry is None:
+                raise KeyError('path: нет FileInfo, содержащего путь {!r}'.format(str(path)))
+
+        return entry
+
+    def get_info(self, path: Key) -> FileInfo:
+        """
+        Метаданные действующего файла по внутреннему пути path.
+
+        :raises TypeError: Неверный тип path.
+        :raises KeyError: Рath отсутствует во всех источниках.
+        :raises VromfsUnpackError: Ошибка при построении пространства имен источника.
+        """
+
+        return self.get_entry(path).info
+
+    def get_source(self, path: Key) -> VromfsFile:
+        """
+        Образ, из которого берется файл path.
+
+        :raises TypeError: Неверный тип path.
+        :raises KeyError: Рath отсутствует во всех источниках.
+        :raises VromfsUnpackError: Ошибка при построении пространства имен источника.
+        """
+
+        return self._sources[self.get_entry(path).source]
+
+    @property
+    def name_list(self) -> Sequence[Path]:
+        """
+        Внутренние имена действующих файлов.
+
+        :raises VromfsUnpackError: Ошибка при построении пространства имен источника.
+        """
+
+        return tuple(entry.info.path for entry in self.entry_map.values())
+
+    def _grouped_infos(self, items: Optional[Iterable[Item]], absent: Optional[MutableSequence[Path]] = None
+                       ) -> Iterator[Tuple[VromfsFile, Sequence[FileInfo]]]:
+        """
+        Действующие объекты файлов, сгруппированные по источникам. Пустые группы пропускаются.
+        Если items задан как None, принимаются все действующие файлы.
+
+        :return: Итератор пар (источник, объекты файлов источника).
+        """
+
+        if items is None:
+            entries = self.entry_map.values()
+        else:
+            entries = []
+            for item in items:
+                try:
+                    entries.append(self.get_entry(item.name if isinstance(item, FileInfo) else item))
+                except KeyError:
+                    if absent is not None:
+                        absent.append(item.path if isinstance(item, FileInfo) else item)
+
+        groups: List[List[FileInfo]] = [[] for _ in self._sources]
+        for entry in entries:
+            groups[entry.source].append(entry.info)
+        for source, infos in zip(self._sources, groups):
+            if infos:
+                yield source, infos
+
+    def unpack_iter(self, items: Optional[Iterable[Item]] = None, path: Optional[os.PathLike] = None,
+                    out_format: Optional['Format'] = None, is_sorted: bool = False, is_minified: bool = False,
+                    with_metrics: bool = False) -> Iterator[ExtractResult]:
+        """
+        Распаковка группы действующих файлов с заданным типом результата, см. VromfsFile.unpack_iter.
+        Файлы распаковываются по источникам, в источнике - в порядке возрастания смещений.
+
+        :raises VromfsUnpackError: Ошибка при построении пространства имен источника.
+        :raises TypeError: Неверный тип path.
+        """
+
+        absent = []
+        groups = list(self._grouped_infos(items, absent))
+
+        for p in absent:
+            yield ExtractResult(p, KeyError('Нет FileInfo, содержащего путь {!r}'.format(str(p))))
+
+        for source, infos in groups:
+            yield from source.unpack_iter(infos, path, out_format, is_sorted, is_minified, with_metrics)
+
+    def digests_iter(self, items: Optional[Iterable[Item]] = None,
+                     absent: MutableSequence[Path] = None, jobs: int = 1) -> Iterator[FileDigest]:
+        """
+        Итератор SHA1 дайджестов действующих файлов, см. VromfsFile.digests_iter.
+
+        :raises VromfsUnpackError: Ошибка при построении пространства имен источника.
+        """
+
+        for source, infos in self._grouped_infos(items, absent):
+            yield from source.digests_iter(infos, jobs=jobs)
+
+    def digests_table(self, items: Optional[Iterable[Item]] = None,
+                      absent: MutableSequence[Path] = None, jobs: int = 1) -> Mapping[Path, bytes]:
+        """
+        Таблица ``{внутреннее имя файла => SHA1 дайджест содержимого}`` действующих файлов.
+
+        :raises VromfsUnpackError: Ошибка при построении пространства имен источника.
+        """
+
+        return {fd.info.path: fd.digest for fd in self.digests_iter(items, absent, jobs)}
+
+    def open(self, path: Key) -> VromfsFileReader:
+        """
+        Поток только для чтения содержимого действующего файла path, см. VromfsFile.open.
+
+        :raises TypeError: Неверный тип path.
+        :raises KeyError: Рath отсутствует во всех источниках.
+        :raises VromfsUnpackError: Ошибка при построении пространства имен источника.
+        """
+
+        entry = self.get_entry(path)
+        return self._sources[entry.source].open(entry.info)
@@ -0,0 +1,397 @@
+"""
+Упаковка дерева файлов в образ VROMFS.
+Директории обходятся через os.scandir, файлы читаются и хешируются пулом потоков с ограниченным опережением,
+большие файлы копируются блоками или через os.copy_file_range, выравнивание дописывается нулями напрямую.
+При дедупликации файлы с одинаковым содержимым ссылаются на один блок данных.
+При обновлении образа данные неизменных файлов копируются из исходного образа вместе с сохраненными дайджестами.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import errno
+from hashlib import sha1
+from io import IOBase, SEEK_END, UnsupportedOperation
+import os
+import struct
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+from vromfs.common import CHUNK_SIZE
+from .common import FileInfo
+from .error import VromfsPackError
+from .file_reader import ReadIntoAt
+from .file_table import DIGEST_SIZE, DIGESTS_HEADER, NM_NAME, SECTION_HEADER, aligned
+
+__all__ = [
+    'PackReport',
+    'SourceFile',
+    'scan_tree',
+    'write_image',
+]
+
+DATA_INFO = struct.Struct('<II8x')
+
+COPY_RANGE_ERRORS = frozenset((errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF,
+                               getattr(errno, 'EOPNOTSUPP', errno.EINVAL)))
+"""Ошибки os.copy_file_range, при которых данные копируются блоками."""
+
+
+class PackReport:
+    """Сводка упаковки образа. Заполняется упаковщиком, если передана как параметр report."""
+
+    def __init__(self):
+        self.files = 0
+        """Число файлов."""
+
+        self.data_size = 0
+        """Суммарный размер содержимого файлов."""
+
+        self.written_size = 0
+        """Размер блока данных образа с выравниванием."""
+
+        self.duplicates = 0
+        """Число файлов, данные которых совпали с ранее записанными. Учитывается только при дедупликации."""
+
+        self.saved_size = 0
+        """Размер блока данных, сэкономленный дедупликацией, с выравниванием."""
+
+        self.copied = 0
+        """Число файлов, скопированных из исходного образа."""
+
+        self.shared = 0
+        """Число скопированных файлов, сохранивших общий с другим файлом блок данных исходного образа."""
+
+        self.shared_size = 0
+        """Размер общих блоков данных исходного образа, не записанных повторно, с выравниванием."""
+
+    def as_dict(self) -> Mapping[str, int]:
+        return dict(vars(self))
+
+    def __repr__(self) -> str:
+        return '{}({})'.format(type(self).__name__, ', '.join(f'{k}={v!r}' for k, v in vars(self).items()))
+
+
+class SourceFile(NamedTuple):
+    name: str
+    """Внутреннее имя файла, компоненты разделены ``/``."""
+
+    path: str
+    """Путь файла в файловой системе."""
+
+
+Entry = Union[SourceFile, FileInfo]
+"""Файл образа: файл дерева или файл исходного образа."""
+
+
+def scan_tree(source: str) -> List[SourceFile]:
+    """
+    Файлы дерева source в порядке упаковки: по компонентам внутренних имен, общая таблица имен ``nm`` последней.
+    Символические ссылки на файлы разрешаются, на директории - не обходятся, как в Path.rglob.
+
+    :raises NotADirectoryError: Source не директория.
+    """
+
+    files = []
+    stack = [('', source)]
+    while stack:
+        prefix, path = stack.pop()
+        with os.scandir(path) as it:
+            for entry in it:
+                name = prefix + entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((name + '/', entry.path))
+                    elif entry.is_file():
+                        files.append(SourceFile(name, entry.path))
+                except OSError:
+                    pass
+
+    files.sort(key=lambda f: f.name.split('/'))
+    for i, f in enumerate(files):
+        if f.name == 'nm':
+            files.append(files.pop(i))
+            break
+    return files
+
+
+def _changed(path: str) -> VromfsPackError:
+    return VromfsPackError('Размер файла изменился при упаковке: {}'.format(path))
+
+
+def _load(path: str, limit: int, hashed: bool, hash_large: bool) -> Tuple[int, Optional[bytes], Optional[bytes]]:
+    """
+    Размер, данные и дайджест файла, если hashed. Данные не читаются, если размер больше limit,
+    дайджест такого файла вычисляется блоками, если hash_large.
+    """
+
+    with open(path, 'rb') as istream:
+        size = os.fstat(istream.fileno()).st_size
+        if size > limit:
+            if not hash_large:
+                return size, None, None
+            m = sha1()
+            rest = size
+            while rest:
+                chunk = istream.read(min(rest, limit))
+                if not chunk:
+                    raise _changed(path)
+                m.update(chunk)
+                rest -= len(chunk)
+            return size, None, m.digest()
+        data = istream.read(size)
+    if len(data) != size:
+        raise _changed(path)
+    return size, data, sha1(data).digest() if hashed else None
+
+
+def _truncated(info: FileInfo) -> VromfsPackError:
+    return VromfsPackError('Неожиданный конец исходного образа: {}'.format(info.name))
+
+
+def _chunks_at(read_at: ReadIntoAt, info: FileInfo, buffer: bytearray) -> Iterator[memoryview]:
+    """Данные файла исходного образа блоками размера buffer. Блок действителен до следующей итерации."""
+
+    view = memoryview(buffer)
+    offset = info.offset
+    rest = info.size
+    while rest:
+        n = read_at(offset, view[:min(rest, len(view))])
+        if not n:
+            raise _truncated(info)
+        yield view[:n]
+        offset += n
+        rest -= n
+
+
+def _load_info(read_at: ReadIntoAt, info: FileInfo, limit: int, hashed: bool, hash_large: bool
+               ) -> Tuple[int, Optional[bytes], Optional[bytes]]:
+    """
+    Размер, данные и дайджест файла исходного образа, как у _load.
+    Сохраненный в образе дайджест не пересчитывается.
+    """
+
+    size, digest = info.size, info.digest
+    if size > limit:
+        if digest is None and hash_large:
+            m = sha1()
+            for chunk in _chunks_at(read_at, info, bytearray(limit)):
+                m.update(chunk)
+            digest = m.digest()
+        return size, None, digest
+
+    buffer = bytearray(size)
+    for _ in _chunks_at(read_at, info, buffer):
+        pass
+    data = bytes(buffer)
+    if digest is None and hashed:
+        digest = sha1(data).digest()
+    return size, data, digest
+
+
+def _loader(source: Optional[ReadIntoAt], limit: int, hashed: bool, hash_large: bool
+            ) -> Callable[[Entry], Tuple[int, Optional[bytes], Optional[bytes]]]:
+    def load(f: Entry) -> Tuple[int, Optional[bytes], Optional[bytes]]:
+        if isinstance(f, FileInfo):
+            if source is None:
+                raise VromfsPackError('Не задан исходный образ для файла: {}'.format(f.name))
+            return _load_info(source, f, limit, hashed, hash_large)
+        return _load(f.path, limit, hashed, hash_large)
+
+    return load
+
+
+def _loaded(files: Iterable[Entry], load: Callable[[Entry], Tuple[int, Optional[bytes], Optional[bytes]]], jobs: int
+            ) -> Iterator[Tuple[Entry, int, Optional[bytes], Optional[bytes]]]:
+    if jobs == 1:
+        for f in files:
+            yield (f, *load(f))
+        return
+
+    window = 2 * jobs
+    pending = deque()
+    with ThreadPoolExecutor(jobs) as executor:
+        for f in files:
+            pending.append((f, executor.submit(load, f)))
+            while len(pending) > window:
+                f_, future = pending.popleft()
+                yield (f_, *future.result())
+        while pending:
+            f_, future = pending.popleft()
+            yield (f_, *future.result())
+
+
+def _copy_range(istream: IOBase, ostream: IOBase, size: int) -> bool:
+    """Копирование size байт через os.copy_file_range. False, если копирование не поддерживается."""
+
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    if copy_file_range is None:
+        return False
+    try:
+        fd = ostream.fileno()
+    except (AttributeError, OSError, UnsupportedOperation):
+        return False
+
+    ostream.flush()
+    pos = ostream.tell()
+    done = 0
+    while done < size:
+        try:
+            n = copy_file_range(istream.fileno(), fd, size - done, done, pos + done)
+        except OSError as e:
+            if done == 0 and e.errno in COPY_RANGE_ERRORS:
+                return False
+            raise
+        if not n:
+            raise _changed(istream.name)
+        done += n
+    ostream.seek(pos + size)
+    return True
+
+
+def _copy(path: str, size: int, ostream: IOBase, checked: bool, buffer: bytearray) -> Optional[bytes]:
+    """Копирование большого файла в ostream блоками. Дайджест, если checked."""
+
+    with open(path, 'rb') as istream:
+        if not checked and _copy_range(istream, ostream, size):
+            return None
+
+        m = sha1() if checked else None
+        view = memoryview(buffer)
+        rest = size
+        while rest:
+            n = istream.readinto(view[:min(rest, len(view))])
+            if not n:
+                raise _changed(path)
+            chunk = view[:n]
+            ostream.write(chunk)
+            if m is not None:
+                m.update(chunk)
+            rest -= n
+
+    return None if m is None else m.digest()
+
+
+def write_image(files: Iterable[Entry], ostream: IOBase, extended: bool, checked: bool, jobs: int = 1,
+                chunk_size: int = CHUNK_SIZE, dedup: bool = False, report: Optional[PackReport] = None,
+                source: Optional[ReadIntoAt] = None) -> None:
+    """
+    Запись образа из файлов files в порядке перечисления с начала потока ostream.
+    Файлы до chunk_size байт читаются пулом из jobs потоков, в памяти удерживаются данные не более 2*jobs файлов.
+    Файлы больше chunk_size копируются блоками.
+    Если dedup, файл с теми же SHA1 и размером, что и у ранее записанного, ссылается на его блок данных;
+    большие файлы при этом читаются дважды: для дайджеста и для копирования.
+    Файлы FileInfo копируются из исходного образа source с сохраненными дайджестами, файлы с общим блоком данных
+    в исходном образе сохраняют общий блок.
+
+    :raises VromfsPackError: Нет файлов. Ошибка при формировании метаданных. Размер файла изменился при упаковке.
+        Исходный образ не задан или короче данных файла.
+    :raises EnvironmentError: Ошибка чтения файла или записи образа.
+    """
+
+    files = list(files)
+    count = len(files)
+    if not count:
+        # Образ без файлов не формируется, как и до потоковой записи: секции имен и адресов не могут быть пустыми.
+        raise VromfsPackError('Пустое дерево: нет файлов для упаковки.')
+
+    raw_names = [NM_NAME if f.name == 'nm' else f.name.encode() for f in files]
+    names_info_offset = 0x30 if extended else 0x20
+    names_data_offset = names_info_offset + aligned(8 * count)
+    name_offsets = []
+    pos = names_data_offset
+    for raw in raw_names:
+        name_offsets.append(pos)
+        pos += len(raw) + 1
+    names_data = b'\x00'.join(raw_names) + b'\x00'
+    data_info_offset = names_data_offset + aligned(len(names_data))
+    digests_offset = data_info_offset + DATA_INFO.size * count
+    data_offset = digests_offset + (aligned(DIGEST_SIZE * count) if checked else 0)
+
+    try:
+        head = [SECTION_HEADER.pack(names_info_offset, count), SECTION_HEADER.pack(data_info_offset, count)]
+        names_info = struct.pack('<{}Q'.format(count), *name_offsets)
+    except struct.error as e:
+        raise VromfsPackError('Ошибка при формировании метаданных: секция имен.') from e
+
+    if extended:
+        if checked:
+            end, begin = digests_offset + DIGEST_SIZE * count, digests_offset
+        else:
+            end, begin = data_offset, 0
+        try:
+            head.append(DIGESTS_HEADER.pack(end, begin))
+        except struct.error as e:
+            raise VromfsPackError('Ошибка при формировании метаданных: секции адресов и дайджестов.') from e
+    head.append(names_info)
+
+    ostream.write(b''.join(head))
+    ostream.write(bytes(names_data_offset - names_info_offset - 8 * count))
+    ostream.write(names_data)
+    ostream.write(bytes(data_info_offset - names_data_offset - len(names_data)))
+    ostream.seek(data_offset)
+
+    if report is None:
+        report = PackReport()
+    data_info = []
+    digests = []
+    blocks: Dict[Tuple[bytes, int], int] = {}
+    ranges: Dict[Tuple[int, int], int] = {}
+    buffer = None
+    offset = data_offset
+    load = _loader(source, chunk_size, checked or dedup, dedup)
+    for f, size, data, digest in _loaded(files, load, jobs):
+        report.files += 1
+        report.data_size += size
+        block_offset = None
+        if isinstance(f, FileInfo):
+            report.copied += 1
+            block_offset = ranges.get((f.offset, size))
+            if block_offset is not None:
+                report.shared += 1
+                report.shared_size += aligned(size)
+        if dedup and block_offset is None:
+            block_offset = blocks.get((digest, size))
+            if block_offset is not None:
+                report.duplicates += 1
+                report.saved_size += aligned(size)
+        if block_offset is not None:
+            data_info.append((block_offset, size))
+            digests.append(digest)
+            continue
+        if dedup:
+            blocks[(digest, size)] = offset
+        if isinstance(f, FileInfo):
+            ranges[(f.offset, size)] = offset
+
+        if data is None:
+            if buffer is None:
+                buffer = bytearray(chunk_size)
+            if isinstance(f, FileInfo):
+                m = sha1() if checked and digest is None else None
+                for chunk in _chunks_at(source, f, buffer):
+                    ostream.write(chunk)
+                    if m is not None:
+                        m.update(chunk)
+                if m is not None:
+                    digest = m.digest()
+            else:
+                copied = _copy(f.path, size, ostream, checked and digest is None, buffer)
+                if digest is None:
+                    digest = copied
+        else:
+            ostream.write(data)
+        ostream.write(bytes(aligned(size) - size))
+        data_info.append((offset, size))
+        digests.append(digest)
+        offset += aligned(size)
+        report.written_size += aligned(size)
+
+    try:
+        tail = [DATA_INFO.pack(*info) for info in data_info]
+    except struct.error as e:
+        raise VromfsPackError('Ошибка при формировании метаданных: секции адресов и дайджестов.') from e
+    if checked:
+        tail.extend(digests)
+        tail.append(bytes(aligned(DIGEST_SIZE * count) - DIGEST_SIZE * count))
+
+    ostream.seek(data_info_offset)
+    ostream.write(b''.join(tail))
+    ostream.seek(0, SEEK_END)
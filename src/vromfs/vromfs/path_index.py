@@ -0,0 +1,188 @@
+from fnmatch import fnmatchcase
+from operator import attrgetter
+import os
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, Iterator, List, MutableMapping, Optional, Sequence, Tuple, Union
+from .common import FileInfo
+
+__all__ = [
+    'PathIndex',
+]
+
+MAGIC_CHARS = frozenset('*?[')
+"""Символы шаблонов fnmatch."""
+
+RECURSIVE = '**'
+"""Компонент шаблона, которому соответствует любое число директорий, включая ни одной."""
+
+Prefix = Union[str, os.PathLike, None]
+
+
+def is_magic(part: str) -> bool:
+    return not MAGIC_CHARS.isdisjoint(part)
+
+
+class _Node:
+    __slots__ = ('dirs', 'files')
+
+    def __init__(self):
+        self.dirs: Dict[str, '_Node'] = {}
+        self.files: Dict[str, FileInfo] = {}
+
+
+class PathIndex:
+    """
+    Префиксное дерево внутренних путей образа по компонентам пути.
+    Выборка по шаблону проходит только совпадающие ветви дерева, результаты упорядочены по возрастанию смещений.
+    """
+
+    def __init__(self, infos: Iterable[FileInfo]):
+        """
+        :param infos: Объекты файлов в порядке возрастания смещений.
+        """
+
+        self._root = _Node()
+        for info in infos:
+            node = self._root
+            *dirs, name = info.name.split('/')
+            for part in dirs:
+                child = node.dirs.get(part)
+                if child is None:
+                    child = node.dirs[part] = _Node()
+                node = child
+            node.files[name] = info
+
+    @staticmethod
+    def _split(s: Prefix) -> Sequence[str]:
+        if s is None:
+            return ()
+        if isinstance(s, os.PathLike):
+            s = os.fspath(s)
+        elif not isinstance(s, str):
+            raise TypeError('ожидалось str | PathLike: {}'.format(type(s)))
+        return tuple(part for part in PurePosixPath(s.replace(os.path.sep, '/')).parts if part != '/')
+
+    def _node(self, prefix: Prefix) -> _Node:
+        node = self._root
+        for part in self._split(prefix):
+            try:
+                node = node.dirs[part]
+            except KeyError:
+                raise KeyError('prefix: нет директории {!r}'.format(str(prefix)))
+        return node
+
+    @staticmethod
+    def _collect(node: _Node, out: MutableMapping[str, FileInfo]) -> None:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for info in node.files.values():
+                out[info.name] = info
+            stack.extend(node.dirs.values())
+
+    def _match(self, node: _Node, parts: Sequence[str], i: int, out: MutableMapping[str, FileInfo]) -> None:
+        part = parts[i]
+        last = i == len(parts) - 1
+
+        if part == RECURSIVE:
+            if last:
+                self._collect(node, out)
+                return
+            self._match(node, parts, i+1, out)
+            for child in node.dirs.values():
+                self._match(child, parts, i, out)
+            return
+
+        if last:
+            if is_magic(part):
+                for name, info in node.files.items():
+                    if fnmatchcase(name, part):
+                        out[info.name] = info
+            else:
+                info = node.files.get(part)
+                if info is not None:
+                    out[info.name] = info
+            return
+
+        if is_magic(part):
+            for name, child in node.dirs.items():
+                if fnmatchcase(name, part):
+                    self._match(child, parts, i+1, out)
+        else:
+            child = node.dirs.get(part)
+            if child is not None:
+                self._match(child, parts, i+1, out)
+
+    def glob(self, pattern: str) -> List[FileInfo]:
+        """
+        Файлы, внутренние пути которых соответствуют шаблону pattern, в порядке возрастания смещений.
+        Компоненты шаблона разделяются ``/`` и сравниваются как в fnmatch, ``**`` соответствует
+        любому числу директорий.
+
+        :raises TypeError: Неверный тип pattern.
+        """
+
+        if not isinstance(pattern, str):
+            raise TypeError('pattern: ожидалось str: {}'.format(type(pattern)))
+
+        parts = self._split(pattern)
+        out = {}
+        if parts:
+            self._match(self._root, parts, 0, out)
+        return sorted(out.values(), key=attrgetter('offset'))
+
+    def select(self, include: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None
+               ) -> List[FileInfo]:
+        """
+        Файлы, соответствующие хотя бы одному шаблону include и ни одному шаблону exclude,
+        в порядке возрастания смещений. Если include задан как None, принимаются все файлы.
+
+        :raises TypeError: Неверный тип шаблона.
+        """
+
+        out = {}
+        if include is None:
+            self._collect(self._root, out)
+        else:
+            for pattern in include:
+                for info in self.glob(pattern):
+                    out[info.name] = info
+
+        for pattern in exclude or ():
+            for info in self.glob(pattern):
+                out.pop(info.name, None)
+
+        return sorted(out.values(), key=attrgetter('offset'))
+
+    def listdir(self, prefix: Prefix = None) -> List[str]:
+        """
+        Имена директорий и файлов в директории prefix образа, по возрастанию.
+        Корень образа, если prefix задан как None.
+
+        :raises TypeError: Неверный тип prefix.
+        :raises KeyError: Директория отсутствует в образе.
+        """
+
+        node = self._node(prefix)
+        return sorted(list(node.dirs) + list(node.files))
+
+    def walk(self, prefix: Prefix = None) -> Iterator[Tuple[Path, List[str], List[FileInfo]]]:
+        """
+        Обход дерева директорий образа сверху вниз, начиная с prefix, как в os.walk.
+        Для каждой директории возвращается ``(путь, имена поддиректорий, объекты файлов)``,
+        файлы в порядке возрастания смещений. Удаление имен из списка поддиректорий исключает их из обхода.
+
+        :raises TypeError: Неверный тип prefix.
+        :raises KeyError: Директория отсутствует в образе.
+        """
+
+        top = Path(*self._split(prefix))
+        stack = [(top, self._node(prefix))]
+        while stack:
+            path, node = stack.pop()
+            dirnames = sorted(node.dirs)
+            yield path, dirnames, list(node.files.values())
+            for name in reversed(dirnames):
+                child = node.dirs.get(name)
+                if child is not None:
+                    stack.append((path / name, child))
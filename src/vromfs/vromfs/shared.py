@@ -0,0 +1,188 @@
+"""
+Публикация образа VROMFS для процессов-обработчиков.
+Распакованный образ и столбцы таблицы файлов записываются один раз в отображаемый в память временный файл,
+обработчик подключается по небольшому описателю без повторной распаковки контейнера и разбора метаданных.
+"""
+
+from array import array
+import mmap
+import os
+from tempfile import NamedTemporaryFile
+from typing import List, NamedTuple, Optional, Union
+from vromfs.common import CHUNK_SIZE
+from vromfs.memory_reader import MemoryReader
+from .cache import DependencyCache
+from .file_table import DIGEST_SIZE, FileTable, TableHeader
+from .vromfs_file import VromfsFile
+
+__all__ = [
+    'SharedImage',
+    'SharedImageHandle',
+]
+
+ITEM_SIZE = array('I').itemsize
+
+
+def _aligned(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class SharedImageHandle(NamedTuple):
+    """Описатель опубликованного образа. Передается в процессы-обработчики."""
+
+    path: str
+    """Путь отображаемого файла."""
+
+    image_size: int
+    """Размер распакованного образа."""
+
+    names_size: int
+    """Размер блока имен."""
+
+    header: TableHeader
+    """Заголовки таблиц образа."""
+
+    checked: bool
+    """Содержит ли таблица дайджесты?"""
+
+    @property
+    def count(self) -> int:
+        return self.header.count
+
+    def layout(self) -> List[int]:
+        """Смещения в файле: образ, имена, смещения имен, смещения данных, размеры данных, дайджесты, конец."""
+
+        count = self.count
+        sizes = [self.image_size, self.names_size, ITEM_SIZE * (count + 1), ITEM_SIZE * count, ITEM_SIZE * count,
+                 DIGEST_SIZE * count if self.checked else 0]
+        offsets = [0]
+        for size in sizes:
+            offsets.append(offsets[-1] + _aligned(size))
+        return offsets
+
+
+class SharedImage:
+    """
+    Образ VROMFS в отображаемом в память файле.
+    Публикующий процесс создает файл и удаляет его при закрытии, обработчики подключаются по описателю handle.
+    Отображение только для чтения, поэтому подключение не зависит от размера образа:
+    данные читаются страницами по мере обращения и разделяются процессами через страничный кэш.
+    """
+
+    def __init__(self, handle: SharedImageHandle, owner: bool = False, cache: Optional[DependencyCache] = None):
+        """
+        :param handle: Описатель опубликованного образа.
+        :param owner: Удалить файл при закрытии.
+        :param cache: Кэш словарей и таблиц имен.
+        :raises TypeError: Неверный тип handle.
+        :raises EnvironmentError: Ошибка доступа к файлу.
+        """
+
+        if not isinstance(handle, SharedImageHandle):
+            raise TypeError('handle: ожидался SharedImageHandle: {}'.format(type(handle)))
+
+        self._handle = handle
+        self._owner = owner
+        layout = handle.layout()
+        with open(handle.path, 'rb') as istream:
+            self._mmap = mmap.mmap(istream.fileno(), layout[-1] or 1, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._mmap)
+        image, names, name_offsets, offsets, sizes, digests = (view[b:e] for b, e in zip(layout, layout[1:]))
+        count = handle.count
+        self._views = [view, image, names, name_offsets, offsets, sizes, digests]
+        columns = (names[:handle.names_size], name_offsets[:ITEM_SIZE * (count + 1)].cast('I'),
+                   offsets[:ITEM_SIZE * count].cast('I'), sizes[:ITEM_SIZE * count].cast('I'),
+                   digests[:DIGEST_SIZE * count] if handle.checked else None)
+        self._views.extend(column for column in columns if column is not None)
+        self._stream = MemoryReader(image[:handle.image_size])
+        self._vromfs = VromfsFile(self._stream, cache=cache)
+        self._vromfs._set_table(handle.header, FileTable(*columns))
+
+    @classmethod
+    def publish(cls, vromfs: VromfsFile, dir: Union[str, os.PathLike, None] = None,
+                cache: Optional[DependencyCache] = None) -> 'SharedImage':
+        """
+        Запись образа и таблицы файлов во временный файл. Образ читается из источника один раз.
+
+        :param vromfs: Образ. Поток образа должен допускать чтение с начала.
+        :param dir: Директория временного файла, например ``/dev/shm``.
+        :param cache: Кэш словарей и таблиц имен.
+        :raises VromfsUnpackError: Ошибка при построении пространства имен.
+        :raises EnvironmentError: Ошибка при записи файла.
+        """
+
+        header = vromfs.header
+        names, name_offsets, offsets, sizes, digests = vromfs.info_map.table.columns()
+        stream = vromfs._vromfs_stream
+
+        with NamedTemporaryFile(prefix='vromfs_', suffix='.image', dir=dir, delete=False) as ostream:
+            try:
+                stream.seek(0)
+                image_size = 0
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    ostream.write(chunk)
+                    image_size += len(chunk)
+
+                handle = SharedImageHandle(ostream.name, image_size, len(names), header, digests is not None)
+                layout = handle.layout()
+                for offset, column in zip(layout[1:], (names, name_offsets, offsets, sizes, digests)):
+                    if column is not None:
+                        ostream.seek(offset)
+                        ostream.write(column)
+                ostream.truncate(layout[-1])
+            except Exception:
+                ostream.close()
+                os.unlink(ostream.name)
+                raise
+
+        return cls(handle, owner=True, cache=cache)
+
+    @classmethod
+    def attach(cls, handle: SharedImageHandle, cache: Optional[DependencyCache] = None) -> 'SharedImage':
+        """
+        Подключение к опубликованному образу.
+
+        :raises TypeError: Неверный тип handle.
+        :raises EnvironmentError: Ошибка доступа к файлу.
+        """
+
+        return cls(handle, cache=cache)
+
+    @property
+    def handle(self) -> SharedImageHandle:
+        """Описатель для подключения в других процессах."""
+
+        return self._handle
+
+    @property
+    def vromfs(self) -> VromfsFile:
+        """Образ поверх отображенного файла с готовой таблицей файлов."""
+
+        return self._vromfs
+
+    def close(self) -> None:
+        if self._mmap is None:
+            return
+
+        self._vromfs = None
+        self._stream.close()
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._mmap.close()
+        self._mmap = None
+        if self._owner:
+            try:
+                os.unlink(self._handle.path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> 'SharedImage':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
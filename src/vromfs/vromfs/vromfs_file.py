@@ -1,84 +1,83 @@
-from collections import OrderedDict
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from hashlib import sha1
-from io import BytesIO, IOBase, SEEK_END
-from itertools import chain, repeat
+from io import BytesIO, IOBase
+from itertools import chain
 import logging
+from operator import attrgetter
 import os
 from pathlib import Path
-from typing import (Any, BinaryIO, Iterable, Iterator, Mapping, MutableSequence, NamedTuple, Optional,
-                    OrderedDict as ODict, Sequence, TextIO, Union)
-import construct as ct
-from construct import this
-from zstandard import DICT_TYPE_AUTO, FORMAT_ZSTD1, ZstdCompressionDict, ZstdDecompressor
-import blk.text as txt
-import blk.json as jsn
-from blk import Format, Section
-from blk.binary import (BlkType, ComposeError, compose_names, compose_partial_fat_zst, compose_partial_bbf,
-                        compose_partial_bbf_zlib, compose_partial_fat, compose_partial_slim, compose_partial_slim_zst)
+from threading import Lock
+from time import perf_counter
+from typing import (TYPE_CHECKING, Any, BinaryIO, Iterable, Iterator, List, Mapping, MutableSequence, NamedTuple,
+                    Optional, Sequence, TextIO, Tuple, Union)
+from vromfs.bin import BinFile
 from vromfs.common import file_apply
 from vromfs.ranged_reader import RangedReader
-from .common import FileInfo, NamesData
-from .error import VromfsPackError, VromfsUnpackError
+from vromfs.stats import IOStats, StatsReader
+from .cache import DependencyCache
+from .common import FileInfo
+from .error import VromfsUnpackError
+from .file_index import FileIndex, Key
+from .file_table import FileTable, PathView, TableHeader
+from .file_reader import ReadIntoAt, VromfsFileReader, locked_reader, positional_reader, spooled_reader
+from .path_index import PathIndex, Prefix
+from .metrics import FileMetrics, TimedDecompressor
+
+if TYPE_CHECKING:
+    from zstandard import ZstdDecompressor
+    from blk import Format, Section
+    from .layout import Layout
+    from .packer import PackReport
+
+# Модули construct, zstandard и blk загружаются при первом использовании: получение сводки о файлах
+# и распаковка как есть не требуют преобразования blk. Модули упаковки загружаются при записи образа.
 
 __all__ = [
-    'Image',
     'VromfsFile',
 ]
 
 logger = logging.getLogger(__name__)
-Item = Union[os.PathLike, FileInfo]
+Item = Union[str, os.PathLike, FileInfo]
 
 
 class ExtractResult(NamedTuple):
     path: Path
     error: Optional[Exception]
+    metrics: Optional[FileMetrics] = None
 
 
-Image = ct.Struct(
-    'names_header' / ct.Aligned(16, ct.Struct(
-        'offset' / ct.Int32ul,
-        'count' / ct.Int32ul,
-    )),
+class FileDigest(NamedTuple):
+    info: FileInfo
+    """Метаданные файла."""
 
-    'data_header' / ct.Aligned(16, ct.Struct(
-        'offset' / ct.Int32ul,
-        'count' / ct.Int32ul,
-    )),
+    digest: bytes
+    """SHA1 дайджест содержимого."""
 
-    'digests_header' / ct.If(this.names_header.offset == 0x30, ct.Aligned(16, ct.Struct(
-        'end' / ct.Int64ul,
-        'begin' / ct.Int16ul,
-    ))),
+    head: Optional[bytes]
+    """Первый байт данных, если данные читались для вычисления дайджеста, иначе None."""
 
-    ct.Check(lambda ctx: ctx.names_header.offset == ctx._io.tell()),
-    'names_info' / ct.Aligned(16, ct.Int64ul[this.names_header.count]),
-    'names_data' / ct.Aligned(16, NamesData(this.names_info)),
 
-    ct.Check(lambda ctx: ctx.data_header.offset == ctx._io.tell()),
-    'data_info' / ct.Aligned(16, ct.Aligned(16, ct.Struct(
-        'offset' / ct.Int32ul,
-        'size' / ct.Int32ul,
-    ))[this.data_header.count]),
+def serialize_text(root: 'Section', ostream: TextIO, out_format: 'Format', is_sorted: bool, is_minified: bool
+                   ) -> None:
+    import blk.text as txt
+    import blk.json as jsn
+    from blk import Format
 
-    ct.If(lambda ctx: ctx.digests_header and ctx.digests_header.begin,
-          ct.Check(lambda ctx: this.digests_header.begin == ctx._io.tell())),
-    'digests_data' / ct.If(lambda ctx: ctx.digests_header and ctx.digests_header.begin,
-                           ct.Aligned(16, ct.Bytes(20)[this.data_header.count])),
-
-    'offset' / ct.Tell,
-
-    ct.If(lambda ctx: ctx.digests_header and not ctx.digests_header.begin,
-          ct.Check(lambda ctx: ctx.digests_header.end == ctx._io.tell())),
-)
-
-
-def serialize_text(root: Section, ostream: TextIO, out_format: Format, is_sorted: bool, is_minified: bool) -> None:
     if out_format is Format.STRICT_BLK:
         txt.serialize(root, ostream, dialect=txt.StrictDialect)
     elif out_format in (Format.JSON, Format.JSON_2, Format.JSON_3):
         jsn.serialize(root, ostream, out_format, is_sorted, is_minified)
 
 
+def is_raw(out_format: Optional['Format']) -> bool:
+    if out_format is None:
+        return True
+    from blk import Format
+    return out_format is Format.RAW
+
+
 def is_text(bs: Iterable[bytes]) -> bool:
     restricted = bytes.fromhex('00 01 02 03 04 05 06 07 08 0b 0c 0e 0f 10 11 12 14 13 15 16 17 18 19')
     return not any(b in restricted for b in bs)
@@ -93,9 +92,12 @@ class VromfsFile(IOBase):
     Класс для работы с VROMFS образом.
     """
 
-    def __init__(self, source: Union[os.PathLike, IOBase]) -> None:
+    def __init__(self, source: Union[os.PathLike, IOBase], stats: Optional[IOStats] = None,
+                 cache: Optional[DependencyCache] = None) -> None:
         """
         :param source: Входной файл или путь к файлу образа.
+        :param stats: Счетчики ввода-вывода. Если не указаны, для BinFile source принимаются его счетчики.
+        :param cache: Кэш словарей и таблиц имен, общий для нескольких образов.
         :raises TypeError: Неверный тип source.
         :raises EnvironmentError: Ошибка доступа к source.
         """
@@ -115,14 +117,35 @@ class VromfsFile(IOBase):
         else:
             raise TypeError('source: ожидалось PathLike | Binary Reader: {}'.format(type(source)))
 
+        if stats is None and isinstance(source, BinFile):
+            stats = source.stats
+        self._stats = stats
+        if stats is not None:
+            self._vromfs_stream = StatsReader(self._vromfs_stream, stats.layer('vromfs'))
+
         self._meta = None
+        self._base = None
+        self._header: Optional[TableHeader] = None
         self._info_map = None
+        self._name_list = None
+        self._path_index = None
         self._nm = None
         self._dctx = None
+        self._cache = cache
+        self._dict_key = None
+        self._readinto_at = None
+        self._reader_lock = Lock()
+        self._spool = None
 
     def close(self) -> None:
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
         if self._owner:
-            self._vromfs_stream.close()
+            stream = self._vromfs_stream
+            if isinstance(stream, StatsReader):
+                stream = stream.wrapped
+            stream.close()
 
     @property
     def name(self) -> Optional[str]:
@@ -132,6 +155,14 @@ class VromfsFile(IOBase):
 
         return self._name
 
+    @property
+    def stats(self) -> Optional[IOStats]:
+        """
+        Счетчики ввода-вывода, включая уровень ``vromfs``. None, если сбор не включен.
+        """
+
+        return self._stats
+
     # todo: обернуть в пространство имен с известными членами
     @property
     def meta(self) -> Any:
@@ -142,7 +173,14 @@ class VromfsFile(IOBase):
         """
 
         if self._meta is None:
+            import construct as ct
+            from .constructor import Image
+
             try:
+                if self._base is None:
+                    self._base = self._vromfs_stream.tell()
+                else:
+                    self._vromfs_stream.seek(self._base)
                 self._meta = Image.parse_stream(self._vromfs_stream)
             except ct.ConstructError as e:
                 raise VromfsUnpackError('Ошибка при построении метаданных образа VROMFS.') from e
@@ -157,8 +195,7 @@ class VromfsFile(IOBase):
         :raises VromfsUnpackError: Ошибка при построении пространства имен.
         """
 
-        meta = self.meta
-        return bool(meta.digests_header and meta.digests_header.begin)
+        return self.header.checked
 
     @property
     def extended(self) -> bool:
@@ -168,53 +205,133 @@ class VromfsFile(IOBase):
         :raises VromfsUnpackError: Ошибка при построении пространства имен.:
         """
 
-        return self.meta.names_header.offset == 0x30
+        return self.header.extended
 
     @property
-    def info_map(self) -> ODict[Path, FileInfo]:
+    def info_map(self) -> FileIndex:
         """
         Упорядоченное отображение ``{внутренний путь файла => метаданные файла}``
-        в порядке возрастания смещений файлов.
+        в порядке возрастания смещений файлов. Ключи поиска - str или PathLike.
 
         :raises VromfsUnpackError: Ошибка при построении пространства имен.
         """
 
         if self._info_map is None:
-            meta = self.meta
-            paths = meta.names_data
-            digests = meta.digests_data if meta.digests_data else repeat(None)
-            data_info = meta.data_info
-            offsets = [di['offset'] for di in data_info]
-            sizes = [di['size'] for di in data_info]
-            infos = [FileInfo(p, o, s, d) for p, o, s, d in zip(paths, offsets, sizes, digests)]
-            infos.sort(key=lambda info: info.offset)
-            self._info_map = OrderedDict((info.path, info) for info in infos)
+            self._read_table()
 
         return self._info_map
 
-    def get_info(self, path: os.PathLike) -> FileInfo:
+    @property
+    def header(self) -> TableHeader:
+        """
+        Заголовки таблиц образа.
+
+        :raises VromfsUnpackError: Ошибка при построении пространства имен.
+        """
+
+        if self._header is None:
+            self._read_table()
+
+        return self._header
+
+    def _read_table(self) -> None:
+        """Чтение таблицы файлов по столбцам, без построения метаданных construct."""
+
+        if self._base is None:
+            self._base = self._vromfs_stream.tell()
+        else:
+            self._vromfs_stream.seek(self._base)
+        self._set_table(*FileTable.read(self._vromfs_stream))
+
+    def _set_table(self, header: TableHeader, table: FileTable) -> None:
+        """Установка заголовков и таблицы файлов, прочитанных ранее, например из разделяемой памяти."""
+
+        self._header = header
+        self._info_map = FileIndex(table)
+
+    def get_info(self, path: Key) -> FileInfo:
         """
         Метаданные файла по внутреннему пути path.
+        Для строки с именем в виде, принятом в образе, поиск не создает объектов Path.
 
         :raises TypeError: Неверный тип path.
         :raises KeyError: Рath отсутствует в карте имен.
         :raises VromfsUnpackError: Ошибка при построении пространства имен.
         """
 
-        if isinstance(path, Path):
-            pass
-        elif isinstance(path, os.PathLike):
-            path = Path(path)
-        else:
-            raise TypeError('path: ожидалось Path | PathLike: {}'.format(type(path)))
-
-        try:
-            info = self.info_map[path]
-        except KeyError:
+        info = self.info_map.lookup(path)
+        if info is None:
             raise KeyError('path: нет FileInfo, содержащего путь {!r}'.format(str(path)))
 
         return info
 
+    def __contains__(self, path: Any) -> bool:
+        """
+        Содержит ли образ файл с внутренним путем path?
+
+        :raises VromfsUnpackError: Ошибка при построении пространства имен.
+        """
+
+        return path in self.info_map
+
+    @property
+    def path_index(self) -> PathIndex:
+        """
+        Префиксное дерево внутренних путей. Строится один раз.
+
+        :raises VromfsUnpackError: Ошибка при построении пространства имен.
+        """
+
+        if self._path_index is None:
+            self._path_index = PathIndex(self.info_map.values())
+
+        return self._path_index
+
+    def glob(self, pattern: str) -> Sequence[FileInfo]:
+        """
+        Метаданные файлов, внутренние пути которых соответствуют шаблону pattern, например ``config/**/*.blk``,
+        в порядке возрастания смещений. См. PathIndex.glob.
+
+        :raises TypeError: Неверный тип pattern.
+        :raises VromfsUnpackError: Ошибка при построении пространства имен.
+        """
+
+        return self.path_index.glob(pattern)
+
+    def select(self, include: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None
+               ) -> Sequence[FileInfo]:
+        """
+        Метаданные файлов, соответствующих хотя бы одному шаблону include и ни одному шаблону exclude,
+        в порядке возрастания смещений. Если include задан как None, принимаются все файлы.
+
+        :raises TypeError: Неверный тип шаблона.
+        :raises VromfsUnpackError: Ошибка при построении пространства имен.
+        """
+
+        return self.path_index.select(include, exclude)
+
+    def listdir(self, prefix: Prefix = None) -> Sequence[str]:
+        """
+        Имена директорий и файлов в директории prefix образа. См. PathIndex.listdir.
+
+        :raises TypeError: Неверный тип prefix.
+        :raises KeyError: Директория отсутствует в образе.
+        :raises VromfsUnpackError: Ошибка при построении пространства имен.
+        """
+
+        return self.path_index.listdir(prefix)
+
+    def walk(self, prefix: Prefix = None) -> Iterator[Tuple[Path, List[str], List[FileInfo]]]:
+        """
+        Обход дерева директорий образа сверху вниз. См. PathIndex.walk.
+
+        :raises TypeError: Неверный тип prefix.
+        :raises KeyError: Директория отсутствует в образе.
+        :raises VromfsUnpackError: Ошибка при построении пространства имен.
+        """
+
+        return self.path_index.walk(prefix)
+
     @property
     def name_list(self) -> Sequence[Path]:
         """
@@ -223,17 +340,21 @@ class VromfsFile(IOBase):
         :raises VromfsUnpackError: Ошибка при построении пространства имен.
         """
 
-        return tuple(self.info_map.keys())
+        if self._name_list is None:
+            self._name_list = PathView(self.info_map.table)
+
+        return self._name_list
 
     @property
     def info_list(self) -> Sequence[FileInfo]:
         """
         Последовательность метаданных файлов в образе VROMFS в порядке возрастания смещений файлов.
+        Объекты FileInfo создаются при обращении к элементу.
 
         :raises VromfsUnpackError: Ошибка при построении пространства имен.
         """
 
-        return tuple(self.info_map.values())
+        return self.info_map.table
 
     @property
     def nm(self) -> Optional[Sequence[str]]:
@@ -245,22 +366,38 @@ class VromfsFile(IOBase):
 
         if self._nm is None:
             try:
-                info = self.get_info(Path('nm'))
+                info = self.get_info('nm')
             except KeyError:
                 pass
             else:
-                full_stream = RangedReader(self._vromfs_stream, info.offset, info.size)
-                try:
-                    ns = compose_names(full_stream, self.dctx)
-                    self._nm = ns.names
-                    logger.debug(f'Разделяемая карта имен {ns.table_digest.hex()}')
-                except ComposeError as e:
-                    raise VromfsUnpackError('Ошибка при распаковке таблицы имен.') from e
+                from vromfs.files.errors import ComposeError
+                from vromfs.files.shared_names import decode_shared_names
+
+                def load() -> Sequence[str]:
+                    # Компактная таблица: имена декодируются при обращении, размер распакованной таблицы
+                    # не ограничен.
+                    try:
+                        names = decode_shared_names(full_stream, self.dctx)
+                        logger.debug(f'Разделяемая карта имен: {len(names)} имен')
+                        return names
+                    except ComposeError as e:
+                        raise VromfsUnpackError('Ошибка при распаковке таблицы имен.') from e
+
+                if self._cache is None:
+                    full_stream = RangedReader(self._vromfs_stream, info.offset, info.size)
+                    self._nm = load()
+                else:
+                    # Таблица сжата словарем образа, ключ учитывает и словарь, и содержимое таблицы.
+                    self.dctx
+                    full_stream = self.unpack_into(info)
+                    key = self._dict_key, sha1(full_stream.getbuffer()).digest()
+                    full_stream.seek(0)
+                    self._nm = self._cache.get_names(key, load)
 
         return self._nm
 
     @property
-    def dctx(self) -> Optional[ZstdDecompressor]:
+    def dctx(self) -> Optional['ZstdDecompressor']:
         """
         Объект декомпрессора, используемый при распаковке. None, если образ не содержит словарь.
 
@@ -269,19 +406,29 @@ class VromfsFile(IOBase):
         """
 
         if self._dctx is None:
+            from zstandard import DICT_TYPE_AUTO, FORMAT_ZSTD1, ZstdCompressionDict, ZstdDecompressor
+
             info = None
-            for p, i in self.info_map.items():
-                if p.suffix == '.dict':
+            for i in self.info_map.values():
+                if i.name.endswith('.dict'):
                     info = i
                     break
             format_ = FORMAT_ZSTD1
             if info is None:
                 self._dctx = ZstdDecompressor(format=format_)
             else:
-                stream = BytesIO()
-                self._unpack_info_into_raw(info, stream)
-                data = stream.getvalue()
-                dict_ = ZstdCompressionDict(data, dict_type=DICT_TYPE_AUTO)
+                def load() -> ZstdCompressionDict:
+                    stream = BytesIO()
+                    self._unpack_info_into_raw(info, stream)
+                    data = stream.getvalue()
+                    return ZstdCompressionDict(data, dict_type=DICT_TYPE_AUTO)
+
+                if self._cache is None:
+                    dict_ = load()
+                else:
+                    # Имя словаря - дайджест его содержимого.
+                    self._dict_key = info.name.rpartition('/')[2], info.size
+                    dict_ = self._cache.get_dict(self._dict_key, load)
                 self._dctx = ZstdDecompressor(dict_data=dict_, format=format_)
 
         return self._dctx
@@ -295,41 +442,62 @@ class VromfsFile(IOBase):
         """
 
         reader = RangedReader(self._vromfs_stream, info.offset, info.size)
-        file_apply(reader, lambda c: ct.stream_write(ostream, c), info.size)
+        file_apply(reader, ostream.write, info.size)
 
     def _unpack_info_into_blk(self, info: FileInfo, ostream: TextIO,
-                              out_format: Format, is_sorted: bool, is_minified: bool) -> None:
+                              out_format: 'Format', is_sorted: bool, is_minified: bool,
+                              metrics: Optional[FileMetrics] = None) -> None:
         """
         Распаковка файла с преобразованием двоичных blk в текстовый поток, открытый для записи.
         Текстовые файлы копируются как есть как есть.
+        Если указаны метрики, данные файла предварительно читаются в память, чтобы отделить время чтения
+        от времени построения секции.
 
         :param info: Объект файла в образе.
         :param ostream: Выходной поток.
         :param out_format: Формат выходных данных.
         :param is_sorted: Сортировать ключи для JSON.
         :param is_minified: Минифицировать JSON.
+        :param metrics: Метрики файла для заполнения.
         :raises ct.ConstructError: Ошибка при чтении потока. Ошибка при записи потока.
         :raises zstd.ZstdError: Ошибка при распаковке ZSTD контейнера.
         :raises blk.ComposeError: Ошибка при формировании блока.
+        :raises vromfs.files.errors.ComposeError: Имя из общей таблицы имен не в кодировке utf8.
+        :raises VromfsUnpackError: Ошибка при распаковке общей таблицы имен.
         :raises EnvironmentError: Ошибка при записи блока.
         """
 
-        istream = RangedReader(self._vromfs_stream, info.offset, info.size)
+        from blk.binary import (BlkType, compose_partial_fat_zst, compose_partial_bbf, compose_partial_bbf_zlib,
+                                compose_partial_fat, compose_partial_slim, compose_partial_slim_zst)
+
+        if metrics is None:
+            istream = RangedReader(self._vromfs_stream, info.offset, info.size)
+        else:
+            t0 = perf_counter()
+            istream = BytesIO()
+            self._unpack_info_into_raw(info, istream)
+            istream.seek(0)
+            metrics.read_time = perf_counter() - t0
+            metrics.in_size = info.size
+
         fst = istream.read(1)
         if not fst:
-            logger.debug(f'{str(info.path)!r}: EMPTY')
+            logger.debug(f'{info.name!r}: EMPTY')
             return
         blk_type = BlkType.from_byte(fst)
+        if metrics is not None:
+            metrics.blk_type = blk_type
+            t0 = perf_counter()
         try:
             head = b''
             if blk_type is BlkType.FAT:
                 section = compose_partial_fat(istream)
             elif blk_type is BlkType.FAT_ZST:
-                section = compose_partial_fat_zst(istream, self.dctx)
+                section = compose_partial_fat_zst(istream, self._timed_dctx(metrics))
             elif blk_type is BlkType.SLIM:
                 section = compose_partial_slim(self.nm, istream)
             elif blk_type in (BlkType.SLIM_ZST, BlkType.SLIM_ZST_DICT):
-                section = compose_partial_slim_zst(self.nm, istream, self.dctx)
+                section = compose_partial_slim_zst(self.nm, istream, self._timed_dctx(metrics))
             elif blk_type is BlkType.BBF:
                 triple = istream.read(3)
                 if triple == b'BBF':
@@ -343,6 +511,10 @@ class VromfsFile(IOBase):
                 section = None
                 head = fst
 
+            if metrics is not None:
+                t1 = perf_counter()
+                metrics.compose_time = t1 - t0 - metrics.decompress_time
+
             if section is None:
                 bs = istream.read()
                 ostream.flush()
@@ -353,21 +525,34 @@ class VromfsFile(IOBase):
             else:
                 serialize_text(section, ostream, out_format, is_sorted, is_minified)
                 out_format_name = out_format.name
-            logger.debug(f'{str(info.path)!r}: {blk_type.name} => {out_format_name}')
+
+            if metrics is not None:
+                metrics.serialize_time = perf_counter() - t1
+            logger.debug(f'{info.name!r}: {blk_type.name} => {out_format_name}')
         except Exception:
-            logger.debug(f'{str(info.path)!r}: {blk_type.name}')
+            logger.debug(f'{info.name!r}: {blk_type.name}')
             raise
 
-    def _unpack_item(self, item: Item, path: Path, out_format: Format, is_sorted: bool, is_minified: bool) -> Path:
+    def _timed_dctx(self, metrics: Optional[FileMetrics]) -> 'ZstdDecompressor':
+        """
+        Декомпрессор для блоков *_ZST. Если указаны метрики, время распаковки учитывается в них.
+        """
+
+        dctx = self.dctx
+        return dctx if metrics is None else TimedDecompressor(dctx, metrics)
+
+    def _unpack_item(self, item: Item, path: Path, out_format: Optional['Format'], is_sorted: bool, is_minified: bool,
+                     metrics: Optional[FileMetrics] = None) -> Path:
         """
         Распаковка одного файла с заданным типом результата.
         В случае ошибки распаковки частичный результат доступен как ``target~``.
 
         :param item: Объект файла в образе.
         :param path: Путь выходной директории.
-        :param out_format: Формат выходных данных.
+        :param out_format: Формат выходных данных. None - как есть.
         :param is_sorted: Сортировать ключи для JSON.
         :param is_minified: Минифицировать JSON.
+        :param metrics: Метрики файла для заполнения.
         :return: Путь распакованного файла.
         :raises EnvironmentError: Ошибка при создании директории.
         Ошибка при инициализации выходного потока.
@@ -384,10 +569,10 @@ class VromfsFile(IOBase):
         target.parent.mkdir(parents=True, exist_ok=True)
         tmp = target.with_name(target.name + '~')
 
-        if out_format is not Format.RAW and item.path.suffix == '.blk':
+        if item.path.suffix == '.blk' and not is_raw(out_format):
             with create_text(tmp) as ostream:
                 try:
-                    self._unpack_info_into_blk(item, ostream, out_format, is_sorted, is_minified)
+                    self._unpack_info_into_blk(item, ostream, out_format, is_sorted, is_minified, metrics)
                     ostream.close()
                     tmp.replace(target)
                 except Exception:
@@ -395,13 +580,20 @@ class VromfsFile(IOBase):
         else:
             with open(tmp, 'wb') as ostream:
                 try:
+                    t0 = perf_counter()
                     self._unpack_info_into_raw(item, ostream)
+                    if metrics is not None:
+                        metrics.read_time = perf_counter() - t0
+                        metrics.in_size = item.size
                     logger.debug(f'{str(item.path)!r}')
                     ostream.close()
                     tmp.replace(target)
                 except Exception:
                     raise
 
+        if metrics is not None:
+            metrics.out_size = target.stat().st_size
+
         return target
 
     def unpack_into(self, item: Item, ostream: Optional[IOBase] = None
@@ -433,6 +625,46 @@ class VromfsFile(IOBase):
 
         return ostream
 
+    def _get_readinto_at(self) -> ReadIntoAt:
+        if self._readinto_at is None:
+            readinto_at = None
+            # Счетчики ввода-вывода ведутся только при чтении через StatsReader.
+            if not isinstance(self._vromfs_stream, StatsReader):
+                readinto_at = positional_reader(self._vromfs_stream)
+            if readinto_at is None:
+                source = self._vromfs_stream
+                if isinstance(source, StatsReader):
+                    source = source.wrapped
+                if isinstance(source, BinFile) and source.compressed:
+                    # Переход назад по сжатому контейнеру перезапускает распаковку с начала образа,
+                    # поэтому образ распаковывается один раз во временный файл, как в VromfsOverlay.
+                    self._spool = spooled_reader(self._vromfs_stream, self._reader_lock)
+                    readinto_at = self._spool.readinto_at
+                else:
+                    readinto_at = locked_reader(self._vromfs_stream, self._reader_lock)
+            self._readinto_at = readinto_at
+
+        return self._readinto_at
+
+    def open(self, item: Item) -> VromfsFileReader:
+        """
+        Поток только для чтения содержимого файла с произвольным доступом.
+        Данные не копируются: поток читает из буфера образа в памяти, по дескриптору файла
+        или перемещением по источнику под общей блокировкой образа. Образ сжатого контейнера распаковывается
+        один раз во временный файл при первом чтении и читается из него.
+        Образ должен оставаться открытым, пока используется поток.
+
+        :param item: Объект файла в образе.
+        :raises TypeError: Неверный тип item.
+        :raises KeyError: Файл отсутствует в образе.
+        :raises VromfsUnpackError: Ошибка при построении пространства имен.
+        """
+
+        if not isinstance(item, FileInfo):
+            item = self.get_info(item)
+
+        return VromfsFileReader(self._get_readinto_at(), item)
+
     @staticmethod
     def _validated_path(path: Optional[os.PathLike]) -> Path:
         """
@@ -469,26 +701,24 @@ class VromfsFile(IOBase):
         if items is None:
             infos = self.info_map.values()
         else:
-            infos_ = []
+            info_map = self.info_map
+            infos_ = {}
             for item in items:
-                if isinstance(item, FileInfo):
-                    item = item.path
-                try:
-                    info = self.get_info(item)
-                except KeyError:
+                info = info_map.lookup(item.name if isinstance(item, FileInfo) else item)
+                if info is None:
                     if absent is not None:
-                        absent.append(item)
+                        absent.append(item.path if isinstance(item, FileInfo) else item)
                 else:
-                    infos_.append(info)
+                    infos_[info.name] = info
 
-            names_ = set(map(lambda i: i.path, infos_))
-            infos = map(self.info_map.__getitem__, filter(names_.__contains__, self.info_map))
+            # Повторы исключаются, порядок смещений восстанавливается сортировкой найденных объектов.
+            infos = sorted(infos_.values(), key=attrgetter('offset'))
 
         return infos
 
     def unpack_iter(self, items: Optional[Iterable[Item]] = None, path: Optional[os.PathLike] = None,
-                    out_format: Format = Format.RAW, is_sorted: bool = False, is_minified: bool = False
-                    ) -> Iterator[ExtractResult]:
+                    out_format: Optional['Format'] = None, is_sorted: bool = False, is_minified: bool = False,
+                    with_metrics: bool = False) -> Iterator[ExtractResult]:
         """
         Распаковка группы файлов с заданным типом результата.
         Если path задан как None, принимается путь текущей директории.
@@ -496,9 +726,10 @@ class VromfsFile(IOBase):
 
         :param path: Путь выходной директории.
         :param items: Объекты файлов для распаковки.
-        :param out_format: Формат выходных данных.
+        :param out_format: Формат выходных данных. None - как есть.
         :param is_sorted: Сортировать ключи для JSON.
         :param is_minified: Минифицировать JSON.
+        :param with_metrics: Заполнять ExtractResult.metrics временем и размерами по файлу.
         :returns: Итератор ExtractResult, результат преобразования.
         :raises VromfsUnpackError: Ошибка при построении пространства имен.
         :raises TypeError: Неверный тип path.
@@ -513,14 +744,15 @@ class VromfsFile(IOBase):
             yield ExtractResult(p, KeyError('Нет FileInfo, содержащего путь {!r}'.format(str(p))))
 
         for info in infos:
+            metrics = FileMetrics() if with_metrics else None
             try:
-                self._unpack_item(info, path, out_format, is_sorted, is_minified)
+                self._unpack_item(info, path, out_format, is_sorted, is_minified, metrics)
             except Exception as e:
-                yield ExtractResult(info.path, e)
+                yield ExtractResult(info.path, e, metrics)
             else:
-                yield ExtractResult(info.path, None)
+                yield ExtractResult(info.path, None, metrics)
 
-    def unpack(self, item: Item, path: Optional[os.PathLike] = None, out_format: Format = Format.RAW
+    def unpack(self, item: Item, path: Optional[os.PathLike] = None, out_format: Optional['Format'] = None
                ) -> ExtractResult:
         """
         Распаковка одного файла с заданным типом результата.
@@ -528,7 +760,7 @@ class VromfsFile(IOBase):
 
         :param path: Путь выходной директории.
         :param item: Объект файла для распаковки.
-        :param out_format: Формат выходных данных.
+        :param out_format: Формат выходных данных. None - как есть.
         :returns: ExtractResult, результат преобразования.
         :raises VromfsUnpackError: Ошибка при построении пространства имен.
         :raises TypeError: Неверный тип path.
@@ -562,52 +794,104 @@ class VromfsFile(IOBase):
         return None
 
     def digests_table(self, items: Optional[Iterable[Item]] = None,
-                      absent: MutableSequence[Path] = None) -> Mapping[Path, bytes]:
+                      absent: MutableSequence[Path] = None, jobs: int = 1) -> Mapping[Path, bytes]:
         """
         Таблица ``{внутреннее имя файла => SHA1 дайджест содержимого}``.
 
+        :param jobs: Число потоков для вычисления дайджестов, если образ не содержит таблицы дайджестов.
+
+        :raises VromfsUnpackError: Ошибка при построении пространства имен.
+        :raises ct.ConstructError: Ошибка при чтении блока данных файла.
+        """
+
+        return {fd.info.path: fd.digest for fd in self.digests_iter(items, absent, jobs)}
+
+    def digests_iter(self, items: Optional[Iterable[Item]] = None,
+                     absent: MutableSequence[Path] = None, jobs: int = 1) -> Iterator[FileDigest]:
+        """
+        Итератор SHA1 дайджестов содержимого в порядке возрастания смещений.
+        Дайджест выдается, как только становится известен, что позволяет выводить результаты потоком.
+        Absent заполняется до выдачи первого дайджеста.
+        Если jobs больше 1, данные файлов читаются последовательно, а дайджесты вычисляются пулом потоков;
+        в памяти удерживаются данные не более 2*jobs файлов.
+
+        :param jobs: Число потоков для вычисления дайджестов, если образ не содержит таблицы дайджестов.
         :raises VromfsUnpackError: Ошибка при построении пространства имен.
         :raises ct.ConstructError: Ошибка при чтении блока данных файла.
         """
 
-        table = {}
-        for info in self._sorted_infos(items, absent):
+        infos = self._sorted_infos(items, absent)
+        if jobs > 1:
+            yield from self._digests_iter_parallel(infos, jobs)
+            return
+
+        for info in infos:
             if info.digest is None:
                 m = sha1()
                 reader = RangedReader(self._vromfs_stream, info.offset, info.size)
-                file_apply(reader, m.update, info.size)
-                digest = m.digest()
+                head = reader.read(1)
+                m.update(head)
+                file_apply(reader, m.update, info.size - len(head))
+                yield FileDigest(info, m.digest(), head)
             else:
-                digest = info.digest
+                yield FileDigest(info, info.digest, None)
+
+    def _digests_iter_parallel(self, infos: Iterable[FileInfo], jobs: int) -> Iterator[FileDigest]:
+        window = 2 * jobs
+        pending = deque()
+        with ThreadPoolExecutor(jobs) as executor:
+            for info in infos:
+                if info.digest is None:
+                    stream = BytesIO()
+                    self._unpack_info_into_raw(info, stream)
+                    data = stream.getbuffer()
+                    pending.append((info, executor.submit(lambda d: sha1(d).digest(), data), bytes(data[:1])))
+                else:
+                    pending.append((info, None, None))
+
+                while len(pending) > window:
+                    yield self._resolve_digest(*pending.popleft())
 
-            table[info.path] = digest
+            while pending:
+                yield self._resolve_digest(*pending.popleft())
 
-        return table
+    @staticmethod
+    def _resolve_digest(info: FileInfo, future: Optional[Future], head: Optional[bytes]) -> FileDigest:
+        return FileDigest(info, info.digest if future is None else future.result(), head)
 
     @classmethod
     def pack_into(cls, source: os.PathLike, ostream: Optional[IOBase] = None,
-                  extended: bool = False, checked: bool = False) -> IOBase:
+                  extended: bool = False, checked: bool = False, jobs: int = 4, dedup: bool = False,
+                  report: Optional['PackReport'] = None, layout: Optional['Layout'] = None) -> IOBase:
         """
         **Для подготовки тестовых данных.**
 
         Упаковка дерева, заданного путем директории source в двоичный поток ostream, открытый для записи.
+        Файлы читаются и хешируются пулом из jobs потоков, в памяти удерживаются данные не более 2*jobs файлов
+        размером до 1 MiB, большие файлы копируются блоками.
 
         :param source: Путь входной директории.
         :param ostream: Выходной поток.
         :param extended: Образ содержит заголовок с указателем на таблицу дайджестов.
         :param checked: Содержимое доступно для проверки.
+        :param jobs: Число потоков для чтения файлов.
+        :param dedup: Файлы с одинаковым содержимым ссылаются на один блок данных.
+        :param report: Сводка упаковки, заполняется при упаковке.
+        :param layout: Порядок размещения данных файлов. По умолчанию Layout.PATH.
         :return:
-        :raises TypeError: Неверный тип source. Неверный тип ostream. Checked и не extended.
-        :raises VromfsPackError: Ошибка при записи.
+        :raises TypeError: Неверный тип source. Неверный тип ostream. Неверный тип layout. Checked и не extended.
+        :raises ValueError: Jobs меньше 1.
+        :raises VromfsPackError: Source не содержит файлов. Ошибка при записи.
         """
 
+        from .layout import Layout, order_files
+        from .packer import scan_tree, write_image
+
         if not isinstance(source, os.PathLike):
             raise TypeError('root: ожидался PathLike: {}'.format(type(source)))
-        if not isinstance(source, Path):
-            source = Path(source)
 
         try:
-            rpaths = list(map(lambda p: p.relative_to(source), filter(Path.is_file, source.rglob('*'))))
+            files = scan_tree(os.fspath(source))
         except NotADirectoryError:
             raise TypeError('source: ожидалась директория.')
 
@@ -618,113 +902,85 @@ class VromfsFile(IOBase):
 
         if checked and not extended:
             raise TypeError('Наличие дайджестов предполагает дополнительный заголовок.')
+        if jobs < 1:
+            raise ValueError('jobs: ожидалось положительное число: {}'.format(jobs))
 
-        rpaths.sort()
-
-        count = len(rpaths)
-        try:
-            i = rpaths.index(Path('nm'))
-        except ValueError:
-            pass
-        else:
-            if i != count - 1:
-                rpaths.append(rpaths.pop(i))
-
-        try:
-            names_info_offset = 0x30 if extended else 0x20
-            names_header_con = ct.Aligned(16, ct.Struct(
-                'offset' / ct.Int32ul,
-                'count' / ct.Int32ul,
-            ))
-            names_header_con.build_stream(dict(offset=names_info_offset, count=count), ostream)
-
-            data_header_offset = 0x10
-            if extended:
-                digests_header_offset = 0x20
-
-            names_info_con = ct.Aligned(16, ct.Int64ul[count])
-            names_data_offset = names_info_offset + names_info_con.sizeof()
-
-            ct.stream_seek(ostream, names_data_offset)
-            offsets = []
-            names_data_con = ct.Aligned(16, NamesData(offsets))
-            names_data_con.build_stream(rpaths, ostream)
-            data_info_offset = ct.stream_tell(ostream)
-
-            ct.stream_seek(ostream, data_header_offset)
-            data_header_con = ct.Aligned(16, ct.Struct(
-                'offset' / ct.Int32ul,
-                'count' / ct.Int32ul,
-            ))
-            data_header_con.build_stream(dict(offset=data_info_offset, count=count), ostream)
-
-            ct.stream_seek(ostream, names_info_offset)
-            names_info_con.build_stream(offsets, ostream)
-
-            data_info_con = ct.Aligned(16, ct.Aligned(16, ct.Struct(
-                'offset' / ct.Int32ul,
-                'size' / ct.Int32ul,
-            ))[count])
-
-            if checked:
-                digest_size = 20
-                digests_data_con = ct.Aligned(16, ct.Bytes(digest_size)[count])
-                digests_data_offset = data_info_offset + data_info_con.sizeof()
-                data_offset = digests_data_offset + digests_data_con.sizeof()
-                digests_data = []
-            else:
-                data_offset = data_info_offset + data_info_con.sizeof()
-        except ct.ConstructError as e:
-            raise VromfsPackError('Ошибка при формировании метаданных: секция имен.') from e
-
-        try:
-            ct.stream_seek(ostream, data_offset)
-            data_info = []
-
-            for rpath in rpaths:
-                path = source / rpath
-                size = path.stat().st_size
-                offset = ct.stream_tell(ostream)
-                data_info.append(dict(offset=offset, size=size))
-                with open(path, 'rb') as istream:
-                    bs = ct.stream_read(istream, size)
-                if checked:
-                    digest = sha1(bs).digest()
-                    digests_data.append(digest)
-                datum_con = ct.Aligned(16, ct.Bytes(size))
-                datum_con.build_stream(bs, ostream)
-        except ct.ConstructError as e:
-            raise VromfsPackError('Ошибка при формировании блока данных') from e
+        if layout is not None and layout is not Layout.PATH:
+            files = order_files(files, layout, jobs)
+        write_image(files, ostream, extended, checked, jobs, dedup=dedup, report=report)
+        return ostream
 
-        try:
-            ct.stream_seek(ostream, data_info_offset)
-            data_info_con.build_stream(data_info, ostream)
+    def update_into(self, files: Optional[Mapping[str, os.PathLike]] = None, remove: Iterable[str] = (),
+                    ostream: Optional[IOBase] = None, jobs: int = 4, report: Optional['PackReport'] = None) -> IOBase:
+        """
+        Запись в двоичный поток ostream, открытый для записи, образа с замененными, добавленными и удаленными файлами.
+        Данные остальных файлов копируются из образа без повторного хеширования: дайджесты берутся из таблицы
+        дайджестов. Заменяемые файлы остаются на своих местах, добавленные вставляются по внутренним путям,
+        общая таблица имен ``nm`` остается последней. Заголовки образа сохраняются.
+        Ostream будет создан в памяти, если задан как None. Ostream не должен совпадать с источником образа.
 
-            if checked:
-                ct.stream_seek(ostream, digests_data_offset)
-                digests_data_con.build_stream(digests_data, ostream)
+        :param files: Отображение ``{внутренний путь => путь файла}``. Существующие файлы заменяются, новые добавляются.
+        :param remove: Внутренние пути удаляемых файлов.
+        :param ostream: Выходной поток.
+        :param jobs: Число потоков для чтения файлов.
+        :param report: Сводка упаковки, заполняется при записи.
+        :return: Выходной поток.
+        :raises TypeError: Неверный тип ostream.
+        :raises ValueError: Jobs меньше 1. Путь одновременно заменяется и удаляется.
+        :raises KeyError: Удаляемый файл отсутствует в образе.
+        :raises VromfsUnpackError: Ошибка при построении пространства имен.
+        :raises VromfsPackError: Ошибка при записи.
+        :raises EnvironmentError: Ошибка чтения файла или записи образа.
+        """
 
-            if extended:
-                if checked:
-                    begin, end = digests_data_offset, digests_data_offset + digest_size*count
-                else:
-                    begin, end = 0, data_offset
-                ct.stream_seek(ostream, digests_header_offset)
-                digests_header_con = ct.Aligned(16, ct.Struct(
-                    'end' / ct.Int64ul,
-                    'begin' / ct.Int16ul,
-                ))
-                digests_header_con.build_stream(dict(end=end, begin=begin), ostream)
-
-            ct.stream_seek(ostream, 0, SEEK_END)
-        except ct.ConstructError as e:
-            raise VromfsPackError('Ошибка при формировании метаданных: секции адресов и дайджестов.') from e
+        from .packer import SourceFile, write_image
 
+        if ostream is None:
+            ostream = BytesIO()
+        elif not isinstance(ostream, IOBase) or not ostream.writable():
+            raise TypeError('ostream: ожидалось None | Binary Writer: {}'.format(type(ostream)))
+        if jobs < 1:
+            raise ValueError('jobs: ожидалось положительное число: {}'.format(jobs))
+
+        files = {Path(name).as_posix(): os.fspath(path) for name, path in (files or {}).items()}
+        removed = set()
+        for name in remove:
+            info = self.get_info(name)
+            if info.name in files:
+                raise ValueError('Файл одновременно заменяется и удаляется: {}'.format(info.name))
+            removed.add(info.name)
+
+        def path_key(entry: Union[SourceFile, FileInfo]) -> List[str]:
+            return entry.name.split('/')
+
+        entries: List[Union[SourceFile, FileInfo]] = []
+        nm = []
+        for info in self.info_list:
+            if info.name in removed:
+                continue
+            entry = SourceFile(info.name, files.pop(info.name)) if info.name in files else info
+            (nm if info.name == 'nm' else entries).append(entry)
+
+        keys = [path_key(entry) for entry in entries]
+        for name in sorted(files, key=lambda n: n.split('/')):
+            entry = SourceFile(name, files[name])
+            if name == 'nm':
+                nm.append(entry)
+                continue
+            key = path_key(entry)
+            i = bisect_right(keys, key)
+            keys.insert(i, key)
+            entries.insert(i, entry)
+
+        header = self.header
+        write_image(entries + nm, ostream, header.extended, header.checked, jobs, report=report,
+                    source=self._get_readinto_at())
         return ostream
 
     @classmethod
     def pack(cls, source: os.PathLike, target: os.PathLike,
-             extended: bool = False, checked: bool = False):
+             extended: bool = False, checked: bool = False, jobs: int = 4, dedup: bool = False,
+             report: Optional['PackReport'] = None, layout: Optional['Layout'] = None):
         """
         **Для подготовки тестовых данных.**
 
@@ -734,7 +990,12 @@ class VromfsFile(IOBase):
         :param target: Выходной поток.
         :param extended: Образ содержит заголовок с указателем на таблицу дайджестов.
         :param checked: Содержимое доступно для проверки.
-        :raises TypeError: Неверный тип source. Неверный тип target. Checked и не extended.
+        :param jobs: Число потоков для чтения файлов.
+        :param dedup: Файлы с одинаковым содержимым ссылаются на один блок данных.
+        :param report: Сводка упаковки, заполняется при упаковке.
+        :param layout: Порядок размещения данных файлов. По умолчанию Layout.PATH.
+        :raises TypeError: Неверный тип source. Неверный тип target. Неверный тип layout. Checked и не extended.
+        :raises ValueError: Jobs меньше 1.
         :raises VromfsPackError: Ошибка при записи.
         :raises EnvironmentError: Ошибка при открытии target.
         """
@@ -743,4 +1004,4 @@ class VromfsFile(IOBase):
             raise TypeError('target: ожидался PathLike: {}'.format(type(target)))
 
         with open(target, 'wb') as ostream:
-            cls.pack_into(source, ostream, extended, checked)
+            cls.pack_into(source, ostream, extended, checked, jobs, dedup, report, layout)
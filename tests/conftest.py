@@ -29,6 +29,19 @@ def pytest_addoption(parser):
     for m in binrespath, buildpath, cdkpath, wtpath, enpath:
         parser.addini(**m)
 
+    parser.addoption('--bench', action='store_true', default=False,
+                     help='Запустить тесты производительности, отмеченные bench.')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--bench'):
+        return
+
+    skip = pytest.mark.skip(reason='Тест производительности, запускается с --bench.')
+    for item in items:
+        if 'bench' in item.keywords:
+            item.add_marker(skip)
+
 
 @pytest.fixture(scope='session')
 def binrespath(pytestconfig):
@@ -0,0 +1,37 @@
+import io
+from vromfs.bin import BinFile
+from vromfs.stats import IOStats
+
+
+def test_stats_disabled(vrfx_pc_zstd_obfs_bin_bytes):
+    file = BinFile(io.BytesIO(vrfx_pc_zstd_obfs_bin_bytes))
+    assert file.stats is None
+    file.read()
+
+
+def test_stats_compressed(vrfx_pc_zstd_obfs_bin_bytes, data):
+    stats = IOStats()
+    file = BinFile(io.BytesIO(vrfx_pc_zstd_obfs_bin_bytes), stats)
+    assert file.read(10) == data[:10]
+    file.seek(0)
+    assert file.read() == data
+    assert list(stats) == ['ranged', 'obfs', 'zstd']
+    zstd_stats = stats['zstd']
+    assert zstd_stats.resets == 2
+    assert zstd_stats.read_bytes == 10 + len(data)
+    assert stats['ranged'].read_bytes == stats['obfs'].read_bytes > 0
+    assert zstd_stats.time > 0
+
+
+def test_stats_plain(vrfs_pc_plain_bin_bytes, data):
+    stats = IOStats()
+    file = BinFile(io.BytesIO(vrfs_pc_plain_bin_bytes), stats)
+    file.seek(5)
+    file.seek(1)
+    assert file.read() == data[1:]
+    ranged_stats = stats['ranged']
+    assert ranged_stats.seeks == 2
+    assert ranged_stats.backward_seeks == 1
+    assert ranged_stats.reads == 1
+    assert ranged_stats.read_bytes == len(data) - 1
+    assert 'zstd' not in stats
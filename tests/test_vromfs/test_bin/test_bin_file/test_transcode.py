@@ -0,0 +1,115 @@
+import io
+import pytest
+from vromfs.bin import BinFile, PackType
+from vromfs.obfs_reader import ObfsWriter, obfuscate
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+sources = ['vrfs_pc_plain_bin_bytes', 'vrfx_pc_zstd_obfs_bin_bytes', 'vrfs_pc_zstd_obfs_nocheck_bin_bytes']
+
+
+@pytest.mark.parametrize('size', [0, 15, 16, 31, 32, 33, 63, 64, 65, 100, 1000])
+def test_obfs_writer(size):
+    data = bytes(range(256)) * 4
+    data = data[:size]
+    ostream = io.BytesIO()
+    writer = ObfsWriter(ostream)
+    for i in range(0, size, 7):
+        writer.write(data[i:i+7])
+    writer.close()
+    assert writer.size == size
+    assert ostream.getvalue() == obfuscate(data)
+
+
+@pytest.mark.parametrize('source', sources)
+@pytest.mark.parametrize('pack_type', list(PackType))
+def test_transcode(source, pack_type, data, request):
+    bin_file = BinFile(io.BytesIO(request.getfixturevalue(source)))
+    ostream = bin_file.transcode(pack_type)
+    compressed = pack_type is not PackType.PLAIN
+    checked = pack_type is not PackType.ZSTD_OBFS_NOCHECK
+    expected = BinFile.pack_into(io.BytesIO(data), None, bin_file.platform, bin_file.version,
+                                 compressed, checked, len(data))
+    assert ostream.getvalue() == expected.getvalue()
+
+    ostream.seek(0)
+    transcoded = BinFile(ostream)
+    assert transcoded.pack_type is pack_type
+    assert transcoded.version == bin_file.version
+    assert transcoded.stream.read() == data
+
+
+def test_transcode_extra(vrfs_pc_plain_bin_bytes, data):
+    extra = bytes(range(256))
+    bin_file = BinFile(io.BytesIO(vrfs_pc_plain_bin_bytes + extra))
+    ostream = bin_file.transcode(PackType.ZSTD_OBFS, level=19)
+    ostream.seek(0)
+    transcoded = BinFile(ostream)
+    assert transcoded.meta.extra == extra
+    assert transcoded.check()
+
+
+@pytest.mark.parametrize('pack_type', list(PackType))
+def test_transcode_digest_mismatch(vrfs_pc_plain_bin_bytes, pack_type):
+    from vromfs.bin import BinUnpackError
+
+    corrupted = bytearray(vrfs_pc_plain_bin_bytes)
+    corrupted[20] ^= 1
+    prefix = b'prefix'
+    ostream = io.BytesIO()
+    ostream.write(prefix)
+    with pytest.raises(BinUnpackError):
+        BinFile(io.BytesIO(bytes(corrupted))).transcode(pack_type, ostream)
+    assert ostream.getvalue() == prefix
+
+
+def test_transcoder_digest_mismatch(vrfs_pc_plain_bin_bytes, tmppath, monkeypatch):
+    from vromfs.demo import vromfs_bin_transcoder
+
+    corrupted = bytearray(vrfs_pc_plain_bin_bytes)
+    corrupted[20] ^= 1
+    root = tmppath / 'corrupted'
+    root.mkdir()
+    in_path = root / 'corrupted.vromfs.bin'
+    in_path.write_bytes(bytes(corrupted))
+    out_path = root / 'out.vromfs.bin'
+
+    monkeypatch.setattr('sys.argv', ['transcoder', '-t', 'zstd_obfs', '-o', str(out_path), str(in_path)])
+    assert vromfs_bin_transcoder.main() == 1
+    assert not out_path.exists()
+
+    monkeypatch.setattr('sys.argv', ['transcoder', '-t', 'zstd_obfs', str(in_path)])
+    assert vromfs_bin_transcoder.main() == 1
+    assert in_path.read_bytes() == corrupted
+    assert [path.name for path in root.iterdir()] == [in_path.name]
+
+
+def test_transcode_type_error(vrfs_pc_plain_bin_bytes):
+    bin_file = BinFile(io.BytesIO(vrfs_pc_plain_bin_bytes))
+    with pytest.raises(TypeError):
+        bin_file.transcode(0x30)
+
+
+class PipeWriter(io.RawIOBase):
+    """Поток только для последовательной записи, как канал."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.data += b
+        return len(b)
+
+
+def test_transcode_plain_not_seekable(vrfx_pc_zstd_obfs_bin_bytes, data):
+    bin_file = BinFile(io.BytesIO(vrfx_pc_zstd_obfs_bin_bytes))
+    ostream = PipeWriter()
+    bin_file.transcode(PackType.PLAIN, ostream)
+    transcoded = BinFile(io.BytesIO(bytes(ostream.data)))
+    assert transcoded.stream.read() == data
+    with pytest.raises(TypeError):
+        bin_file.transcode(PackType.ZSTD_OBFS, PipeWriter())
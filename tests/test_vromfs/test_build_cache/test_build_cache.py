@@ -0,0 +1,85 @@
+from io import BytesIO
+import os
+from pathlib import Path
+import pytest
+from vromfs.build_cache import BuildCache, fingerprint
+from vromfs.vromfs import Layout, VromfsFile
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+options = dict(version=[1, 2, 3, 4], dedup=False)
+
+
+@pytest.fixture()
+def source(tmppath: Path, request) -> Path:
+    source = tmppath / request.node.name
+    (source / 'inner').mkdir(parents=True)
+    (source / 'inner' / 'a.txt').write_bytes(b'a' * 100)
+    (source / 'b.bin').write_bytes(bytes(range(256)) * 10)
+    (source / 'c.bin').write_bytes(bytes(range(256)) * 10)
+    return source
+
+
+def test_fingerprint(source: Path):
+    key = fingerprint(source, options)
+    assert fingerprint(source, options) == key
+    assert fingerprint(source, dict(options, dedup=True)) != key
+
+    path = source / 'inner' / 'a.txt'
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert fingerprint(source, options) != key
+
+    hashed_key = fingerprint(source, options, hashed=True, jobs=2)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert fingerprint(source, options) == key
+    assert fingerprint(source, options, hashed=True) == hashed_key
+
+    path.rename(source / 'inner' / 'd.txt')
+    assert fingerprint(source, options, hashed=True) != hashed_key
+
+
+def test_fingerprint_type_error(source: Path):
+    with pytest.raises(TypeError):
+        fingerprint(str(source), options)
+    with pytest.raises(TypeError):
+        fingerprint(source, [])
+
+
+@pytest.mark.parametrize('layout', list(Layout))
+def test_pack_deterministic(source: Path, layout: Layout):
+    images = set()
+    for jobs in (1, 4):
+        ostream = BytesIO()
+        VromfsFile.pack_into(source, ostream, jobs=jobs, dedup=True, layout=layout)
+        images.add(ostream.getvalue())
+    assert len(images) == 1
+
+
+@pytest.mark.parametrize('link', [False, True])
+def test_build_cache(tmppath: Path, link: bool):
+    root = tmppath / f'link_{link}'
+    root.mkdir()
+    cache = BuildCache(root / 'cache')
+    key = 'ab' * 20
+    built = root / 'built.bin'
+    built.write_bytes(b'container')
+    target = root / 'target.bin'
+    target.write_bytes(b'stale')
+    stale = target.stat().st_ino
+
+    assert cache.lookup(key) is None
+    assert not cache.restore(key, target, link)
+    assert target.read_bytes() == b'stale'
+
+    path = cache.store(key, built)
+    assert cache.lookup(key) == path
+    assert cache.restore(key, target, link)
+    assert target.read_bytes() == b'container'
+    assert target.stat().st_ino != stale
+    assert target.samefile(path) == link
+
+    target.unlink()
+    assert path.read_bytes() == b'container'
+    assert list(root.glob('*.tmp')) == []
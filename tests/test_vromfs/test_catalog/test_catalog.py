@@ -0,0 +1,51 @@
+from pathlib import Path
+import pytest
+from vromfs.bin import PackType
+from vromfs.catalog import Catalog
+from vromfs.corpus import CorpusSpec, generate_bin
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+
+@pytest.fixture(scope='module')
+def containers(tmppath: Path):
+    specs = [
+        (CorpusSpec(count=20, mean_size=256, depth=0, blk_share=1.0, seed=0), PackType.ZSTD_OBFS, (1, 0, 0, 1)),
+        (CorpusSpec(count=20, mean_size=256, depth=0, blk_share=1.0, seed=0), PackType.PLAIN, (1, 0, 0, 2)),
+        (CorpusSpec(count=20, mean_size=256, depth=0, blk_share=1.0, seed=1), PackType.ZSTD_OBFS_NOCHECK, (1, 0, 0, 3)),
+    ]
+    paths = []
+    for i, (spec, pack_type, version) in enumerate(specs):
+        path = tmppath / f'{i}.vromfs.bin'
+        generate_bin(path, spec, pack_type, version)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def catalog(containers):
+    with Catalog(':memory:') as catalog:
+        for path in containers:
+            assert catalog.ingest(path)
+        yield catalog
+
+
+def test_ingest_is_incremental(catalog, containers):
+    for path in containers:
+        assert not catalog.ingest(path)
+    assert [c.version for c in catalog.containers()] == [(1, 0, 0, 1), (1, 0, 0, 2), (1, 0, 0, 3)]
+
+
+def test_find(catalog, containers):
+    entries = catalog.find('file_000000.blk')
+    assert [e.container for e in entries] == [p.name for p in containers]
+    assert entries[0].md5 is not None
+    assert entries[2].md5 is None
+    assert catalog.find('nop') == []
+    assert catalog.find_digest(entries[0].sha1)[:2] == entries[:2]
+
+
+def test_history(catalog):
+    changes = catalog.history('file_000000.blk')
+    assert [e.version for e in changes] == [(1, 0, 0, 1), (1, 0, 0, 3)]
@@ -0,0 +1,49 @@
+import os
+from pathlib import Path
+import stat
+import pytest
+from vromfs.common import replace_file, write_replacing
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+
+def mode(path: Path) -> int:
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+def test_write_replacing_new_file_umask(tmppath: Path):
+    target = tmppath / 'new.bin'
+    old_mask = os.umask(0o027)
+    try:
+        write_replacing(target, lambda ostream: ostream.write(b'data'))
+    finally:
+        os.umask(old_mask)
+    assert target.read_bytes() == b'data'
+    assert mode(target) == 0o640
+
+
+def test_write_replacing_keeps_mode_and_links(tmppath: Path):
+    target = tmppath / 'old.bin'
+    target.write_bytes(b'old')
+    target.chmod(0o600)
+    link = tmppath / 'link.bin'
+    os.link(target, link)
+    write_replacing(target, lambda ostream: ostream.write(b'new'))
+    assert target.read_bytes() == b'new'
+    assert mode(target) == 0o600
+    assert link.read_bytes() == b'old'
+
+
+@pytest.mark.parametrize('error', [OSError, KeyboardInterrupt])
+def test_replace_file_cleanup(tmppath: Path, error):
+    target = tmppath / f'{error.__name__}.bin'
+
+    def make(temp: Path):
+        temp.write_bytes(b'partial')
+        raise error()
+
+    with pytest.raises(error):
+        replace_file(target, make)
+    assert not target.exists()
+    assert list(tmppath.glob(f'{target.name}*.tmp')) == []
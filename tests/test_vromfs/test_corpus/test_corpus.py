@@ -0,0 +1,69 @@
+from pathlib import Path
+import pytest
+from pytest import param as _
+from vromfs.bin import BinFile, PackType
+from vromfs.corpus import CorpusSpec, SizeDistribution, generate_bin, generate_tree
+from vromfs.vromfs import VromfsFile
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+
+def tree_bytes(root: Path):
+    return {p.relative_to(root): p.read_bytes() for p in sorted(root.rglob('*')) if p.is_file()}
+
+
+@pytest.mark.parametrize('distribution', list(SizeDistribution), ids=lambda d: d.value)
+def test_generate_tree_is_deterministic(distribution: SizeDistribution, tmppath: Path):
+    spec = CorpusSpec(count=50, mean_size=256, distribution=distribution, seed=42)
+    roots = [tmppath / f'{distribution.value}_{i}' for i in range(2)]
+    rpaths = [generate_tree(root, spec) for root in roots]
+    assert rpaths[0] == rpaths[1]
+    assert len(rpaths[0]) == spec.count
+    assert tree_bytes(roots[0]) == tree_bytes(roots[1])
+
+
+def test_generate_tree_depth(tmppath: Path):
+    spec = CorpusSpec(count=100, depth=2, mean_size=16)
+    rpaths = generate_tree(tmppath / 'depth', spec)
+    assert max(len(p.parts) for p in rpaths) <= spec.depth + 1
+
+
+def test_generate_tree_invalid_spec_raises_value_error(tmppath: Path):
+    with pytest.raises(ValueError):
+        generate_tree(tmppath / 'invalid', CorpusSpec(blk_share=2.0))
+
+
+@pytest.mark.parametrize('pack_type', list(PackType), ids=lambda p: p.name.lower())
+@pytest.mark.parametrize('version', [
+    _(None, id='vrfs'),
+    _((1, 2, 3, 4), id='vrfx'),
+])
+def test_generate_bin(pack_type: PackType, version, tmppath: Path):
+    spec = CorpusSpec(count=20, mean_size=512)
+    target = tmppath / f'{pack_type.name.lower()}_{version is None}.vromfs.bin'
+    generate_bin(target, spec, pack_type, version, extended=True, checked=True)
+    with BinFile(target) as bin_file:
+        assert bin_file.pack_type is pack_type
+        assert bin_file.version == version
+        if bin_file.checked:
+            assert bin_file.check()
+            bin_file.seek(0)
+        vromfs = VromfsFile(bin_file)
+        assert len(vromfs.info_list) == spec.count
+        assert vromfs.checked
+
+
+def test_generate_bin_with_nm_and_dict(tmppath: Path):
+    pytest.importorskip('blk')
+
+    spec = CorpusSpec(count=200, mean_size=2048, blk_share=1.0, nm=True, dictionary=True)
+    tree = tmppath / 'nm_dict'
+    target = tmppath / 'nm_dict.vromfs.bin'
+    generate_bin(target, spec, tree=tree)
+    with BinFile(target) as bin_file:
+        vromfs = VromfsFile(bin_file)
+        names = vromfs.name_list
+        assert names[-1] == Path('nm')
+        assert any(name.suffix == '.dict' for name in names)
+        assert vromfs.dctx is not None
@@ -0,0 +1,82 @@
+from io import BytesIO
+from pathlib import Path
+import random
+import pytest
+from vromfs.bin import BinFile, PlatformType
+from vromfs.delta import DeltaError, DeltaReport, apply_patch, make_patch
+from vromfs.vromfs import VromfsFile
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+
+def make_container(root: Path, contents, path: Path, compressed: bool, version) -> Path:
+    for name, content in contents.items():
+        file_path = root / name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(content)
+    image = VromfsFile.pack_into(root, extended=True, checked=True)
+    size = image.tell()
+    image.seek(0)
+    with open(path, 'wb') as ostream:
+        BinFile.pack_into(image, ostream, PlatformType.PC, version, compressed, True, size)
+    return path
+
+
+@pytest.fixture(scope='module', params=[True, False], ids=['zstd', 'plain'])
+def containers(tmppath: Path, request):
+    rnd = random.Random(1)
+    blob = bytes(rnd.randrange(256) for _ in range(200_000))
+    old = {
+        'a/config.blk': b'\x01' + b'speed:r=1.0\n' * 500,
+        'a/same.bin': blob,
+        'b/removed.txt': b'bye\n' * 100,
+        'c.txt': b'hello world\n' * 50,
+    }
+    new = dict(old)
+    del new['b/removed.txt']
+    new['a/config.blk'] = b'\x01' + b'speed:r=1.0\n' * 250 + b'speed:r=2.0\n' + b'speed:r=1.0\n' * 249
+    new['b/added.txt'] = b'new file\n' * 10
+    new['d/moved.bin'] = old['c.txt']
+    compressed = request.param
+    sub = tmppath / str(compressed)
+    return (make_container(sub / 'old', old, sub / 'old.vromfs.bin', compressed, (1, 0, 0, 0)),
+            make_container(sub / 'new', new, sub / 'new.vromfs.bin', compressed, (1, 0, 0, 1)))
+
+
+def test_make_apply_patch(containers):
+    old_path, new_path = containers
+    patch = BytesIO()
+    report = DeltaReport()
+    make_patch(old_path, new_path, patch, report=report)
+    assert report.exact
+    assert report.copied == 3
+    assert report.changed == 1
+    assert report.added == 1
+    assert report.patch_size == patch.tell()
+    assert report.patch_size < new_path.stat().st_size // 10
+
+    patch.seek(0)
+    out = BytesIO()
+    assert apply_patch(old_path, patch, out)
+    assert out.getvalue() == new_path.read_bytes()
+
+
+def test_apply_patch_errors(containers):
+    old_path, new_path = containers
+    patch = BytesIO()
+    make_patch(old_path, new_path, patch)
+
+    patch.seek(0)
+    with pytest.raises(DeltaError):
+        apply_patch(new_path, patch, BytesIO())
+
+    data = bytearray(patch.getvalue())
+    data[-50] ^= 0xff
+    with pytest.raises(DeltaError):
+        apply_patch(old_path, BytesIO(bytes(data)), BytesIO())
+
+    with pytest.raises(DeltaError):
+        apply_patch(old_path, BytesIO(b'VRFSDLT'), BytesIO())
+    with pytest.raises(TypeError):
+        apply_patch(str(old_path), BytesIO(), BytesIO())
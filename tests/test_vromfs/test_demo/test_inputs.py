@@ -0,0 +1,26 @@
+from pathlib import Path
+from vromfs.demo.vromfs_bin_unpacker import expand_inputs, output_names
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+
+def test_expand_inputs(tmppath: Path):
+    names = ['a.vromfs.bin', 'b.vromfs.bin', 'c.bin']
+    for name in names:
+        (tmppath / name).write_bytes(b'')
+
+    a, b, c = (tmppath / name for name in names)
+    assert expand_inputs([str(tmppath)]) == [a, b]
+    assert expand_inputs([str(tmppath / '*.bin')]) == [a, b, c]
+    assert expand_inputs([str(c), str(tmppath), str(a)]) == [c, a, b]
+
+
+def test_output_names(tmppath: Path):
+    a = tmppath / 'x' / 'a.vromfs.bin'
+    b = tmppath / 'y' / 'b.vromfs.bin'
+    assert output_names([a, b]) == {a: Path('a.vromfs.bin'), b: Path('b.vromfs.bin')}
+
+    c = tmppath / 'y' / 'z' / 'a.vromfs.bin'
+    assert output_names([a, b, c]) == {a: Path('x/a.vromfs.bin'), b: Path('y/b.vromfs.bin'),
+                                       c: Path('y/z/a.vromfs.bin')}
@@ -0,0 +1,57 @@
+from pathlib import Path
+import pytest
+from vromfs.bin import BinFile, PlatformType
+from vromfs.demo.profiling import Profiler
+from vromfs.demo.vromfs_bin_unpacker import Args, Session, process
+from vromfs.vromfs import VromfsFile
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+
+def make_container(tmppath: Path, name: str) -> Path:
+    tree = tmppath / (name + '_tree')
+    tree.mkdir()
+    (tree / 'a.txt').write_bytes(b'a' * 16)
+    (tree / 'b.txt').write_bytes(b'b' * 8)
+    image = tmppath / (name + '.vromfs')
+    VromfsFile.pack(tree, image)
+    target = tmppath / (name + '.vromfs.bin')
+    BinFile.pack(image, target, PlatformType.PC, None, compressed=False, checked=True)
+    return target
+
+
+def make_args(inputs, out_path: Path, **kwargs) -> Args:
+    values = dict(out_format='raw', is_sorted=False, is_minified=False, dump_files_info=False, schema='1.1',
+                  out_path=out_path, inputs=inputs, in_files=None, exit_first=False, loglevel='INFO',
+                  with_stats=False, metrics_path=None, top=10, profile_path=None, jobs=2,
+                  include=['**'], exclude=None)
+    values.update(kwargs)
+    return Args(**values)
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_container_error(tmppath: Path, monkeypatch, jobs):
+    root = tmppath / f'jobs_{jobs}'
+    root.mkdir()
+    good = make_container(root, 'good')
+    bad = make_container(root, 'bad')
+    missing = root / 'missing.vromfs.bin'
+    select = Session.select
+
+    def failing_select(session, vromfs):
+        if vromfs.name == str(bad):
+            raise ValueError('select')
+        return select(session, vromfs)
+
+    monkeypatch.setattr(Session, 'select', failing_select)
+    out_path = root / 'out'
+    args = make_args([good, bad, missing], out_path, jobs=jobs)
+    results = {result.path: result for result in Session(args, None, None, Profiler(), None, None).run()}
+
+    assert results[good].code == 0 and results[good].successful == 2
+    assert results[bad].code == 1
+    assert results[missing].code == 1
+    assert (out_path / 'good.vromfs.bin' / 'a.txt').read_bytes() == b'a' * 16
+
+    assert process(args, None, Profiler()) == 1
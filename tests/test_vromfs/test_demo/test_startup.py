@@ -0,0 +1,60 @@
+import subprocess
+import sys
+import pytest
+
+HEAVY_MODULES = ('blk', 'construct', 'zstandard', 'cProfile', 'tracemalloc')
+PACK_MODULES = ('vromfs.vromfs.packer', 'vromfs.vromfs.layout')
+
+
+@pytest.mark.parametrize('module', [
+    'vromfs.demo.vromfs_bin_unpacker',
+    'vromfs.demo.vromfs_bin_packer',
+    'vromfs.demo.vromfs_bin_updater',
+    'vromfs.demo.vromfs_bin_delta',
+    'vromfs.demo.vromfs_bin_transcoder',
+    'vromfs.bin',
+    'vromfs.bin.bin_file',
+    'vromfs.vromfs',
+])
+def test_lazy_imports(module):
+    code = ('import sys, {}; '
+            'print(",".join(m for m in {!r} if m in sys.modules))').format(module, HEAVY_MODULES)
+    out = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE, universal_newlines=True)
+    assert out.stdout.strip() == ''
+
+
+def test_constructor_names():
+    from vromfs.bin import BinContainer, BinHeader
+    from vromfs.bin.bin_file import BinContainer as BinContainer__, BinExtHeader
+    from vromfs.bin.constructor import BinExtHeader as BinExtHeader_
+    from vromfs.bin.constructor import BinContainer as BinContainer_, BinHeader as BinHeader_
+    from vromfs.vromfs import Image
+    from vromfs.vromfs.constructor import Image as Image_
+    assert BinContainer is BinContainer_
+    assert BinContainer__ is BinContainer_
+    assert BinExtHeader is BinExtHeader_
+    assert BinHeader is BinHeader_
+    assert Image is Image_
+
+
+@pytest.mark.parametrize('module', [
+    'vromfs.demo.vromfs_bin_unpacker',
+    'vromfs.demo.vromfs_bin_delta',
+    'vromfs.demo.vromfs_bin_transcoder',
+    'vromfs.vromfs',
+])
+def test_lazy_pack_imports(module):
+    code = ('import sys, {}; '
+            'print(",".join(m for m in {!r} if m in sys.modules))').format(module, PACK_MODULES)
+    out = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE, universal_newlines=True)
+    assert out.stdout.strip() == ''
+
+
+def test_pack_names():
+    from vromfs.vromfs import Layout, PackReport, order_files, scan_tree
+    from vromfs.vromfs.layout import Layout as Layout_, order_files as order_files_
+    from vromfs.vromfs.packer import PackReport as PackReport_, scan_tree as scan_tree_
+    assert Layout is Layout_
+    assert PackReport is PackReport_
+    assert order_files is order_files_
+    assert scan_tree is scan_tree_
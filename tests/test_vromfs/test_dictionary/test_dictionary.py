@@ -0,0 +1,67 @@
+from hashlib import sha256
+from pathlib import Path
+import pytest
+from zstandard import ZstdCompressionDict, ZstdCompressor
+from vromfs.bin import PackType
+from vromfs.corpus import CorpusSpec, generate_bin
+from vromfs.dictionary import (blk_payload, evaluate_dict, make_dict_path, sample_containers, sample_tree,
+                               select_samples, train_dict)
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+
+@pytest.fixture(scope='module')
+def corpus(tmppath: Path):
+    tree = tmppath / 'tree'
+    path = tmppath / 'corpus.vromfs.bin'
+    spec = CorpusSpec(count=300, mean_size=2048, blk_share=0.9, seed=5)
+    generate_bin(path, spec, PackType.ZSTD_OBFS, tree=tree)
+    return tree, path
+
+
+def test_blk_payload():
+    data = b'a:i=1\n' * 10
+    assert blk_payload(b'') is None
+    assert blk_payload(data) == data
+    assert blk_payload(b'\x01' + data) == data
+    assert blk_payload(b'\x03') is None
+    frame = ZstdCompressor().compress(data)
+    assert blk_payload(b'\x04' + frame) == data
+    assert blk_payload(b'\x02' + len(frame).to_bytes(3, 'little') + frame) == data
+    assert blk_payload(b'\x05' + b'\x00' * 8) is None
+
+
+def test_select_samples():
+    samples = [bytes([i]) * i for i in range(1, 101)]
+    selected = select_samples(samples, 10, seed=1)
+    assert len(selected) == 10
+    assert selected == select_samples(iter(samples), 10, seed=1)
+    assert select_samples(samples, 1000) == samples
+    assert sum(map(len, select_samples(samples, 1000, max_size=500))) <= 500
+    with pytest.raises(ValueError):
+        select_samples(samples, 0)
+
+
+def test_sample_containers(corpus):
+    tree, path = corpus
+    assert sorted(sample_containers([path])) == sorted(sample_tree(tree))
+
+
+def test_train_dict(corpus):
+    tree, _ = corpus
+    samples = select_samples(sample_tree(tree), 1000)
+    dict_ = train_dict(samples, 8 * 2 ** 10)
+    assert isinstance(dict_, ZstdCompressionDict)
+    dict_data = dict_.as_bytes()
+    assert make_dict_path(dict_data) == Path(sha256(dict_data).hexdigest() + '.dict')
+
+    report = evaluate_dict(dict_data, samples)
+    assert report.samples == len(samples)
+    assert report.size == sum(map(len, samples))
+    assert report.dict_ratio > report.plain_ratio
+
+
+def test_train_dict_error():
+    with pytest.raises(ValueError):
+        train_dict([b'x'], 8 * 2 ** 10)
@@ -0,0 +1,149 @@
+from io import BytesIO
+from time import perf_counter
+import tracemalloc
+import pytest
+import zstandard as zstd
+from vromfs.files.errors import ComposeError, SerializeError
+from vromfs.files.shared_names import (HEADER_SIZE, InvNamesMap, SharedNames, compress_shared_names,
+                                       decode_shared_names, serialize_shared_names)
+
+
+def make_names(count: int):
+    return [f'name_{i}_' + 'x' * (i % 17) for i in range(count)]
+
+
+def make_table(names, cctx: zstd.ZstdCompressor) -> BytesIO:
+    stream = BytesIO()
+    serialize_shared_names(InvNamesMap.of(names), stream, cctx, None)
+    stream.seek(0)
+    return stream
+
+
+def names_layout(names) -> bytes:
+    """Ожидаемые данные таблицы: число имен и размер блока в LEB128, имена, завершенные нулем."""
+
+    block = b''.join(name.encode('utf8') + b'\x00' for name in names)
+    assert len(names) < 0x80 and 0x80 <= len(block) < 0x4000
+    return bytes([len(names), len(block) & 0x7f | 0x80, len(block) >> 7]) + block
+
+
+def test_serialize_shared_names_layout():
+    pytest.importorskip('blk')
+
+    names = make_names(20) + ['юникод']
+    expected = names_layout(names)
+    names_bs = zstd.ZstdDecompressor().decompressobj().decompress(
+        make_table(names, zstd.ZstdCompressor()).getvalue()[HEADER_SIZE:])
+    assert names_bs == expected
+    shared_names = SharedNames(names_bs)
+    assert [shared_names.raw(i).decode('utf8') for i in range(len(shared_names))] == names
+    assert SharedNames.of(names).names_bs == expected
+
+
+def test_shared_names_of():
+    names = make_names(20) + ['юникод']
+    shared_names = SharedNames.of(names)
+    assert shared_names.names_bs == names_layout(names)
+    assert shared_names.raw(len(names) - 1) == 'юникод'.encode('utf8')
+    assert SharedNames.of([]).names_bs == b'\x00\x00'
+    assert len(SharedNames.of([])) == 0
+    with pytest.raises(SerializeError):
+        SharedNames.of(['a\x00b'])
+
+    stream = BytesIO()
+    serialize_shared_names(shared_names, stream, zstd.ZstdCompressor(), None)
+    stream.seek(0)
+    assert decode_shared_names(stream, zstd.ZstdDecompressor()).names_bs == shared_names.names_bs
+
+
+def test_decode_shared_names():
+    pytest.importorskip('blk')
+
+    names = make_names(100) + ['юникод']
+    shared_names = decode_shared_names(make_table(names, zstd.ZstdCompressor()), zstd.ZstdDecompressor())
+    assert len(shared_names) == len(names)
+    assert list(shared_names) == names
+    assert shared_names[-1] == names[-1]
+    assert shared_names.raw(0) == b'name_0_'
+    assert shared_names.index(names[50]) == 50
+    assert shared_names.inv_names_map() == InvNamesMap.of(names)
+
+
+def test_decode_shared_names_uncapped():
+    """Таблица больше 5 MiB, кадр без размера содержимого."""
+
+    pytest.importorskip('blk')
+    names = make_names(400_000)
+    cctx = zstd.ZstdCompressor(write_content_size=False)
+    shared_names = decode_shared_names(make_table(names, cctx), zstd.ZstdDecompressor())
+    assert len(shared_names.names_bs) > 5 * 2 ** 20
+    assert len(shared_names) == len(names)
+    assert shared_names[-1] == names[-1]
+
+
+def test_serialize_shared_names_compact():
+    pytest.importorskip('blk')
+
+    names = make_names(100)
+    istream = make_table(names, zstd.ZstdCompressor())
+    shared_names = decode_shared_names(istream, zstd.ZstdDecompressor())
+    ostream = BytesIO()
+    serialize_shared_names(shared_names, ostream, zstd.ZstdCompressor(), None)
+    assert ostream.getvalue() == istream.getvalue()
+    assert shared_names._inv_names_map is None
+
+
+def test_shared_names_errors():
+    names_bs = SharedNames.of(make_names(10)).names_bs
+    with pytest.raises(ComposeError):
+        SharedNames(names_bs[:-1])
+    with pytest.raises(ComposeError):
+        SharedNames(names_bs[:1])
+    with pytest.raises(ComposeError):
+        decode_shared_names(BytesIO(b'\x00' * 10), zstd.ZstdDecompressor())
+
+
+def test_shared_names_not_utf8():
+    pytest.importorskip('blk')
+
+    shared_names = SharedNames(b'\x02\x05ok\x00\xff\x00')
+    assert shared_names[0] == 'ok'
+    with pytest.raises(ComposeError):
+        shared_names[1]
+    with pytest.raises(ComposeError):
+        shared_names.inv_names_map()
+
+
+def measure(f):
+    tracemalloc.start()
+    t = perf_counter()
+    result = f()
+    elapsed = perf_counter() - t
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, size, peak
+
+
+@pytest.mark.bench
+def test_bench_shared_names():
+    pytest.importorskip('blk')
+    from blk.binary.constructor import Names
+
+    names = make_names(200_000)
+    stream = BytesIO()
+    compress_shared_names(Names.build(names), stream, zstd.ZstdCompressor(), None)
+    dctx = zstd.ZstdDecompressor()
+
+    def construct_map():
+        stream.seek(40)
+        return InvNamesMap.of(Names.parse(dctx.decompress(stream.read())))
+
+    def compact():
+        stream.seek(0)
+        return decode_shared_names(stream, dctx)
+
+    print()
+    for label, f in ('construct', construct_map), ('compact', compact), \
+                    ('compact+map', lambda: compact().inv_names_map()):
+        _, elapsed, size, peak = measure(f)
+        print(f'{label:<12} load {elapsed:.3f}s, size {size / 2 ** 20:.1f} MiB, peak {peak / 2 ** 20:.1f} MiB')
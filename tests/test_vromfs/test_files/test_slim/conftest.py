@@ -0,0 +1,49 @@
+import pytest
+import zstandard as zstd
+
+
+@pytest.fixture(scope='session')
+def fat_blk_bytes():
+    """
+    a:i=1; s:t="hello"; n:t="a" (индекс имени)
+    child { b:r=1.5; p:p2=1, 2 }
+    child { b:r=2 }
+    """
+
+    return bytes.fromhex(
+        '01'  # FAT
+        '06 10 6100 7300 6e00 6368696c6400 6200 7000'  # names: a s n child b p
+        '03 06'  # blocks_count, params_count
+        '0e 68656c6c6f00 0000803f 00000040'  # params_data: "hello", 1.0, 2.0
+        '000000 02 01000000'  # a:i = 1
+        '010000 01 00000000'  # s:t = params_data[0]
+        '020000 01 00000080'  # n:t = names[0]
+        '040000 03 0000c03f'  # b:r = 1.5
+        '050000 04 06000000'  # p:p2 = params_data[6]
+        '040000 03 00000040'  # b:r = 2.0
+        '00 03 02 01'  # root
+        '04 02 00'  # child
+        '04 01 00'  # child
+    )
+
+
+@pytest.fixture(scope='session')
+def other_fat_blk_bytes():
+    """x:i=5; child { a:t="child" (индекс имени) }"""
+
+    return bytes.fromhex(
+        '01'  # FAT
+        '03 0a 6368696c6400 7800 6100'  # names: child x a
+        '02 02'  # blocks_count, params_count
+        '00'  # params_data
+        '010000 02 05000000'  # x:i = 5
+        '020000 01 00000080'  # a:t = names[0]
+        '00 01 01 01'  # root
+        '01 01 00'  # child
+    )
+
+
+@pytest.fixture(scope='session')
+def fat_zst_blk_bytes(other_fat_blk_bytes):
+    frame = zstd.ZstdCompressor().compress(other_fat_blk_bytes[1:])
+    return b'\x02' + len(frame).to_bytes(3, 'little') + frame
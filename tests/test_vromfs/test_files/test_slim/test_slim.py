@@ -0,0 +1,165 @@
+from collections import Counter
+from pathlib import Path
+from typing import Optional, Sequence
+import pytest
+import zstandard as zstd
+from vromfs.files.constructor import NAME_ID_FLAG, STRING_TYPE, BlkData
+from vromfs.files.errors import ComposeError
+from vromfs.files.shared_names import decode_shared_names
+from vromfs.files.slim_packer import SLIM_ZST, SLIM_ZST_DICT, SlimReport, order_names, prepare_slim_tree
+from vromfs.vromfs import VromfsFile
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+
+def test_order_names():
+    counters = [Counter({'a': 1, 'b': 2}), Counter({'c': 3, 'a': 1}), Counter({'d': 1})]
+    assert order_names(counters) == ['c', 'a', 'b', 'd']
+    assert order_names([]) == []
+
+
+def test_prepare_slim_tree_type_error(tmppath: Path):
+    with pytest.raises(TypeError):
+        prepare_slim_tree(str(tmppath), tmppath)
+
+
+def test_prepare_slim_tree_plain(tmppath: Path):
+    pytest.importorskip('blk')
+
+    source = tmppath / 'source'
+    target = tmppath / 'target'
+    (source / 'inner').mkdir(parents=True)
+    (source / 'inner' / 'a.txt').write_bytes(b'a' * 100)
+    (source / 'b.blk').write_bytes(b'b:i=1\n')
+    target.mkdir()
+
+    report = SlimReport()
+    rpaths = prepare_slim_tree(source, target, report=report)
+    assert sorted(rpaths) == [Path('b.blk'), Path('inner/a.txt'), Path('nm')]
+    assert (target / 'inner' / 'a.txt').read_bytes() == b'a' * 100
+    assert (target / 'b.blk').read_bytes() == b'b:i=1\n'
+    assert (target / 'nm').is_file()
+    assert report.files == 2
+    assert report.converted == 0
+    assert report.names == 0
+    assert report.dict_path is None
+
+    with pytest.raises(ValueError):
+        prepare_slim_tree(target, tmppath / 'again')
+
+
+def resolve(data: bytes, shared: Sequence[str] = ()):
+    """Таблицы блока с именами и строками вместо индексов и смещений."""
+
+    blk_data = BlkData.parse(data)
+    names = list(shared) + [name.decode('utf8') for name in blk_data.names]
+
+    def value(param):
+        if param.type != STRING_TYPE:
+            return param.value
+        if param.value & NAME_ID_FLAG:
+            return names[param.value & ~NAME_ID_FLAG]
+        return blk_data.params_data[param.value:].split(b'\x00', 1)[0].decode('utf8')
+
+    params = [(names[p.name_id], p.type, value(p)) for p in blk_data.params]
+    blocks = [(names[b.name_id - 1] if b.name_id else None, b.params_count, b.blocks_count, b.first_block_id)
+              for b in blk_data.blocks]
+    return params, blocks, blk_data.params_data
+
+
+def make_source(tmppath: Path, fat_blk_bytes: bytes, fat_zst_blk_bytes: bytes) -> Path:
+    source = tmppath / 'source'
+    (source / 'sub').mkdir(parents=True)
+    (source / 'a.blk').write_bytes(fat_blk_bytes)
+    (source / 'sub' / 'b.blk').write_bytes(fat_zst_blk_bytes)
+    (source / 'c.txt').write_bytes(b'c' * 100)
+    (source / 'd.blk').write_bytes(b'd:i=1\n')
+    return source
+
+
+DICT_DATA = b'child\x00hello\x00' * 64
+
+
+@pytest.mark.parametrize('dict_data', [
+    pytest.param(None, id='slim_zst'),
+    pytest.param(DICT_DATA, id='slim_zst_dict'),
+])
+def test_prepare_slim_tree_roundtrip(dict_data: Optional[bytes], fat_blk_bytes: bytes, other_fat_blk_bytes: bytes,
+                                     fat_zst_blk_bytes: bytes, tmppath: Path):
+    sub = tmppath / ('dict' if dict_data else 'plain')
+    source = make_source(sub, fat_blk_bytes, fat_zst_blk_bytes)
+    target = sub / 'target'
+    target.mkdir()
+    report = SlimReport()
+    prepare_slim_tree(source, target, dict_data, report=report)
+
+    assert report.converted == 2
+    assert (report.dict_path is not None) == (dict_data is not None)
+    assert (target / 'c.txt').read_bytes() == b'c' * 100
+    assert (target / 'd.blk').read_bytes() == b'd:i=1\n'
+
+    if dict_data is None:
+        dctx = zstd.ZstdDecompressor()
+        block_type = SLIM_ZST
+    else:
+        dctx = zstd.ZstdDecompressor(dict_data=zstd.ZstdCompressionDict(dict_data))
+        block_type = SLIM_ZST_DICT
+        assert (target / report.dict_path).read_bytes() == dict_data
+    with open(target / 'nm', 'rb') as istream:
+        nm = decode_shared_names(istream, dctx)
+    shared = [nm.raw(i).decode('utf8') for i in range(len(nm))]
+    # Частые имена первыми: child 4, a 3, b 2, остальные по одному в порядке появления.
+    assert shared == ['child', 'a', 'b', 's', 'n', 'p', 'x']
+    assert report.names == len(shared)
+
+    for name, fat in ('a.blk', fat_blk_bytes), ('sub/b.blk', other_fat_blk_bytes):
+        slim = (target / name).read_bytes()
+        assert slim[0] == block_type
+        slim_data = dctx.decompressobj().decompress(slim[1:])
+        assert BlkData.parse(slim_data).names == []
+        assert resolve(slim_data, shared) == resolve(fat[1:])
+
+    params, blocks, _ = resolve(fat_blk_bytes[1:])
+    assert params == [('a', 2, 1), ('s', 1, 'hello'), ('n', 1, 'a'), ('b', 3, 0x3fc00000), ('p', 4, 6),
+                      ('b', 3, 0x40000000)]
+    assert blocks == [(None, 3, 2, 1), ('child', 2, 0, None), ('child', 1, 0, None)]
+
+
+def test_prepare_slim_tree_compose_error(tmppath: Path):
+    source = tmppath / 'broken'
+    source.mkdir()
+    # Индекс имени параметра 5 вне таблицы из одного имени.
+    (source / 'a.blk').write_bytes(bytes.fromhex('01 01 02 6100 01 01 00 050000 02 00000000 00 01 00'))
+    target = tmppath / 'broken_target'
+    target.mkdir()
+    with pytest.raises(ComposeError):
+        prepare_slim_tree(source, target)
+
+
+def test_prepare_slim_tree_blk(fat_blk_bytes: bytes, fat_zst_blk_bytes: bytes, tmppath: Path):
+    """Преобразованные блоки распаковываются blk в тот же текст, что и исходные."""
+
+    pytest.importorskip('blk')
+    from blk import Format
+
+    sub = tmppath / 'blk'
+    source = make_source(sub, fat_blk_bytes, fat_zst_blk_bytes)
+    target = sub / 'target'
+    target.mkdir()
+    prepare_slim_tree(source, target, DICT_DATA)
+
+    names = ['a.blk', 'sub/b.blk']
+    out_paths = []
+    for root in source, target:
+        image = VromfsFile.pack_into(root)
+        image.seek(0)
+        vromfs = VromfsFile(image)
+        out_path = sub / ('out_' + root.name)
+        results = list(vromfs.unpack_iter(names, out_path, Format.STRICT_BLK))
+        assert [r for r in results if r.error is not None] == []
+        out_paths.append(out_path)
+
+    expected_path, actual_path = out_paths
+    for name in names:
+        assert (actual_path / name).read_bytes() == (expected_path / name).read_bytes(), name
@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+from threading import Event, Thread
+import pytest
+from vromfs.common import CHUNK_SIZE
+from vromfs.spool_reader import SpoolReader
+
+
+class ForwardReader(io.RawIOBase):
+    """Поток без возможности перехода, считающий прочитанные байты."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+        self.read_bytes = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self.data) if size < 0 else self.pos + size
+        chunk = self.data[self.pos:end]
+        self.pos += len(chunk)
+        self.read_bytes += len(chunk)
+        return chunk
+
+
+@pytest.fixture()
+def data():
+    return bytes(range(256)) * 8
+
+
+def test_random_access_reads_source_once(data):
+    source = ForwardReader(data)
+    reader = SpoolReader(source)
+    reader.seek(1000)
+    assert reader.read(10) == data[1000:1010]
+    reader.seek(5)
+    assert reader.read(3) == data[5:8]
+    assert reader.read() == data[8:]
+    reader.seek(0)
+    assert reader.read() == data
+    assert source.read_bytes == len(data)
+
+
+@pytest.mark.parametrize(['target', 'whence', 'expected'], [
+    (10, io.SEEK_SET, 10),
+    (-1, io.SEEK_END, 2047),
+    (3, io.SEEK_CUR, 3),
+])
+def test_seek(data, target, whence, expected):
+    reader = SpoolReader(ForwardReader(data))
+    assert reader.seek(target, whence) == expected
+    assert reader.read(1) == data[expected:expected+1]
+
+
+def test_read_past_end(data):
+    reader = SpoolReader(ForwardReader(data))
+    reader.seek(len(data) + 10)
+    assert reader.read(5) == b''
+
+
+class PausedReader(ForwardReader):
+    """Поток, который отдает первую порцию сразу, а следующие - после resume."""
+
+    def __init__(self, data: bytes, first: int):
+        super().__init__(data)
+        self.first = first
+        self.paused = Event()
+        self.resumed = Event()
+
+    def read(self, size: int = -1) -> bytes:
+        if self.pos == 0:
+            return super().read(self.first)
+        self.paused.set()
+        assert self.resumed.wait(5)
+        return super().read(size)
+
+
+def test_readinto_at_sees_published_data(data):
+    """Данные, учтенные в spooled, доступны для os.preadv, пока другой поток продолжает чтение источника."""
+
+    source = PausedReader(data, 100)
+    reader = SpoolReader(source)
+    filler = Thread(target=reader.read)
+    filler.start()
+    try:
+        assert source.paused.wait(5)
+        b = bytearray(100)
+        assert reader.readinto_at(0, memoryview(b)) == 100
+        assert bytes(b) == data[:100]
+    finally:
+        source.resumed.set()
+        filler.join()
+    assert reader.spooled == len(data)
+
+
+def test_readinto_at_tail_threads():
+    from vromfs.bin import BinFile, PlatformType
+
+    data = bytes(range(256)) * (3 * CHUNK_SIZE // 256) + b'tail' * 1000
+    image = io.BytesIO(data)
+    container = BinFile.pack_into(image, None, PlatformType.PC, None, compressed=True, checked=True, size=len(data))
+    container.seek(0)
+    reader = SpoolReader(BinFile(container))
+    tail = len(data) - 100_000
+
+    def read_tail(i: int) -> bool:
+        offset = tail + i * 1000
+        b = bytearray(len(data) - offset)
+        return reader.readinto_at(offset, memoryview(b)) == len(b) and bytes(b) == data[offset:]
+
+    with ThreadPoolExecutor(8) as executor:
+        assert all(executor.map(read_tail, range(64)))
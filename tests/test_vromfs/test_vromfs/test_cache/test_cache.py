@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Barrier
+import pytest
+from vromfs.bin import BinFile, PackType
+from vromfs.corpus import CorpusSpec, generate_bin, generate_tree
+from vromfs.vromfs import DependencyCache, VromfsFile
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+
+def test_get_loads_once():
+    cache = DependencyCache()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return ['a', 'b']
+
+    first = cache.get_names('key', load)
+    second = cache.get_names('key', load)
+    assert first is second
+    assert len(loads) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_shared_dictionary(tmppath: Path):
+    tree = tmppath / 'tree'
+    generate_tree(tree, CorpusSpec(count=50, mean_size=512, dictionary=True))
+    targets = [tmppath / f'{i}.vromfs.bin' for i in range(2)]
+    for target in targets:
+        generate_bin(target, CorpusSpec(), PackType.PLAIN, tree=tree)
+
+    cache = DependencyCache()
+    for target in targets:
+        with BinFile(target) as bin_file:
+            vromfs = VromfsFile(bin_file, cache=cache)
+            assert vromfs.dctx is not None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_get_parallel_keys():
+    cache = DependencyCache()
+    started = Barrier(2, timeout=5)
+
+    def load(key):
+        # Обе загрузки должны выполняться одновременно: при общей блокировке барьер не будет пройден.
+        started.wait()
+        return [key]
+
+    with ThreadPoolExecutor(2) as executor:
+        results = list(executor.map(lambda key: cache.get_names(key, lambda: load(key)), ['a', 'b']))
+    assert results == [['a'], ['b']]
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_get_failed_load():
+    cache = DependencyCache()
+
+    def fail():
+        raise OSError('load')
+
+    with pytest.raises(OSError):
+        cache.get_names('key', fail)
+    assert cache.get_names('key', lambda: ['a']) == ['a']
+    assert (cache.hits, cache.misses) == (0, 1)
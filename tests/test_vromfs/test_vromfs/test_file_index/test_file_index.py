@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from pathlib import Path, PurePosixPath
+import pickle
+from time import perf_counter
+import tracemalloc
+from typing import NamedTuple, Optional
+import pytest
+from vromfs.vromfs import FileIndex, FileInfo
+
+
+@pytest.fixture(scope='module')
+def index():
+    return FileIndex([
+        FileInfo('config/wpcost.blk', 0x10, 4, None),
+        FileInfo('version', 0x20, 8, None),
+        FileInfo('nm', 0x30, 16, None),
+    ])
+
+
+def test_lookup(index):
+    info = index['config/wpcost.blk']
+    assert info.name == 'config/wpcost.blk'
+    assert index[Path('config/wpcost.blk')] == info
+    assert index[PurePosixPath('config/wpcost.blk')] == info
+    assert index['/config//./wpcost.blk'] == info
+    assert 'version' in index
+    assert 'nop' not in index
+    assert 42 not in index
+    with pytest.raises(KeyError):
+        index['nop']
+    with pytest.raises(TypeError):
+        index.lookup(42)
+
+
+def test_views(index):
+    assert list(index.names()) == ['config/wpcost.blk', 'version', 'nm']
+    assert list(index) == [Path('config/wpcost.blk'), Path('version'), Path('nm')]
+    assert dict(index.items())[Path('nm')].offset == 0x30
+    assert len(index) == 3
+
+
+def test_file_info():
+    info = FileInfo('a/b.blk', 1, 2, b'\x00' * 20)
+    assert tuple(info) == ('a/b.blk', 1, 2, b'\x00' * 20)
+    assert info.path == Path('a/b.blk')
+    assert pickle.loads(pickle.dumps(info)) == info
+
+
+def test_file_info_tuple_api():
+    info = FileInfo('a/b.blk', 1, 2, None)
+    name, offset, size, digest = info
+    assert (name, offset, size, digest) == ('a/b.blk', 1, 2, None)
+    assert isinstance(info, tuple)
+    assert info._fields == ('name', 'offset', 'size', 'digest')
+    assert info._asdict() == dict(name='a/b.blk', offset=1, size=2, digest=None)
+    assert info._replace(name='c', size=3) == FileInfo('c', 1, 3, None)
+    assert FileInfo._make(('a/b.blk', 1, 2, None)) == info
+    assert not hasattr(info, '__dict__')
+
+
+class PathFileInfo(NamedTuple):
+    """Прежнее представление: путь Path в кортеже."""
+
+    path: Path
+    offset: int
+    size: int
+    digest: Optional[bytes]
+
+
+def measure(build):
+    tracemalloc.start()
+    t = perf_counter()
+    result = build()
+    elapsed = perf_counter() - t
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+@pytest.mark.bench
+def test_bench_build():
+    count = 100_000
+    names = [f'dir_{i % 16:02d}/dir_{i % 7:02d}/file_{i:06d}.blk' for i in range(count)]
+
+    def build_path_index():
+        return OrderedDict((info.path, info) for info in
+                           (PathFileInfo(Path(name), i << 4, 16, None) for i, name in enumerate(names)))
+
+    def build_file_index():
+        return FileIndex(FileInfo(name, i << 4, 16, None) for i, name in enumerate(names))
+
+    path_index, path_time, path_size = measure(build_path_index)
+    file_index, file_time, file_size = measure(build_file_index)
+
+    queries = names[::10]
+    # Отображение имен в строки таблицы строится при первом поиске.
+    file_index[queries[0]]
+    t = perf_counter()
+    for name in queries:
+        path_index[Path(name)]
+    path_lookup = (perf_counter() - t) / len(queries)
+    t = perf_counter()
+    for name in queries:
+        file_index[name]
+    file_lookup = (perf_counter() - t) / len(queries)
+
+    print()
+    print(f'Path: build {path_time:.3f}s, {path_size / count:.0f} B/entry, lookup {path_lookup * 1e6:.2f}us')
+    print(f'str:  build {file_time:.3f}s, {file_size / count:.0f} B/entry, lookup {file_lookup * 1e6:.2f}us')
+    assert file_time < path_time
+    assert file_size < path_size
+    assert file_lookup < path_lookup
+
+
+@pytest.mark.bench
+def test_bench_file_info():
+    """Создание записей и память на запись: кортеж с Path и FileInfo с именем-строкой."""
+
+    count = 100_000
+    names = [f'dir_{i % 16:02d}/dir_{i % 7:02d}/file_{i:06d}.blk' for i in range(count)]
+
+    path_infos, path_time, path_size = measure(
+        lambda: [PathFileInfo(Path(name), i << 4, 16, None) for i, name in enumerate(names)])
+    file_infos, file_time, file_size = measure(
+        lambda: [FileInfo(name, i << 4, 16, None) for i, name in enumerate(names)])
+
+    t = perf_counter()
+    for info in file_infos:
+        info.offset
+    access = (perf_counter() - t) / count
+
+    print()
+    print(f'Path: build {path_time:.3f}s, {path_size / count:.0f} B/entry')
+    print(f'str:  build {file_time:.3f}s, {file_size / count:.0f} B/entry, offset {access * 1e9:.0f}ns')
+    assert file_time < path_time
+    assert file_size < path_size
@@ -0,0 +1,63 @@
+import io
+from pathlib import Path
+from time import perf_counter
+import tracemalloc
+import pytest
+from pytest_lazyfixture import lazy_fixture
+from vromfs.vromfs import FileInfo, FileTable, Image, VromfsUnpackError
+
+
+@pytest.mark.parametrize('bytes_', [
+    lazy_fixture('checked_vromfs_bytes'),
+    lazy_fixture('unchecked_vromfs_bytes'),
+    lazy_fixture('unchecked_ex_vromfs_bytes'),
+])
+def test_read(bytes_):
+    istream = io.BytesIO(bytes_)
+    header, table = FileTable.read(istream)
+    meta = Image.parse(bytes_)
+    assert istream.tell() == meta.offset
+    assert header.extended == (meta.names_header.offset == 0x30)
+    assert header.checked == bool(meta.digests_header and meta.digests_header.begin)
+    digests = meta.digests_data or [None] * len(meta.names_data)
+    expected = sorted((FileInfo(n, di.offset, di.size, d) for n, di, d in zip(meta.names_data, meta.data_info, digests)),
+                      key=lambda info: info.offset)
+    assert list(table) == expected
+    assert [table[i] for i in range(-len(table), 0)] == expected
+    assert table.row('greeting') == [info.name for info in expected].index('greeting')
+    assert table.row('nop') is None
+    with pytest.raises(IndexError):
+        table[len(table)]
+
+
+def test_read_truncated_raises_unpack_error(checked_vromfs_bytes):
+    with pytest.raises(VromfsUnpackError):
+        FileTable.read(io.BytesIO(checked_vromfs_bytes[:0x60]))
+
+
+def test_from_infos():
+    infos = [FileInfo('b', 32, 1, None), FileInfo('/a', 16, 2, None)]
+    table = FileTable.from_infos(infos)
+    assert [info.name for info in table] == ['/a', 'b']
+    assert table[0].digest is None
+
+
+@pytest.mark.bench
+def test_bench_table():
+    count = 100_000
+    infos = [FileInfo(f'dir_{i % 16:02d}/dir_{i % 7:02d}/file_{i:06d}.blk', i << 4, 16, bytes(20))
+             for i in range(count)]
+
+    tracemalloc.start()
+    t = perf_counter()
+    table = FileTable.from_infos(infos)
+    elapsed = perf_counter() - t
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print()
+    print(f'FileTable: build {elapsed:.3f}s, columns {table.nbytes / count:.0f} B/entry, '
+          f'traced {size / count:.0f} B/entry')
+    assert table.nbytes / count < 80
+    assert table[count - 1] == infos[-1]
+    assert Path(table.name(0)) == infos[0].path
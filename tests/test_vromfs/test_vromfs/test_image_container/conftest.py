@@ -17,7 +17,7 @@ def checked_vromfs_container(paths, digests):
             'begin': 0x70,
         },
         'names_info': [0x40, 0x47],
-        'names_data': paths,
+        'names_data': [path.as_posix() for path in paths],
         'data_info': [
             {'offset': 0xa0, 'size': 2},
             {'offset': 0xb0, 'size': 0x0c},
@@ -40,7 +40,7 @@ def unchecked_vromfs_container(paths):
         },
         'digests_header': None,
         'names_info': [0x30, 0x37],
-        'names_data': paths,
+        'names_data': [path.as_posix() for path in paths],
         'data_info': [
             {'offset': 0x60, 'size': 2},
             {'offset': 0x70, 'size': 0x0c},
@@ -66,7 +66,7 @@ def unchecked_ex_vromfs_container(paths):
             'begin': 0x00,
         },
         'names_info': [0x40, 0x47],
-        'names_data': paths,
+        'names_data': [path.as_posix() for path in paths],
         'data_info': [
             {'offset': 0x70, 'size': 2},
             {'offset': 0x80, 'size': 0x0c},
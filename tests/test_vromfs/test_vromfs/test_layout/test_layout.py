@@ -0,0 +1,94 @@
+import io
+from pathlib import Path
+from time import perf_counter
+import pytest
+from vromfs.bin import BinFile, PlatformType
+from vromfs.corpus import CorpusSpec, generate_tree
+from vromfs.vromfs import Layout, VromfsFile, order_files, scan_tree
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+
+@pytest.fixture(scope='module')
+def source(tmppath: Path):
+    root = tmppath / 'source'
+    contents = {
+        'b/z.blk': b'\x01' + b'abc' * 40,
+        'a/y.blk': b'\x03' + b'xyz' * 30,
+        'a/x.txt': b'hello world\n' * 20,
+        'c.blk': b'\x01' + b'abc' * 41,
+        'nm': b'names',
+        'd.txt': b'hello world\n' * 3,
+        'e.bin': b'',
+    }
+    for name, content in contents.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return root, contents
+
+
+@pytest.mark.parametrize('layout', list(Layout))
+def test_order_files(source, layout):
+    root, contents = source
+    files = scan_tree(str(root))
+    ordered = order_files(reversed(files), layout, jobs=2)
+    assert sorted(ordered) == sorted(files)
+    assert ordered[-1].name == 'nm'
+    assert order_files(files, layout) == ordered
+    names = [f.name for f in ordered]
+
+    if layout is Layout.PATH:
+        assert ordered == files
+    elif layout is Layout.EXTENSION:
+        assert names == ['e.bin', 'b/z.blk', 'c.blk', 'a/y.blk', 'a/x.txt', 'd.txt', 'nm']
+    elif layout is Layout.SIZE:
+        sizes = [len(contents[name]) for name in names[:-1]]
+        assert sizes == sorted(sizes)
+    elif layout is Layout.SIMILARITY:
+        assert set(names[1:4]) == {'a/y.blk', 'b/z.blk', 'c.blk'}
+        assert abs(names.index('b/z.blk') - names.index('c.blk')) == 1
+
+
+def test_order_files_type_error(source):
+    root, _ = source
+    with pytest.raises(TypeError):
+        order_files(scan_tree(str(root)), 'path')
+
+
+@pytest.mark.parametrize('layout', list(Layout))
+def test_pack_into_layout(source, layout):
+    root, contents = source
+    ostream = VromfsFile.pack_into(root, extended=True, checked=True, layout=layout)
+    ostream.seek(0)
+    file = VromfsFile(ostream)
+    assert file.info_list[-1].name == 'nm'
+    for name, content in contents.items():
+        assert file.unpack_into(name).getvalue() == content
+
+
+@pytest.mark.bench
+def test_bench_layout(tmppath: Path):
+    root = tmppath / 'corpus'
+    generate_tree(root, CorpusSpec(count=5000, mean_size=4096, blk_share=0.6, seed=1))
+
+    print()
+    for layout in Layout:
+        t = perf_counter()
+        vromfs_stream = VromfsFile.pack_into(root, layout=layout)
+        size = vromfs_stream.tell()
+        vromfs_stream.seek(0)
+        bin_stream = BinFile.pack_into(vromfs_stream, None, PlatformType.PC, (1, 0, 0, 0), True, True, size)
+        pack_time = perf_counter() - t
+
+        t = perf_counter()
+        bin_stream.seek(0)
+        bin_file = BinFile(bin_stream)
+        vromfs = VromfsFile(bin_file)
+        for info in vromfs.info_list:
+            vromfs.unpack_into(info, io.BytesIO())
+        unpack_time = perf_counter() - t
+
+        print(f'{layout.value:<10} image {size}, container {bin_stream.getbuffer().nbytes}, '
+              f'pack {pack_time:.3f}s, unpack {unpack_time:.3f}s')
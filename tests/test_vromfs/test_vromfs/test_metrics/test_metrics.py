@@ -0,0 +1,41 @@
+from pathlib import Path
+import zstandard as zstd
+from vromfs.vromfs.metrics import FileMetrics, MetricsSummary, TimedDecompressor
+
+
+def make_metrics(read_time: float, in_size: int) -> FileMetrics:
+    metrics = FileMetrics()
+    metrics.read_time = read_time
+    metrics.in_size = in_size
+    metrics.out_size = 2 * in_size
+    return metrics
+
+
+def test_summary_slowest():
+    summary = MetricsSummary(top=2)
+    for i, t in enumerate((0.3, 0.1, 0.5, 0.2)):
+        summary.add(Path(f'f{i}'), make_metrics(t, 10))
+    assert [path for path, _ in summary.slowest] == ['f2', 'f0']
+
+
+def test_summary_totals():
+    summary = MetricsSummary()
+    summary.add(Path('a'), make_metrics(0.5, 10))
+    summary.add(Path('b'), make_metrics(0.25, 20))
+    totals = summary.totals['NONE']
+    assert totals['count'] == 2
+    assert totals['in_size'] == 30
+    assert totals['out_size'] == 60
+    assert totals['read_time'] == 0.75
+
+
+def test_timed_decompressor():
+    data = b'hello world\n' * 1000
+    frame = zstd.ZstdCompressor(write_content_size=True).compress(data)
+    metrics = FileMetrics()
+    dctx = TimedDecompressor(zstd.ZstdDecompressor(), metrics)
+    assert dctx.decompress(frame) == data
+    t = metrics.decompress_time
+    assert t > 0
+    assert dctx.stream_reader(frame).read() == data
+    assert metrics.decompress_time > t
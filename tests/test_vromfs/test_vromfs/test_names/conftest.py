@@ -1,10 +1,9 @@
-from pathlib import Path
 import pytest
 
 
 @pytest.fixture(scope='module')
 def names():
-    return [Path(name) for name in ('rate', 'separate')]
+    return ['rate', 'separate']
 
 
 @pytest.fixture(scope='module')
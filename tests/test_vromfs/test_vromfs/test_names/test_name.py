@@ -16,8 +16,7 @@ bijective_params = [
 def test_name_parse(bytes_, value):
     istream = io.BytesIO(bytes_)
     bytes_len = len(bytes_)
-    name = Path(value)
-    check_parse(Name, istream, bytes_len, name)
+    check_parse(Name, istream, bytes_len, value)
 
 
 @pytest.mark.parametrize('bytes_', [
@@ -34,8 +33,10 @@ def test_empty_or_root_name_parse_raises_value_error(bytes_):
 
 @pytest.mark.parametrize(['bytes_', 'value'], bijective_params)
 def test_name_build(value, bytes_, ostream):
-    name = Path(value)
-    check_build(Name, name, bytes_, ostream)
+    check_build(Name, value, bytes_, ostream)
+    ostream.seek(0)
+    ostream.truncate()
+    check_build(Name, Path(value), bytes_, ostream)
 
 
 @pytest.fixture(scope='module')
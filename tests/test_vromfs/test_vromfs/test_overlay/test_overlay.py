@@ -0,0 +1,86 @@
+from pathlib import Path
+import pytest
+from vromfs.bin import BinFile, PackType
+from vromfs.corpus import CorpusSpec, generate_bin
+from vromfs.stats import IOStats
+from vromfs.vromfs import VromfsFile, VromfsOverlay
+from helpers import make_outpath, make_tmppath
+
+tmppath = make_tmppath(__name__)
+outpath = make_outpath(__name__)
+
+
+@pytest.fixture(scope='module')
+def trees(tmppath: Path):
+    """Два дерева с общими именами file_*.blk, второе содержит дополнительные файлы."""
+
+    specs = [
+        CorpusSpec(count=10, mean_size=256, depth=0, blk_share=1.0, seed=0),
+        CorpusSpec(count=20, mean_size=256, depth=0, blk_share=1.0, seed=1),
+    ]
+    paths = []
+    for i, spec in enumerate(specs):
+        tree = tmppath / f'tree_{i}'
+        path = tmppath / f'{i}.vromfs.bin'
+        generate_bin(path, spec, PackType.ZSTD_OBFS if i else PackType.PLAIN, tree=tree)
+        paths.append((path, tree))
+    return paths
+
+
+def test_precedence(trees):
+    (high, high_tree), (low, low_tree) = trees
+    with VromfsOverlay([high, low]) as overlay:
+        assert len(overlay.name_list) == 20
+        for path in overlay.name_list:
+            tree = high_tree if (high_tree / path).exists() else low_tree
+            assert overlay.open(path).read() == (tree / path).read_bytes()
+        assert overlay.get_source(Path('file_000000.blk')) is overlay.sources[0]
+        assert overlay.get_source(Path('file_000015.blk')) is overlay.sources[1]
+        with pytest.raises(KeyError):
+            overlay.get_info(Path('nop'))
+
+
+def test_digests_table(trees):
+    (high, _), (low, _) = trees
+    with VromfsOverlay([high, low]) as overlay:
+        absent = []
+        table = overlay.digests_table(overlay.name_list + (Path('nop'),), absent)
+        assert absent == [Path('nop')]
+        assert set(table) == set(overlay.name_list)
+        for path, digest in table.items():
+            assert digest == overlay.digests_table([path])[path]
+
+
+def test_compressed_source_decompressed_once(trees):
+    (_, _), (low, low_tree) = trees
+    stats = IOStats()
+    with BinFile(low, stats) as bin_file:
+        overlay = VromfsOverlay([bin_file])
+        names = overlay.name_list
+        for path in reversed(names):
+            assert overlay.open(path).read() == (low_tree / path).read_bytes()
+        overlay.close()
+    assert stats['zstd'].resets == 1
+
+
+def test_open_many(trees):
+    (high, high_tree), (low, low_tree) = trees
+    with VromfsOverlay([high, low]) as overlay:
+        readers = [overlay.open(path) for path in overlay.name_list]
+        for reader in reversed(readers):
+            tree = high_tree if (high_tree / reader.info.path).exists() else low_tree
+            expected = (tree / reader.info.path).read_bytes()
+            reader.seek(1)
+            assert reader.read() == expected[1:]
+            reader.close()
+
+
+def test_unpack_iter(trees, outpath: Path):
+    (high, high_tree), (low, low_tree) = trees
+    with VromfsOverlay([VromfsFile(BinFile(high)), low]) as overlay:
+        results = list(overlay.unpack_iter([Path('file_000015.blk'), Path('nop'), Path('file_000001.blk')],
+                                           outpath))
+    assert [r.path for r in results] == [Path('nop'), Path('file_000001.blk'), Path('file_000015.blk')]
+    assert isinstance(results[0].error, KeyError)
+    assert (outpath / 'file_000001.blk').read_bytes() == (high_tree / 'file_000001.blk').read_bytes()
+    assert (outpath / 'file_000015.blk').read_bytes() == (low_tree / 'file_000015.blk').read_bytes()
@@ -0,0 +1,61 @@
+import pytest
+from vromfs.vromfs import FileInfo, PathIndex
+
+
+@pytest.fixture(scope='module')
+def index():
+    names = [
+        'config/wpcost.blk',
+        'version',
+        'config/units/tank.blk',
+        'config/units/ship.txt',
+        'gui/hud.blk',
+        'config/units/air/fw190.blk',
+    ]
+    # Смещения убывают по порядку имен, чтобы порядок результатов определялся смещениями.
+    infos = [FileInfo(name, 1000 - i * 16, 16, None) for i, name in enumerate(names)]
+    return PathIndex(sorted(infos, key=lambda info: info.offset))
+
+
+def names(infos):
+    return [info.path.as_posix() for info in infos]
+
+
+@pytest.mark.parametrize(['pattern', 'expected'], [
+    ('config/**/*.blk', ['config/units/air/fw190.blk', 'config/units/tank.blk', 'config/wpcost.blk']),
+    ('**/*.blk', ['config/units/air/fw190.blk', 'gui/hud.blk', 'config/units/tank.blk', 'config/wpcost.blk']),
+    ('*/units/*', ['config/units/ship.txt', 'config/units/tank.blk']),
+    ('version', ['version']),
+    ('config/units', []),
+    ('nop/**', []),
+])
+def test_glob(index, pattern, expected):
+    assert names(index.glob(pattern)) == expected
+
+
+def test_select(index):
+    assert names(index.select(['config/**'], ['**/air/**', '*/wpcost.blk'])) == [
+        'config/units/ship.txt', 'config/units/tank.blk']
+    assert len(index.select()) == 6
+
+
+def test_listdir(index):
+    assert index.listdir() == ['config', 'gui', 'version']
+    assert index.listdir('config/units') == ['air', 'ship.txt', 'tank.blk']
+    with pytest.raises(KeyError):
+        index.listdir('nop')
+
+
+def test_walk(index):
+    walked = [(path.as_posix(), dirnames, names(infos)) for path, dirnames, infos in index.walk('config')]
+    assert walked == [
+        ('config', ['units'], ['config/wpcost.blk']),
+        ('config/units', ['air'], ['config/units/ship.txt', 'config/units/tank.blk']),
+        ('config/units/air', [], ['config/units/air/fw190.blk']),
+    ]
+    pruned = []
+    for path, dirnames, _ in index.walk():
+        pruned.append(path.as_posix())
+        if 'config' in dirnames:
+            dirnames.remove('config')
+    assert pruned == ['.', 'gui']
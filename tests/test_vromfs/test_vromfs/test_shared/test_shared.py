@@ -0,0 +1,59 @@
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha1
+import multiprocessing
+import os
+from pathlib import Path
+import pickle
+import pytest
+from vromfs.bin import BinFile, PackType
+from vromfs.corpus import CorpusSpec, generate_bin
+from vromfs.vromfs import SharedImage, SharedImageHandle, VromfsFile
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+
+@pytest.fixture(scope='module')
+def container(tmppath: Path):
+    spec = CorpusSpec(count=50, mean_size=512, blk_share=1.0, seed=3)
+    tree = tmppath / 'tree'
+    path = tmppath / 'shared.vromfs.bin'
+    generate_bin(path, spec, PackType.ZSTD_OBFS, tree=tree, extended=True, checked=True)
+    return path, tree
+
+
+def digests(handle: SharedImageHandle):
+    with SharedImage.attach(handle) as shared:
+        vromfs = shared.vromfs
+        return {info.name: sha1(vromfs.open(info).read()).digest() for info in vromfs.info_list}
+
+
+def test_publish_attach(container, tmppath: Path):
+    path, tree = container
+    with BinFile(path) as bin_file:
+        vromfs = VromfsFile(bin_file)
+        expected = vromfs.digests_table()
+        with SharedImage.publish(vromfs, dir=tmppath) as shared:
+            handle = pickle.loads(pickle.dumps(shared.handle))
+            assert len(pickle.dumps(handle)) < 1024
+            assert shared.vromfs.checked
+            assert list(shared.vromfs.info_list) == list(vromfs.info_list)
+            assert shared.vromfs.digests_table() == expected
+            info = shared.vromfs.info_list[0]
+            assert shared.vromfs.open(info).read() == (tree / info.path).read_bytes()
+            with SharedImage.attach(handle) as attached:
+                assert attached.vromfs.get_info(info.name) == info
+        assert not os.path.exists(handle.path)
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='Нужен fork.')
+def test_workers(container, tmppath: Path):
+    path, _ = container
+    with BinFile(path) as bin_file:
+        vromfs = VromfsFile(bin_file)
+        expected = {p.as_posix(): d for p, d in vromfs.digests_table().items()}
+        with SharedImage.publish(vromfs, dir=tmppath) as shared:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(2, mp_context=context) as executor:
+                results = list(executor.map(digests, [shared.handle] * 2))
+    assert results == [expected, expected]
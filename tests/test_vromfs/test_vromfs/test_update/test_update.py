@@ -0,0 +1,100 @@
+import io
+from pathlib import Path
+import shutil
+import pytest
+from vromfs.bin import BinFile, PlatformType
+from vromfs.vromfs import PackReport, VromfsFile
+from helpers import make_tmppath
+
+tmppath = make_tmppath(__name__)
+
+CONTENTS = {
+    'a/x.blk': b'\x01' + b'abc' * 40,
+    'a/y.txt': b'hello world\n' * 20,
+    'b/z.bin': bytes(range(256)) * 6000,
+    'c.txt': b'hello world\n' * 3,
+    'nm': b'names',
+}
+
+
+def write_tree(root: Path, contents) -> Path:
+    for name, content in contents.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return root
+
+
+@pytest.fixture(scope='module')
+def source(tmppath: Path) -> Path:
+    return write_tree(tmppath / 'source', CONTENTS)
+
+
+@pytest.fixture(scope='module')
+def patch(tmppath: Path) -> Path:
+    return write_tree(tmppath / 'patch', {'a/x.blk': b'\x01' + b'abd' * 41, 'a/w.txt': b'new\n', 'd/e.txt': b'e'})
+
+
+@pytest.mark.parametrize(['extended', 'checked'], [(False, False), (True, False), (True, True)])
+def test_update_into(source: Path, patch: Path, tmppath: Path, extended: bool, checked: bool):
+    image = VromfsFile.pack_into(source, extended=extended, checked=checked)
+    image.seek(0)
+    vromfs = VromfsFile(image)
+    files = {name: patch / name for name in ('a/x.blk', 'a/w.txt', 'd/e.txt')}
+    report = PackReport()
+    updated = vromfs.update_into(files, ['c.txt'], jobs=2, report=report)
+    assert report.copied == 3
+    assert report.files == 6
+
+    expected_root = tmppath / f'expected_{extended}_{checked}'
+    shutil.copytree(source, expected_root)
+    (expected_root / 'c.txt').unlink()
+    shutil.copytree(patch, expected_root, dirs_exist_ok=True)
+    expected = VromfsFile.pack_into(expected_root, extended=extended, checked=checked)
+    assert updated.getvalue() == expected.getvalue()
+
+    updated.seek(0)
+    result = VromfsFile(updated)
+    assert result.info_list[-1].name == 'nm'
+    assert result.unpack_into('a/x.blk').getvalue() == (patch / 'a/x.blk').read_bytes()
+    assert 'c.txt' not in result
+
+
+def test_update_into_container(source: Path):
+    image = VromfsFile.pack_into(source, extended=True, checked=True)
+    size = image.tell()
+    image.seek(0)
+    container = BinFile.pack_into(image, None, PlatformType.PC, (1, 0, 0, 0), True, True, size)
+    container.seek(0)
+    vromfs = VromfsFile(BinFile(container))
+    updated = vromfs.update_into(remove=['nm'])
+    updated.seek(0)
+    result = VromfsFile(updated)
+    assert [info.name for info in result.info_list] == ['a/x.blk', 'a/y.txt', 'b/z.bin', 'c.txt']
+    assert result.digests_table() == {info.path: info.digest for info in vromfs.info_list if info.name != 'nm'}
+
+
+def test_update_into_shared_blocks(tmppath: Path):
+    root = write_tree(tmppath / 'dup', {'a': b'same' * 10, 'b': b'same' * 10, 'c': b'other'})
+    image = VromfsFile.pack_into(root, dedup=True)
+    image.seek(0)
+    vromfs = VromfsFile(image)
+    report = PackReport()
+    updated = vromfs.update_into(remove=['c'], report=report)
+    assert (report.duplicates, report.saved_size) == (0, 0)
+    assert (report.shared, report.shared_size) == (1, 48)
+    updated.seek(0)
+    infos = VromfsFile(updated).info_list
+    assert infos[0].offset == infos[1].offset
+
+
+def test_update_into_errors(source: Path, patch: Path):
+    image = VromfsFile.pack_into(source)
+    image.seek(0)
+    vromfs = VromfsFile(image)
+    with pytest.raises(KeyError):
+        vromfs.update_into(remove=['missing'])
+    with pytest.raises(ValueError):
+        vromfs.update_into({'c.txt': patch / 'd/e.txt'}, ['c.txt'])
+    with pytest.raises(ValueError):
+        vromfs.update_into(jobs=0)
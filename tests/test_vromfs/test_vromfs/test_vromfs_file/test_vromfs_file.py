@@ -1,10 +1,17 @@
+from hashlib import sha1
 import io
 from operator import attrgetter
+from pathlib import Path
 import pytest
 from pytest import param as _
 from pytest_lazyfixture import lazy_fixture
-from vromfs.vromfs import VromfsFile
+from vromfs.bin import BinFile, PlatformType
+from vromfs.stats import IOStats
+from vromfs.vromfs import PackReport, VromfsFile, VromfsPackError
+from vromfs.vromfs.packer import scan_tree, write_image
+from helpers import make_tmppath
 
+tmppath = make_tmppath(__name__)
 
 params = [_(lazy_fixture(f'{base}_vromfs_bytes'), lazy_fixture(f'{base}_vromfs_ns'), id=base) for base in
           ('checked', 'unchecked', 'unchecked_ex')]
@@ -27,10 +34,183 @@ def test_unpack(bytes_, ns, data):
         assert ostream.read() == expected
 
 
+@pytest.mark.parametrize('jobs', [1, 4])
 @pytest.mark.parametrize(['bytes_', 'ns'], params)
-def test_pack_into(bytes_, ns, source, ostream):
+def test_pack_into(bytes_, ns, source, ostream, jobs):
     kwargs = ns._asdict()
-    VromfsFile.pack_into(source, ostream, **kwargs)
+    VromfsFile.pack_into(source, ostream, **kwargs, jobs=jobs)
     assert ostream.tell() == len(bytes_)
     ostream.seek(0)
     assert ostream.read() == bytes_
+
+
+@pytest.mark.parametrize(['bytes_', 'ns'], params)
+def test_pack_into_chunked(bytes_, ns, source, tmppath):
+    """Файлы больше блока копируются блоками, в файл без дайджестов - через copy_file_range, если доступно."""
+
+    files = scan_tree(str(source))
+    ostream = io.BytesIO()
+    write_image(files, ostream, ns.extended, ns.checked, chunk_size=4)
+    assert ostream.getvalue() == bytes_
+
+    image = tmppath / 'chunked.vromfs'
+    with open(image, 'wb') as ostream:
+        write_image(files, ostream, ns.extended, ns.checked, jobs=2, chunk_size=4)
+    assert image.read_bytes() == bytes_
+
+
+@pytest.mark.parametrize('bytes_', [lazy_fixture('checked_vromfs_bytes'), lazy_fixture('unchecked_vromfs_bytes')])
+def test_digests_iter(bytes_, data):
+    file = VromfsFile(io.BytesIO(bytes_))
+    absent = []
+    fds = list(file.digests_iter((*file.name_list, Path('nop')), absent))
+    assert absent == [Path('nop')]
+    assert [fd.info for fd in fds] == list(file.info_list)
+    assert {fd.info.path: fd.digest for fd in fds} == file.digests_table()
+    for fd in fds:
+        if fd.info.digest is None:
+            assert fd.head == file.unpack_into(fd.info).getvalue()[:1]
+        else:
+            assert fd.head is None
+
+
+@pytest.mark.parametrize('bytes_', [lazy_fixture('checked_vromfs_bytes'), lazy_fixture('unchecked_vromfs_bytes')])
+def test_digests_iter_parallel(bytes_):
+    file = VromfsFile(io.BytesIO(bytes_))
+    assert list(file.digests_iter(jobs=4)) == list(file.digests_iter())
+
+
+def test_open(checked_vromfs_bytes, contents, paths, tmppath):
+    image = tmppath / 'open.vromfs'
+    image.write_bytes(checked_vromfs_bytes)
+    for source in (io.BytesIO(checked_vromfs_bytes), io.BufferedReader(io.BytesIO(checked_vromfs_bytes)), image):
+        with VromfsFile(source) as file:
+            readers = [file.open(path) for path in paths]
+            for reader, content in zip(readers, contents):
+                with reader:
+                    assert reader.seekable() and not reader.writable()
+                    assert reader.read(1) == content[:1]
+                    assert reader.seek(-1, io.SEEK_END) == len(content) - 1
+                    assert reader.read() == content[-1:]
+                    reader.seek(0)
+                    b = bytearray(len(content) + 4)
+                    assert reader.readinto(b) == len(content)
+                    assert bytes(b[:len(content)]) == content
+                    assert reader.read() == b''
+                assert reader.closed
+            with pytest.raises(KeyError):
+                file.open(Path('nop'))
+
+
+@pytest.mark.parametrize('chunk_size', [4, 2 ** 20])
+@pytest.mark.parametrize('checked', [False, True])
+def test_pack_into_dedup(tmppath, checked, chunk_size):
+    source = tmppath / 'dedup'
+    contents = {'a': b'hello world\n', 'b/a': b'hello world\n', 'b/c': b'42', 'c': b'hello world\n', 'd': b''}
+    for name, content in contents.items():
+        path = source / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+    files = scan_tree(str(source))
+    plain = io.BytesIO()
+    write_image(files, plain, checked, checked, chunk_size=chunk_size)
+    report = PackReport()
+    ostream = io.BytesIO()
+    write_image(files, ostream, checked, checked, jobs=2, chunk_size=chunk_size, dedup=True, report=report)
+
+    assert (report.files, report.duplicates, report.saved_size) == (5, 2, 32)
+    assert report.data_size == sum(map(len, contents.values()))
+    assert report.written_size == 32
+    assert len(plain.getvalue()) - len(ostream.getvalue()) == report.saved_size
+
+    ostream.seek(0)
+    file = VromfsFile(ostream)
+    assert len({info.offset for info in file.info_list if info.size}) == 2
+    for name, content in contents.items():
+        assert file.unpack_into(name).getvalue() == content
+        if checked:
+            assert file.get_info(name).digest == sha1(content).digest()
+
+
+def test_pack_into_no_dedup(tmppath):
+    source = tmppath / 'no_dedup'
+    contents = {'a': b'hello world\n', 'b': b'hello world\n', 'c': b'hello world\n'}
+    for name, content in contents.items():
+        (source / name).parent.mkdir(parents=True, exist_ok=True)
+        (source / name).write_bytes(content)
+
+    report = PackReport()
+    ostream = io.BytesIO()
+    write_image(scan_tree(str(source)), ostream, True, True, dedup=False, report=report)
+    assert (report.files, report.duplicates, report.saved_size, report.shared) == (3, 0, 0, 0)
+    assert report.written_size == 48
+
+    ostream.seek(0)
+    file = VromfsFile(ostream)
+    assert len({info.offset for info in file.info_list}) == 3
+
+    shared = VromfsFile.pack_into(source, dedup=True)
+    shared.seek(0)
+    report = PackReport()
+    VromfsFile(shared).update_into(report=report)
+    assert (report.copied, report.duplicates, report.saved_size) == (3, 0, 0)
+    assert (report.shared, report.shared_size, report.written_size) == (2, 32, 16)
+
+
+def test_open_compressed_decompressed_once(tmppath):
+    source = tmppath / 'spool'
+    contents = {f'{i:02}': bytes([i]) * (64 * 2 ** 10 + i) for i in range(16)}
+    for name, content in contents.items():
+        path = source / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    image = io.BytesIO()
+    VromfsFile.pack_into(source, image)
+    image.seek(0)
+    container = io.BytesIO()
+    BinFile.pack_into(image, container, PlatformType.PC, None, compressed=True, checked=True,
+                      size=len(image.getvalue()))
+    container.seek(0)
+
+    stats = IOStats()
+    with BinFile(container, stats) as bin_file:
+        file = VromfsFile(bin_file)
+        names = list(contents)
+        first = [file.open(name) for name in names]
+        second = [file.open(name) for name in reversed(names)]
+        assert first[-1].read(1) == contents[names[-1]][:1]
+        first[-1].seek(0)
+        resets = stats['zstd'].resets
+        for reader, other in zip(first, second):
+            assert other.read() == contents[other.name]
+            assert reader.read() == contents[reader.name]
+        assert stats['zstd'].resets == resets
+        file.close()
+
+
+def test_pack_into_empty_tree(tmppath):
+    source = tmppath / 'empty'
+    source.mkdir()
+    with pytest.raises(VromfsPackError, match='Пустое дерево'):
+        VromfsFile.pack_into(source, io.BytesIO())
+
+
+def test_nm_shared_names(tmppath):
+    import zstandard as zstd
+    from vromfs.files.shared_names import SharedNames, serialize_shared_names
+
+    source = tmppath / 'nm'
+    source.mkdir()
+    names = ['a', 'юникод', 'b']
+    with open(source / 'nm', 'wb') as ostream:
+        serialize_shared_names(SharedNames.of(names), ostream, zstd.ZstdCompressor(), None)
+    (source / 'x.blk').write_bytes(b'x')
+
+    image = VromfsFile.pack_into(source)
+    image.seek(0)
+    file = VromfsFile(image)
+    nm = file.nm
+    assert isinstance(nm, SharedNames)
+    assert [nm.raw(i).decode('utf8') for i in range(len(nm))] == names
+    assert file.nm is nm